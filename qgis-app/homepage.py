@@ -3,14 +3,23 @@ from django.shortcuts import render
 from django.template import RequestContext
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from plugins.models import Plugin
+from plugins.models import CatalogueRevision, Plugin
 
+# Cache of the homepage plugin sections, see CACHES in settings_docker
+HOMEPAGE_CACHE = getattr(settings, "HOMEPAGE_CACHE", "default")
+# The popularity changes with the downloads, which do not bump the
+# catalogue revision
+HOMEPAGE_CACHE_TIMEOUT = getattr(settings, "HOMEPAGE_CACHE_TIMEOUT", 3600)
 
 
 def homepage(request):
     """
     Renders the home page
+
+    The plugin sections are cached under the catalogue revision: the
+    querysets are lazy, they are only evaluated when the revision changed.
     """
+    catalogue_revision = CatalogueRevision.current()
     latest = Plugin.latest_objects.all()[:5]
     featured = Plugin.featured_objects.all()[:5]
     popular = Plugin.popular_objects.all()[:5]
@@ -31,9 +40,15 @@ def homepage(request):
             "content": content,
             "title": "QGIS plugins web portal",
             "new_qgis_major_version": settings.NEW_QGIS_MAJOR_VERSION,
+            "catalogue_revision": (
+                catalogue_revision.revision if catalogue_revision else 0
+            ),
+            "homepage_cache": HOMEPAGE_CACHE,
+            "homepage_cache_timeout": HOMEPAGE_CACHE_TIMEOUT,
         },
     )
 
+
 def documentation(request):
     """
     Renders the documentation page
@@ -42,4 +57,4 @@ def documentation(request):
         request,
         "flatpages/documentation.html",
         {},
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,413 @@
+"""
+Synthetic catalogue and benchmarks of the repository feeds.
+
+``build_catalogue()`` fills the database with a catalogue shaped like the
+production one (plugins with several versions, tags, trusted and untrusted
+authors, a mix of stable and experimental releases) and ``run_benchmarks()``
+measures the query count, wall time and peak memory of every feed variant
+for a list of QGIS versions, and of the first page of the plugin listings. Both are used by the ``benchmark_feeds``
+management command, which runs them in a throwaway test database.
+"""
+
+import gc
+import platform
+import random
+import tempfile
+import time
+import timeit
+import tracemalloc
+from itertools import count
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.template.loader import get_template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from plugins.models import (
+    Plugin,
+    PluginVersion,
+    update_ranking_scores,
+    update_review_states,
+    update_tag_stats,
+    update_version_pointers,
+    vjust,
+)
+from plugins.repository_utils import (
+    PluginCatalogue,
+    _SiteRequest,
+    render_plugins_json,
+    render_plugins_xml,
+)
+from plugins.version_keys import qgis_version_range, version_key
+from taggit.models import Tag, TaggedItem
+
+BENCHMARK_QGIS_VERSIONS = ["3.16", "3.22", "3.28", "3.34", "3.40"]
+BENCHMARK_SITE = "plugins.example.org"
+
+# Feed variant -> URL name of the view serving it
+BENCHMARK_FEEDS = {
+    "plugins.xml": "xml_plugins",
+    "plugins_new.xml": "xml_plugins_new",
+    "plugins.json": "json_plugins",
+}
+
+# Plugin manager of a listing -> filters of its former JOIN + DISTINCT query
+BENCHMARK_LISTINGS = {
+    "approved_objects": {"pluginversion__approved": True},
+    "stable_objects": {
+        "pluginversion__approved": True,
+        "pluginversion__experimental": False,
+    },
+    "experimental_objects": {
+        "pluginversion__approved": True,
+        "pluginversion__experimental": True,
+    },
+    "most_downloaded_objects": {"pluginversion__approved": True, "deprecated": False},
+}
+
+# QGIS ranges of the synthetic versions, as (min_qg_version, max_qg_version)
+_QGIS_RANGES = [
+    ("2.0", "2.99"),
+    ("2.14", "3.99"),
+    ("3.0", "3.99"),
+    ("3.10", "3.99"),
+    ("3.16", "3.99"),
+    ("3.22", "3.99"),
+    ("3.28", "4.99"),
+    ("3.34", "4.99"),
+    ("3.40", "4.99"),
+]
+
+_BATCH_SIZE = 1000
+
+
+def build_catalogue(
+    plugins: int = 5000,
+    versions: int = 60000,
+    tags: int = 300,
+    authors: int = 800,
+    seed: int = 0,
+) -> dict:
+    """
+    Creates a synthetic catalogue of plugins and returns its size.
+
+    Every plugin gets at least one version, the remaining versions are
+    spread randomly. About one author out of ten is trusted (holds the
+    plugins.can_approve permission), one version out of five is
+    experimental and one out of ten is left unapproved. The rows are
+    inserted in bulk, so no model signal is sent.
+    """
+    rng = random.Random(seed)
+    versions = max(versions, plugins)
+    now = timezone.now()
+
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f"benchmark_author_{i}",
+                email=f"benchmark_author_{i}@example.org",
+            )
+            for i in range(authors)
+        ],
+        batch_size=_BATCH_SIZE,
+    )
+    can_approve = Permission.objects.get(
+        codename="can_approve", content_type__app_label="plugins"
+    )
+    trusted_users = users[: max(1, authors // 10)]
+    User.user_permissions.through.objects.bulk_create(
+        [
+            User.user_permissions.through(user_id=user.pk, permission_id=can_approve.pk)
+            for user in trusted_users
+        ],
+        batch_size=_BATCH_SIZE,
+    )
+
+    plugin_objects = Plugin.objects.bulk_create(
+        [
+            Plugin(
+                created_by=rng.choice(users),
+                modified_on=now,
+                author=f"Benchmark author {i}",
+                email=f"benchmark_plugin_{i}@example.org",
+                homepage=f"https://example.org/benchmark_plugin_{i}",
+                repository=f"https://example.org/benchmark_plugin_{i}/code",
+                tracker=f"https://example.org/benchmark_plugin_{i}/issues",
+                package_name=f"benchmark_plugin_{i:05d}",
+                name=f"Benchmark plugin {i:05d}",
+                description=f"Synthetic plugin number {i} of the benchmark",
+                about="A plugin generated to benchmark the repository feeds.",
+                downloads=rng.randint(0, 100000),
+                featured=rng.random() < 0.01,
+                deprecated=rng.random() < 0.02,
+                server=rng.random() < 0.05,
+            )
+            for i in range(plugins)
+        ],
+        batch_size=_BATCH_SIZE,
+    )
+
+    tag_objects = Tag.objects.bulk_create(
+        [
+            Tag(name=f"benchmark tag {i}", slug=f"benchmark-tag-{i}")
+            for i in range(tags)
+        ],
+        batch_size=_BATCH_SIZE,
+    )
+    plugin_type = ContentType.objects.get_for_model(Plugin)
+    tagged_items = []
+    for plugin in plugin_objects:
+        for tag in rng.sample(tag_objects, k=rng.randint(0, min(5, len(tag_objects)))):
+            tagged_items.append(
+                TaggedItem(tag=tag, content_type=plugin_type, object_id=plugin.pk)
+            )
+    TaggedItem.objects.bulk_create(tagged_items, batch_size=_BATCH_SIZE)
+
+    # One version per plugin, then the rest at random
+    per_plugin = [1] * plugins
+    for _ in range(versions - plugins):
+        per_plugin[rng.randrange(plugins)] += 1
+
+    version_objects = []
+    for plugin, nb_versions in zip(plugin_objects, per_plugin):
+        range_index = rng.randrange(len(_QGIS_RANGES))
+        for n in range(nb_versions):
+            # Later releases move towards more recent QGIS versions
+            range_index = min(range_index + (rng.random() < 0.2), len(_QGIS_RANGES) - 1)
+            min_qg_version, max_qg_version = _QGIS_RANGES[range_index]
+            version = f"{1 + n // 10}.{n % 10}.{rng.randint(0, 3)}"
+            version_objects.append(
+                PluginVersion(
+                    plugin=plugin,
+                    created_by=rng.choice(
+                        trusted_users if rng.random() < 0.3 else users
+                    ),
+                    min_qg_version=min_qg_version,
+                    max_qg_version=max_qg_version,
+                    version=version,
+                    changelog=f"Changes of version {version}",
+                    package=f"packages/{plugin.package_name}.{version}.zip",
+                    experimental=rng.random() < 0.2,
+                    approved=rng.random() >= 0.1,
+                    downloads=rng.randint(0, 10000),
+                )
+            )
+    # bulk_create() does not call save(), which computes the version keys
+    for version in version_objects:
+        version.set_version_keys()
+    PluginVersion.objects.bulk_create(version_objects, batch_size=_BATCH_SIZE)
+    # bulk_create() does not send the signals maintaining the version pointers,
+    # the ranking scores, the tag stats and the review states
+    update_version_pointers(Plugin.objects.all())
+    update_ranking_scores(Plugin.objects.all())
+    update_tag_stats()
+    update_review_states(Plugin.objects.all(), create=True)
+
+    return {
+        "authors": len(users),
+        "trusted_authors": len(trusted_users),
+        "plugins": len(plugin_objects),
+        "versions": len(version_objects),
+        "tags": len(tag_objects),
+        "tagged_items": len(tagged_items),
+    }
+
+
+def measure(func, track_memory: bool = True) -> dict:
+    """
+    Calls func and returns the number of queries it ran and its wall time.
+
+    When track_memory is set, func is called a second time under
+    tracemalloc to report its peak memory: tracing slows down Python code a
+    lot, so it is kept out of the timed run.
+    """
+    gc.collect()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    result = {"queries": len(queries.captured_queries), "seconds": round(elapsed, 4)}
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            result["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _fetch(client, url: str, params: dict) -> int:
+    """
+    Requests url and consumes the response, returns the size of its body.
+    """
+    response = client.get(url, params)
+    assert response.status_code == 200, (url, params, response.status_code)
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def _benchmark_feeds(qgis_versions, track_memory: bool) -> list:
+    client = Client()
+    # The nonce keeps every request out of the page cache
+    nonce = count()
+    results = []
+    for feed, url_name in BENCHMARK_FEEDS.items():
+        url = reverse(url_name)
+        for qgis in qgis_versions:
+            sizes = []
+
+            def fetch():
+                sizes.append(_fetch(client, url, {"qgis": qgis, "_": next(nonce)}))
+
+            result = {"benchmark": feed, "qgis": qgis, **measure(fetch, track_memory)}
+            result["bytes"] = sizes[0]
+            results.append(result)
+    return results
+
+
+def _benchmark_snapshots(qgis_versions, track_memory: bool) -> list:
+    catalogues = []
+    results = [
+        {
+            "benchmark": "snapshot catalogue",
+            "qgis": None,
+            **measure(lambda: catalogues.append(PluginCatalogue()), track_memory),
+        }
+    ]
+    catalogue = catalogues[0]
+    renderers = {
+        "snapshot plugins.xml": render_plugins_xml,
+        "snapshot plugins.json": render_plugins_json,
+    }
+    for name, render in renderers.items():
+        for qgis in qgis_versions:
+            sizes = []
+
+            def render_snapshot():
+                object_list = catalogue.versions_for(qgis)
+                sizes.append(sum(len(c) for c in render(object_list, BENCHMARK_SITE)))
+
+            result = {
+                "benchmark": name,
+                "qgis": qgis,
+                **measure(render_snapshot, track_memory),
+            }
+            result["bytes"] = sizes[0]
+            results.append(result)
+    return results
+
+
+def _plan_nodes(queryset) -> list:
+    """
+    Returns the node types of the query plan of queryset, outermost first.
+    """
+    nodes = []
+    for n, line in enumerate(queryset.explain().splitlines()):
+        line = line.strip()
+        if n == 0 or line.startswith("->"):
+            nodes.append(line.lstrip("-> ").split("  (")[0])
+    return nodes
+
+
+def _benchmark_listings(track_memory: bool) -> list:
+    page_size = settings.PAGINATION_DEFAULT_PAGINATION
+    results = []
+    for manager, legacy_filters in BENCHMARK_LISTINGS.items():
+        queryset = getattr(Plugin, manager).all()
+        legacy_queryset = (
+            Plugin.base_objects.filter(**legacy_filters)
+            .order_by(*queryset.query.order_by)
+            .distinct()
+        )
+        for variant, qs in (("exists", queryset), ("join distinct", legacy_queryset)):
+
+            def first_page():
+                # What a paginated list view runs
+                qs.count()
+                list(qs[:page_size])
+
+            result = {
+                "benchmark": f"{manager} first page",
+                "variant": variant,
+                **measure(first_page, track_memory),
+            }
+            result["plan"] = _plan_nodes(qs[:page_size])
+            results.append(result)
+    return results
+
+
+def _benchmark_functions(number: int) -> list:
+    version = (
+        PluginVersion.objects.select_related("plugin__created_by", "created_by")
+        .prefetch_related("plugin__tags")
+        .first()
+    )
+    functions = {
+        "vjust": lambda: vjust("3.34.12", fillchar="0", level=2, force_zero=True),
+        "version_key": lambda: version_key("3.34.12-beta2"),
+        "qgis_version_range": lambda: qgis_version_range("3.34"),
+    }
+    if version is not None:
+        version.is_trusted = False
+        template = get_template("plugins/plugins_xml_plugin.xml")
+        context = {"version": version, "request": _SiteRequest(BENCHMARK_SITE)}
+        functions["plugins_xml_plugin.xml"] = lambda: template.render(context)
+    results = []
+    for name, func in functions.items():
+        # Templates are much slower than the version helpers
+        calls = number if "version" in name else max(1, number // 100)
+        seconds = timeit.timeit(func, number=calls)
+        results.append(
+            {
+                "benchmark": name,
+                "calls": calls,
+                "seconds": round(seconds, 4),
+                "us_per_call": round(seconds / calls * 1e6, 3),
+            }
+        )
+    return results
+
+
+def run_benchmarks(
+    qgis_versions=None, track_memory: bool = True, number: int = 100000
+) -> dict:
+    """
+    Benchmarks the repository feeds against the catalogue in the database.
+
+    Returns a JSON serializable report with one row per feed variant and
+    QGIS version: the live views (plugins.xml, plugins_new.xml and
+    plugins.json), the snapshot renderers used by the generate_plugins_xml
+    task, the first page of the plugin listings along with the former JOIN +
+    DISTINCT query of their managers, and the per-call cost of the version helpers and of the
+    plugins.xml entry template, each called number times.
+    """
+    qgis_versions = qgis_versions or BENCHMARK_QGIS_VERSIONS
+    # An empty media folder: the views serve the live feeds, not snapshots
+    with tempfile.TemporaryDirectory() as media_root, override_settings(
+        MEDIA_ROOT=media_root
+    ):
+        feeds = _benchmark_feeds(qgis_versions, track_memory)
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        },
+        "catalogue": {
+            "plugins": Plugin.objects.count(),
+            "versions": PluginVersion.objects.count(),
+            "tags": Tag.objects.count(),
+        },
+        "qgis_versions": list(qgis_versions),
+        "results": feeds + _benchmark_snapshots(qgis_versions, track_memory),
+        "listings": _benchmark_listings(track_memory),
+        "functions": _benchmark_functions(number),
+    }
@@ -0,0 +1,126 @@
+"""
+Validation and thumbnails of the plugin icons.
+
+The icons are checked and their thumbnails rendered once, when they are
+uploaded, by the process_plugin_icon task. The result is stored on the
+plugin, so the templates do not open the icon files.
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+from plugins.models import Plugin
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+# The thumbnails rendered by the templates, by geometry, with their options
+PLUGIN_ICON_THUMBNAILS = getattr(
+    settings,
+    "PLUGIN_ICON_THUMBNAILS",
+    {
+        "16x16": {"format": "PNG"},
+        "24x24": {"format": "PNG"},
+        "48x48": {"format": "PNG"},
+        "128x128": {"format": "PNG", "upscale": False},
+    },
+)
+
+
+def _svg_size(root) -> tuple:
+    """
+    Returns the width and height of an SVG in pixels, None when they are
+    not given in pixels
+    """
+    size = []
+    for attribute in ("width", "height"):
+        value = root.get(attribute, "").strip()
+        if value.endswith("px"):
+            value = value[:-2]
+        try:
+            size.append(round(float(value)))
+        except ValueError:
+            size.append(None)
+    return tuple(size)
+
+
+def read_icon(icon) -> dict:
+    """
+    Returns the validity, format and dimensions of an icon file.
+
+    The SVG icons must be well-formed XML, the other icons must be images
+    PIL can read.
+    """
+    metadata = {
+        "icon_valid": False,
+        "icon_format": "",
+        "icon_width": None,
+        "icon_height": None,
+    }
+    if not icon:
+        return metadata
+    try:
+        if icon.name.lower().endswith(".svg"):
+            with icon.open("rb") as f:
+                root = ET.parse(f).getroot()
+            metadata["icon_format"] = "SVG"
+            metadata["icon_width"], metadata["icon_height"] = _svg_size(root)
+        else:
+            with icon.open("rb") as f:
+                Image.open(f).verify()
+                # verify() leaves the image unusable
+                f.seek(0)
+                image = Image.open(f)
+                metadata["icon_format"] = image.format or ""
+                metadata["icon_width"], metadata["icon_height"] = image.size
+    except (ET.ParseError, OSError, UnidentifiedImageError, SyntaxError) as e:
+        logger.info(f"Invalid icon {icon.name}: {e}")
+        return metadata
+    metadata["icon_valid"] = True
+    return metadata
+
+
+def render_icon_thumbnail(icon, geometry) -> dict:
+    """
+    Renders a thumbnail of a valid raster icon, returns its url, width and
+    height
+    """
+    options = PLUGIN_ICON_THUMBNAILS.get(geometry, {"format": "PNG"})
+    thumbnail = get_thumbnail(icon, geometry, **options)
+    return {
+        "url": thumbnail.url,
+        "width": thumbnail.width,
+        "height": thumbnail.height,
+    }
+
+
+def render_icon_thumbnails(icon) -> dict:
+    """
+    Renders the PLUGIN_ICON_THUMBNAILS of a valid raster icon, returns
+    their url, width and height by geometry
+    """
+    return {
+        geometry: render_icon_thumbnail(icon, geometry)
+        for geometry in PLUGIN_ICON_THUMBNAILS
+    }
+
+
+def update_plugin_icon(plugin) -> dict:
+    """
+    Stores the validity, format, dimensions and thumbnails of the icon of a
+    plugin, returns them.
+
+    Nothing is written if the icon was replaced in the meantime.
+    """
+    metadata = read_icon(plugin.icon)
+    metadata["icon_thumbnails"] = {}
+    if metadata["icon_valid"] and metadata["icon_format"] != "SVG":
+        try:
+            metadata["icon_thumbnails"] = render_icon_thumbnails(plugin.icon)
+        except Exception as e:
+            # The icon is still valid, its thumbnails are rendered on the fly
+            logger.info(f"Thumbnails of {plugin.icon.name} failed: {e}")
+    Plugin.objects.filter(pk=plugin.pk, icon=plugin.icon.name).update(**metadata)
+    return metadata
@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from plugins.models import PluginVersionDownload
+from plugins.tasks.rollup_download_stats import month_end, rollup_downloads
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the download stats rollups from the existing plugin version "
+        "downloads, one month at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="First month to backfill (YYYY-MM), defaults to the month "
+            "of the oldest download",
+        )
+
+    def handle(self, *args, **options):
+        if options["since"]:
+            try:
+                month = datetime.datetime.strptime(options["since"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--since must be formatted as YYYY-MM")
+        else:
+            first_date = PluginVersionDownload.objects.aggregate(
+                first_date=Min("download_date")
+            )["first_date"]
+            if first_date is None:
+                self.stdout.write("No downloads to backfill.")
+                return
+            month = first_date.replace(day=1)
+
+        today = timezone.now().date()
+        months = 0
+        while month <= today:
+            rollup_downloads(month, min(month_end(month), today))
+            self.stdout.write(f"  {month:%Y-%m} done")
+            month = month_end(month) + datetime.timedelta(days=1)
+            months += 1
+
+        self.stdout.write(self.style.SUCCESS(f"\nDone. Backfilled {months} months."))
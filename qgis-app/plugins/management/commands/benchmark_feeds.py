@@ -0,0 +1,91 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from plugins.benchmark_utils import (
+    BENCHMARK_QGIS_VERSIONS,
+    build_catalogue,
+    run_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the repository feeds (plugins.xml, plugins_new.xml, "
+        "plugins.json and their snapshots) and the plugin listings on a "
+        "synthetic catalogue built in a throwaway test database, and print "
+        "the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--plugins",
+            type=int,
+            default=5000,
+            help="Number of plugins of the synthetic catalogue",
+        )
+        parser.add_argument(
+            "--versions",
+            type=int,
+            default=60000,
+            help="Number of plugin versions of the synthetic catalogue",
+        )
+        parser.add_argument(
+            "--qgis",
+            default=",".join(BENCHMARK_QGIS_VERSIONS),
+            help="Comma separated QGIS versions requested from each feed",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the synthetic catalogue generator",
+        )
+        parser.add_argument(
+            "--no-memory",
+            action="store_true",
+            help="Skip the peak memory measurements, which run every "
+            "benchmark a second time under tracemalloc",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Write the JSON report to this file instead of stdout",
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options["verbosity"]
+        setup_test_environment()
+        old_config = setup_databases(verbosity=verbosity, interactive=False)
+        try:
+            self.stderr.write("Building the synthetic catalogue...")
+            catalogue = build_catalogue(
+                plugins=options["plugins"],
+                versions=options["versions"],
+                seed=options["seed"],
+            )
+            self.stderr.write("Running the benchmarks...")
+            report = run_benchmarks(
+                qgis_versions=options["qgis"].split(","),
+                track_memory=not options["no_memory"],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=verbosity)
+            teardown_test_environment()
+
+        report["catalogue"].update(catalogue)
+        report["seed"] = options["seed"]
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stderr.write(
+                self.style.SUCCESS(f"Report written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
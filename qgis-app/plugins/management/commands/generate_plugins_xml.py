@@ -5,7 +5,7 @@ from django.conf import settings
 
 class Command(BaseCommand):
 
-    help = "Fetch and cached plugins xml"
+    help = "Generate the cached plugins xml from the database"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -13,7 +13,7 @@ class Command(BaseCommand):
             "--site",
             dest="site",
             default=settings.DEFAULT_PLUGINS_SITE,
-            help="Site url to get the source of plugins",
+            help="Site url used in the links of the cached plugins xml",
         )
 
     def handle(self, *args, **options):
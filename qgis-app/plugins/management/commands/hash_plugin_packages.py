@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from plugins.models import PluginVersion
+from plugins.utils import file_sha256
+
+
+def _hash_package(version):
+    """
+    Returns the SHA-256 and the size of the package of a version, or None
+    if the file is missing.
+    """
+    try:
+        path = version.package.path
+        return file_sha256(path), os.path.getsize(path)
+    except (OSError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the SHA-256 and the size of the plugin packages stored "
+        "before they were computed on upload. The packages are not moved: "
+        "only the packages uploaded since are stored, and shared, by content."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of packages hashed in parallel (default: 4)",
+        )
+
+    def handle(self, *args, **options):
+        versions = list(
+            PluginVersion.objects.filter(package_sha256="").only("pk", "package")
+        )
+        hashed = missing = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for version, result in zip(versions, executor.map(_hash_package, versions)):
+                if result is None:
+                    self.stdout.write(
+                        self.style.WARNING(f"  Missing package: {version.package}")
+                    )
+                    missing += 1
+                    continue
+                PluginVersion.objects.filter(pk=version.pk).update(
+                    package_sha256=result[0], package_size=result[1]
+                )
+                hashed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\nDone. Hashed {hashed} packages, {missing} missing.")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from plugins.models import PluginTagStat, update_tag_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the number of approved plugins of all the tags."
+
+    def handle(self, *args, **options):
+        update_tag_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done. {PluginTagStat.objects.count()} tags with approved plugins."
+            )
+        )
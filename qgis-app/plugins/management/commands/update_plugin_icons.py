@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from plugins.icon_utils import update_plugin_icon
+from plugins.models import Plugin
+
+
+class Command(BaseCommand):
+    help = (
+        "Validate the plugin icons and render their thumbnails, for the "
+        "plugins whose icon was not processed yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Process the icons of all the plugins.",
+        )
+
+    def handle(self, *args, **options):
+        plugins = Plugin.objects.exclude(icon="").exclude(icon__isnull=True)
+        if not options["all"]:
+            plugins = plugins.filter(icon_valid=False)
+        valid = invalid = 0
+        for plugin in plugins.iterator():
+            if update_plugin_icon(plugin)["icon_valid"]:
+                valid += 1
+            else:
+                invalid += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Done. {valid} valid icons, {invalid} invalid icons.")
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from plugins.models import Plugin, review_queue_counts, update_review_states
+
+
+class Command(BaseCommand):
+    help = "Recompute the review state of all the plugins."
+
+    def handle(self, *args, **options):
+        count = update_review_states(Plugin.objects.all(), create=True)
+        queues = ", ".join(
+            f"{name}: {total}" for name, total in review_queue_counts().items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Done. {count} plugins updated ({queues}).")
+        )
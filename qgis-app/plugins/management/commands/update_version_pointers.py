@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from plugins.models import Plugin, update_version_pointers
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the latest version date and the latest, stable and "
+        "experimental version of all the plugins."
+    )
+
+    def handle(self, *args, **options):
+        updated = update_version_pointers(Plugin.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Done. Updated {updated} plugins."))
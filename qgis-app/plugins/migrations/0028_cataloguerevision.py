@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_catalogue_revision(apps, schema_editor):
+    CatalogueRevision = apps.get_model("plugins", "CatalogueRevision")
+    CatalogueRevision.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0027_merge_20260712_2333"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogueRevision",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "revision",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Revision"),
+                ),
+                (
+                    "modified_on",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Modified on"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Catalogue Revision",
+                "verbose_name_plural": "Catalogue Revisions",
+            },
+        ),
+        migrations.RunPython(create_catalogue_revision, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-16 18:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0028_cataloguerevision"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PluginVersionChange",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "package_name",
+                    models.CharField(max_length=256, verbose_name="Package Name"),
+                ),
+                ("version", models.CharField(max_length=32, verbose_name="Version")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("approved", "Approved"),
+                            ("updated", "Updated"),
+                            ("unapproved", "Unapproved"),
+                            ("deleted", "Deleted"),
+                            ("soft_deleted", "Soft deleted"),
+                            ("restored", "Restored"),
+                        ],
+                        max_length=16,
+                        verbose_name="Action",
+                    ),
+                ),
+                (
+                    "created_on",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created on"),
+                ),
+                (
+                    "plugin",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="plugins.plugin",
+                        verbose_name="Plugin",
+                    ),
+                ),
+                (
+                    "plugin_version",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="plugins.pluginversion",
+                        verbose_name="Plugin Version",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Plugin Version Change",
+                "verbose_name_plural": "Plugin Version Changes",
+                "ordering": ("id",),
+            },
+        ),
+    ]
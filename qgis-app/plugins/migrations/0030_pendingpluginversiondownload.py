@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0029_pluginversionchange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingPluginVersionDownload",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("download_date", models.DateField(default=django.utils.timezone.now)),
+                ("country_code", models.CharField(default="N/D", max_length=3)),
+                ("country_name", models.CharField(default="N/D", max_length=100)),
+                (
+                    "plugin_version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="plugins.pluginversion",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pending Plugin Version Download",
+                "verbose_name_plural": "Pending Plugin Version Downloads",
+            },
+        ),
+    ]
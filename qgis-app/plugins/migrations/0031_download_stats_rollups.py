@@ -0,0 +1,115 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0030_pendingpluginversiondownload"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PluginCountryMonthlyDownloads",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("country_code", models.CharField(default="N/D", max_length=3)),
+                ("country_name", models.CharField(default="N/D", max_length=100)),
+                ("downloads", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Plugin Country Monthly Downloads",
+                "verbose_name_plural": "Plugin Country Monthly Downloads",
+            },
+        ),
+        migrations.CreateModel(
+            name="PluginDailyDownloads",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("downloads", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Plugin Daily Downloads",
+                "verbose_name_plural": "Plugin Daily Downloads",
+            },
+        ),
+        migrations.CreateModel(
+            name="PluginMonthlyDownloads",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("downloads", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Plugin Monthly Downloads",
+                "verbose_name_plural": "Plugin Monthly Downloads",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="pluginversiondownload",
+            index=models.Index(
+                fields=["download_date"], name="plugins_plu_downloa_9bbe47_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="pluginmonthlydownloads",
+            name="plugin",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="plugins.plugin"
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugindailydownloads",
+            name="plugin",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="plugins.plugin"
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugincountrymonthlydownloads",
+            name="plugin",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="plugins.plugin"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="pluginmonthlydownloads",
+            unique_together={("plugin", "month")},
+        ),
+        migrations.AlterUniqueTogether(
+            name="plugindailydownloads",
+            unique_together={("plugin", "date")},
+        ),
+        migrations.AlterUniqueTogether(
+            name="plugincountrymonthlydownloads",
+            unique_together={("plugin", "month", "country_code", "country_name")},
+        ),
+    ]
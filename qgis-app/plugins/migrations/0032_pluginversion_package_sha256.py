@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0031_download_stats_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pluginversion",
+            name="package_sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=64,
+                verbose_name="Package SHA-256",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pluginversion",
+            name="package_size",
+            field=models.PositiveBigIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Package size"
+            ),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:35
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def populate_version_pointers(apps, schema_editor):
+    Plugin = apps.get_model("plugins", "Plugin")
+    PluginVersion = apps.get_model("plugins", "PluginVersion")
+    versions = PluginVersion.objects.filter(plugin=OuterRef("pk"))
+    approved_versions = versions.filter(approved=True)
+    Plugin.objects.update(
+        latest_version_date=Subquery(
+            approved_versions.order_by("-created_on").values("created_on")[:1]
+        ),
+        stable_version=Subquery(
+            approved_versions.filter(experimental=False)
+            .order_by("-version")
+            .values("pk")[:1]
+        ),
+        experimental_version=Subquery(
+            approved_versions.filter(experimental=True)
+            .order_by("-version")
+            .values("pk")[:1]
+        ),
+        latest_version=Subquery(versions.order_by("-version").values("pk")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0032_pluginversion_package_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plugin",
+            name="experimental_version",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="plugins.pluginversion",
+                verbose_name="Experimental version",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="latest_version",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="plugins.pluginversion",
+                verbose_name="Latest version",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="latest_version_date",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Creation date of the most recent approved version",
+                null=True,
+                verbose_name="Latest version date",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="stable_version",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="plugins.pluginversion",
+                verbose_name="Stable version",
+            ),
+        ),
+        migrations.RunPython(populate_version_pointers, migrations.RunPython.noop),
+    ]
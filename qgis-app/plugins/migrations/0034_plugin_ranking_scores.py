@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:55
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast
+
+
+def populate_ranking_scores(apps, schema_editor):
+    Plugin = apps.get_model("plugins", "Plugin")
+    votes = Cast("rating_votes", models.FloatField())
+    score = Cast("rating_score", models.FloatField())
+    Plugin.objects.update(
+        average_vote=score / (votes + 0.001),
+        weighted_rating=(
+            votes / (votes + 5) * (score / (votes + 0.001)) + 5.0 / (votes + 5) * 3
+        ),
+        popularity=F("downloads") * (1 + score / (votes + 0.01) / 3),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0033_plugin_version_pointers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plugin",
+            name="average_vote",
+            field=models.FloatField(
+                db_index=True, default=0, editable=False, verbose_name="Average vote"
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="popularity",
+            field=models.FloatField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text="Downloads weighted by the average vote",
+                verbose_name="Popularity",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="weighted_rating",
+            field=models.FloatField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text="Bayesian average of the votes",
+                verbose_name="Weighted rating",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="plugin",
+            index=models.Index(
+                fields=["rating_votes"], name="plugins_plugin_votes_idx"
+            ),
+        ),
+        migrations.RunPython(populate_ranking_scores, migrations.RunPython.noop),
+    ]
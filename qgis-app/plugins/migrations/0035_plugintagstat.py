@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def populate_tag_stats(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Plugin = apps.get_model("plugins", "Plugin")
+    PluginTagStat = apps.get_model("plugins", "PluginTagStat")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+    content_type = ContentType.objects.filter(app_label="plugins", model="plugin")
+    approved_plugins = Plugin.objects.filter(
+        Q(stable_version__isnull=False) | Q(experimental_version__isnull=False)
+    )
+    counts = (
+        TaggedItem.objects.filter(
+            content_type__in=content_type,
+            object_id__in=approved_plugins.values("pk"),
+        )
+        .values("tag")
+        .annotate(plugin_count=Count("object_id", distinct=True))
+    )
+    PluginTagStat.objects.bulk_create(
+        [
+            PluginTagStat(tag_id=row["tag"], plugin_count=row["plugin_count"])
+            for row in counts
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        (
+            "taggit",
+            "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx",
+        ),
+        ("plugins", "0034_plugin_ranking_scores"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PluginTagStat",
+            fields=[
+                (
+                    "tag",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="plugin_stat",
+                        serialize=False,
+                        to="taggit.tag",
+                        verbose_name="Tag",
+                    ),
+                ),
+                (
+                    "plugin_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Approved plugins"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Plugin Tag Stat",
+                "verbose_name_plural": "Plugin Tag Stats",
+            },
+        ),
+        migrations.RunPython(populate_tag_stats, migrations.RunPython.noop),
+    ]
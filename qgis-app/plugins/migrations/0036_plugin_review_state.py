@@ -0,0 +1,138 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_review_states(apps, schema_editor):
+    Plugin = apps.get_model("plugins", "Plugin")
+    PluginEmailConfirmation = apps.get_model("plugins", "PluginEmailConfirmation")
+    PluginReviewState = apps.get_model("plugins", "PluginReviewState")
+    PluginVersion = apps.get_model("plugins", "PluginVersion")
+    PluginVersionFeedback = apps.get_model("plugins", "PluginVersionFeedback")
+    PluginReviewState.objects.bulk_create(
+        [
+            PluginReviewState(plugin_id=pk)
+            for pk in Plugin.objects.values_list("pk", flat=True)
+        ],
+        batch_size=1000,
+    )
+    versions = PluginVersion.objects.filter(plugin=OuterRef("plugin")).order_by(
+        "-created_on"
+    )
+    feedbacks = (
+        PluginVersionFeedback.objects.filter(version__plugin=OuterRef("plugin"))
+        .order_by()
+        .values("version__plugin")
+    )
+    confirmed_email = PluginEmailConfirmation.objects.filter(
+        email=OuterRef("email"),
+        confirmed_at__isnull=False,
+        superseded_at__isnull=True,
+    )
+    PluginReviewState.objects.update(
+        latest_version=Subquery(versions.values("pk")[:1]),
+        latest_version_date=Subquery(versions.values("created_on")[:1]),
+        latest_version_approved=Subquery(versions.values("approved")[:1]),
+        latest_version_status=Subquery(versions.values("validation_status")[:1]),
+        feedback_count=Coalesce(
+            Subquery(feedbacks.annotate(count=Count("pk")).values("count")), 0
+        ),
+        completed_feedback_count=Coalesce(
+            Subquery(
+                feedbacks.filter(is_completed=True)
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        ),
+        email_confirmed=Exists(
+            Plugin.objects.filter(Exists(confirmed_email), pk=OuterRef("plugin"))
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0035_plugintagstat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PluginReviewState",
+            fields=[
+                (
+                    "plugin",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="review_state",
+                        serialize=False,
+                        to="plugins.plugin",
+                        verbose_name="Plugin",
+                    ),
+                ),
+                (
+                    "latest_version_date",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Latest version uploaded on"
+                    ),
+                ),
+                (
+                    "latest_version_approved",
+                    models.BooleanField(
+                        null=True, verbose_name="Latest version approved"
+                    ),
+                ),
+                (
+                    "latest_version_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("pending", "Pending"),
+                            ("validating", "Validating"),
+                            ("validated", "Validated"),
+                            ("validated_with_config", "Validated (configured)"),
+                            ("blocked", "Blocked"),
+                        ],
+                        max_length=25,
+                        null=True,
+                        verbose_name="Latest version validation status",
+                    ),
+                ),
+                (
+                    "feedback_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Feedbacks"),
+                ),
+                (
+                    "completed_feedback_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Completed feedbacks"
+                    ),
+                ),
+                (
+                    "email_confirmed",
+                    models.BooleanField(default=False, verbose_name="Email confirmed"),
+                ),
+                (
+                    "latest_version",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="plugins.pluginversion",
+                        verbose_name="Latest version",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Plugin Review State",
+                "verbose_name_plural": "Plugin Review States",
+            },
+        ),
+        migrations.RunPython(populate_review_states, migrations.RunPython.noop),
+    ]
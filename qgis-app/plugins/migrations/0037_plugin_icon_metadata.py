@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0036_plugin_review_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plugin",
+            name="icon_format",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=16,
+                verbose_name="Icon format",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="icon_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Icon height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="icon_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="The url, width and height of the thumbnails by geometry.",
+                verbose_name="Icon thumbnails",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="icon_valid",
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name="Valid icon"
+            ),
+        ),
+        migrations.AddField(
+            model_name="plugin",
+            name="icon_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Icon width"
+            ),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:24
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+from plugins.version_keys import qgis_version_key, version_key
+
+BATCH_SIZE = 1000
+
+
+def populate_version_keys(apps, schema_editor):
+    PluginVersion = apps.get_model("plugins", "PluginVersion")
+    last_pk = 0
+    while True:
+        versions = list(
+            PluginVersion.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "version", "min_qg_version", "max_qg_version")[:BATCH_SIZE]
+        )
+        if not versions:
+            break
+        for version in versions:
+            version.version_key = version_key(version.version)
+            version.min_qg_key = qgis_version_key(version.min_qg_version)
+            version.max_qg_key = qgis_version_key(version.max_qg_version)
+        PluginVersion.objects.bulk_update(
+            versions, ["version_key", "min_qg_key", "max_qg_key"]
+        )
+        last_pk = versions[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0037_plugin_icon_metadata"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="pluginversion",
+            options={"ordering": ("plugin", "-version_key", "experimental")},
+        ),
+        # The indexes are built once the keys are filled
+        migrations.AddField(
+            model_name="pluginversion",
+            name="max_qg_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                blank=True,
+                editable=False,
+                null=True,
+                size=None,
+                verbose_name="Maximum QGIS version key",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pluginversion",
+            name="min_qg_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                editable=False,
+                null=True,
+                size=None,
+                verbose_name="Minimum QGIS version key",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pluginversion",
+            name="version_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                editable=False,
+                null=True,
+                size=None,
+                verbose_name="Version key",
+            ),
+        ),
+        migrations.RunPython(populate_version_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="pluginversion",
+            name="max_qg_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                size=None,
+                verbose_name="Maximum QGIS version key",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pluginversion",
+            name="min_qg_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                db_index=True,
+                editable=False,
+                null=True,
+                size=None,
+                verbose_name="Minimum QGIS version key",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pluginversion",
+            index=models.Index(
+                fields=["plugin", "-version_key"], name="plugins_pv_version_key_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    The icons uploaded before the icon metadata existed are processed after
+    the deploy by the update_plugin_icons command, outside of the migration
+    transaction, see docs/RELEASING.md
+    """
+
+    dependencies = [
+        ("plugins", "0038_plugin_version_keys"),
+    ]
+
+    operations = []
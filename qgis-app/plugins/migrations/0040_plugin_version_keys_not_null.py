@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:20
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+from plugins.version_keys import qgis_version_key, version_key
+
+BATCH_SIZE = 1000
+
+
+def fill_missing_version_keys(apps, schema_editor):
+    """
+    Computes the keys of the versions loaded without them, from a fixture
+    """
+    PluginVersion = apps.get_model("plugins", "PluginVersion")
+    missing = PluginVersion.objects.filter(
+        models.Q(version_key__isnull=True)
+        | models.Q(min_qg_key__isnull=True)
+        | models.Q(max_qg_key__isnull=True)
+    ).only("pk", "version", "min_qg_version", "max_qg_version")
+    while True:
+        versions = list(missing.order_by("pk")[:BATCH_SIZE])
+        if not versions:
+            break
+        for version in versions:
+            max_qg_version = version.max_qg_version
+            if not max_qg_version and version.min_qg_version:
+                max_qg_version = "%s.99" % version.min_qg_version.split(".")[0]
+            version.version_key = version_key(version.version) or []
+            version.min_qg_key = qgis_version_key(version.min_qg_version) or []
+            version.max_qg_key = qgis_version_key(max_qg_version) or []
+        PluginVersion.objects.bulk_update(
+            versions, ["version_key", "min_qg_key", "max_qg_key"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0039_backfill_plugin_icons"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_version_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="pluginversion",
+            name="max_qg_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                db_index=True,
+                editable=False,
+                size=None,
+                verbose_name="Maximum QGIS version key",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pluginversion",
+            name="min_qg_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                db_index=True,
+                editable=False,
+                size=None,
+                verbose_name="Minimum QGIS version key",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pluginversion",
+            name="version_key",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                editable=False,
+                size=None,
+                verbose_name="Version key",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plugins", "0040_plugin_version_keys_not_null"),
+    ]
+
+    operations = [
+        # The changes logged before are older than every revision token
+        migrations.AddField(
+            model_name="pluginversionchange",
+            name="transaction_id",
+            field=models.BigIntegerField(
+                db_index=True, default=0, editable=False, verbose_name="Transaction"
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import datetime
+import hashlib
 import os
 import re
 import secrets
@@ -8,16 +9,26 @@ from typing import Iterable, Optional, Tuple
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models, transaction
-from django.db.models import Count, Exists, F, OuterRef, Subquery
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from djangoratings.fields import AnonymousRatingField
+from plugins.version_keys import qgis_version_key, version_key
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from taggit.models import Tag, TaggedItem
 from taggit_autosuggest.managers import TaggableManager
 
 PLUGINS_STORAGE_PATH = getattr(settings, "PLUGINS_STORAGE_PATH", "packages/%Y")
+# Plugin packages are stored under their SHA-256 in this folder
+PLUGINS_CONTENT_STORAGE_PATH = getattr(
+    settings, "PLUGINS_CONTENT_STORAGE_PATH", "packages/sha256"
+)
 PLUGINS_FRESH_DAYS = getattr(settings, "PLUGINS_FRESH_DAYS", 30)
 
 
@@ -28,38 +39,26 @@ VERSION_RE = r"(^|(?<=\.))0+(?!(\.|$|-))|\.#+"
 
 class BasePluginManager(models.Manager):
     """
-    Adds a score
-    * average_vote provides a simple average rating.
-    * latest_version_date fetches the date of the
-    most recent approved plugin version.
-    * weighted_rating uses the Bayesian Average formula
-    to provide a more balanced rating that mitigates the effect of low vote counts.
+    Base manager of the plugin listings, the ranking scores (average_vote,
+    weighted_rating and popularity) are columns of the plugins, see
+    update_ranking_scores().
 
     Includes soft-deleted plugins so they remain visible in listings until
     permanently deleted.
     """
 
-    def get_queryset(self):
-        return (
-            super(BasePluginManager, self)
-            .get_queryset()
-            .extra(
-                select={
-                    "average_vote": "rating_score / (rating_votes + 0.001)",
-                    "latest_version_date": (
-                        "SELECT created_on FROM plugins_pluginversion WHERE "
-                        "plugins_pluginversion.plugin_id = plugins_plugin.id "
-                        "AND approved = TRUE "
-                        "ORDER BY created_on DESC LIMIT 1"
-                    ),
-                    "weighted_rating": (
-                        "((rating_votes::FLOAT / (rating_votes + 5)) * "
-                        "(rating_score::FLOAT / (rating_votes + 0.001))) + "
-                        "((5::FLOAT / (rating_votes + 5)) * 3)"
-                    ),
-                }
-            )
-        )
+
+def approved_version_exists(**filters):
+    """
+    ``Exists`` subquery: True when the plugin has an approved version
+    matching filters.
+
+    A semi-join stops at the first matching version, unlike a join on the
+    versions which has to be deduplicated with DISTINCT.
+    """
+    return Exists(
+        PluginVersion.objects.filter(plugin=OuterRef("pk"), approved=True, **filters)
+    )
 
 
 class ApprovedPlugins(BasePluginManager):
@@ -72,8 +71,7 @@ class ApprovedPlugins(BasePluginManager):
         return (
             super(ApprovedPlugins, self)
             .get_queryset()
-            .filter(pluginversion__approved=True)
-            .distinct()
+            .filter(approved_version_exists())
         )
 
 
@@ -87,8 +85,7 @@ class StablePlugins(BasePluginManager):
         return (
             super(StablePlugins, self)
             .get_queryset()
-            .filter(pluginversion__approved=True, pluginversion__experimental=False)
-            .distinct()
+            .filter(approved_version_exists(experimental=False))
         )
 
 
@@ -102,8 +99,7 @@ class ExperimentalPlugins(BasePluginManager):
         return (
             super(ExperimentalPlugins, self)
             .get_queryset()
-            .filter(pluginversion__approved=True, pluginversion__experimental=True)
-            .distinct()
+            .filter(approved_version_exists(experimental=True))
         )
 
 
@@ -121,10 +117,12 @@ class NewQgisMajorVersionReadyPlugins(BasePluginManager):
             super(NewQgisMajorVersionReadyPlugins, self)
             .get_queryset()
             .filter(
-                pluginversion__approved=True,
-                pluginversion__max_qg_version__gte=f"{settings.NEW_QGIS_MAJOR_VERSION}.0",
+                approved_version_exists(
+                    max_qg_key__gte=qgis_version_key(
+                        f"{settings.NEW_QGIS_MAJOR_VERSION}.0"
+                    )
+                )
             )
-            .distinct()
             .order_by("-created_on")
         )
 
@@ -139,9 +137,8 @@ class FeaturedPlugins(BasePluginManager):
         return (
             super(FeaturedPlugins, self)
             .get_queryset()
-            .filter(pluginversion__approved=True, featured=True)
+            .filter(approved_version_exists(), featured=True)
             .order_by("-created_on")
-            .distinct()
         )
 
 
@@ -160,13 +157,12 @@ class FreshPlugins(BasePluginManager):
             super(FreshPlugins, self)
             .get_queryset()
             .filter(
+                approved_version_exists(),
                 deprecated=False,
-                pluginversion__approved=True,
                 created_on__gte=datetime.datetime.now()
                 - datetime.timedelta(days=self.days),
             )
             .order_by("-created_on")
-            .distinct()
         )
 
 
@@ -185,43 +181,45 @@ class LatestPlugins(BasePluginManager):
             super(LatestPlugins, self)
             .get_queryset()
             .filter(
-                deprecated=False,
-                pluginversion__approved=True,
-                pluginversion__created_on__gte=(
-                    datetime.datetime.now() - datetime.timedelta(days=self.days)
+                approved_version_exists(
+                    created_on__gte=(
+                        datetime.datetime.now() - datetime.timedelta(days=self.days)
+                    )
                 ),
+                deprecated=False,
             )
             .order_by("-latest_version_date")
-            .distinct()
         )
 
 
 class UnapprovedPlugins(BasePluginManager):
     """
     Shows only unapproved and not deprecated plugins
+
+    Like the feedback managers, latest_version_date is the date of the
+    latest version, approved or not.
     """
 
     def get_queryset(self):
         return (
             super(UnapprovedPlugins, self)
             .get_queryset()
-            .filter(pluginversion__approved=False, deprecated=False, is_deleted=False)
+            .filter(
+                Exists(
+                    PluginVersion.objects.filter(plugin=OuterRef("pk"), approved=False)
+                ),
+                deprecated=False,
+                is_deleted=False,
+            )
             .extra(
                 select={
-                    "average_vote": "rating_score / (rating_votes + 0.001)",
                     "latest_version_date": (
                         "SELECT created_on FROM plugins_pluginversion WHERE "
                         "plugins_pluginversion.plugin_id = plugins_plugin.id "
                         "ORDER BY created_on DESC LIMIT 1"
                     ),
-                    "weighted_rating": (
-                        "((rating_votes::FLOAT / (rating_votes + 5)) * "
-                        "(rating_score::FLOAT / (rating_votes + 0.001))) + "
-                        "((5::FLOAT / (rating_votes + 5)) * 3)"
-                    ),
                 }
             )
-            .distinct()
         )
 
 
@@ -231,12 +229,7 @@ class DeprecatedPlugins(BasePluginManager):
     """
 
     def get_queryset(self):
-        return (
-            super(DeprecatedPlugins, self)
-            .get_queryset()
-            .filter(deprecated=True)
-            .distinct()
-        )
+        return super(DeprecatedPlugins, self).get_queryset().filter(deprecated=True)
 
 
 class PopularPlugins(ApprovedPlugins):
@@ -249,13 +242,7 @@ class PopularPlugins(ApprovedPlugins):
             super(PopularPlugins, self)
             .get_queryset()
             .filter(deprecated=False)
-            .extra(
-                select={
-                    "popularity": "plugins_plugin.downloads * (1 + (rating_score/(rating_votes+0.01)/3))"
-                }
-            )
             .order_by("-popularity")
-            .distinct()
         )
 
 
@@ -270,7 +257,6 @@ class MostDownloadedPlugins(ApprovedPlugins):
             .get_queryset()
             .filter(deprecated=False)
             .order_by("-downloads")
-            .distinct()
         )
 
 
@@ -285,7 +271,6 @@ class MostVotedPlugins(ApprovedPlugins):
             .get_queryset()
             .filter(deprecated=False)
             .order_by("-rating_votes")
-            .distinct()
         )
 
 
@@ -300,7 +285,6 @@ class BestRatedPlugins(ApprovedPlugins):
             .get_queryset()
             .filter(deprecated=False)
             .order_by("-weighted_rating")
-            .distinct()
         )
 
 
@@ -313,8 +297,7 @@ class TaggablePlugins(TaggableManager):
         return (
             super(TaggablePlugins, self)
             .get_queryset()
-            .filter(deprecated=False, pluginversion__approved=True)
-            .distinct()
+            .filter(approved_version_exists(), deprecated=False)
         )
 
 
@@ -324,7 +307,7 @@ class ServerPlugins(ApprovedPlugins):
     """
 
     def get_queryset(self):
-        return super(ServerPlugins, self).get_queryset().filter(server=True).distinct()
+        return super(ServerPlugins, self).get_queryset().filter(server=True)
 
 
 def confirmed_email_exists():
@@ -348,194 +331,90 @@ def confirmed_email_exists():
     )
 
 
-class FeedbackCompletedPlugins(models.Manager):
-    """
-    Show only unapproved plugins with resolved feedbacks
-    Excludes soft-deleted plugins.
-    """
+# Filters of the review queues on the review state of the plugins, by name
+REVIEW_QUEUES = {
+    "completed": Q(
+        review_state__feedback_count__gt=0,
+        review_state__completed_feedback_count=F("review_state__feedback_count"),
+    ),
+    "received": Q(
+        review_state__feedback_count__gt=F("review_state__completed_feedback_count")
+    ),
+    "pending": Q(review_state__feedback_count=0),
+}
 
-    def get_queryset(self):
-        feedback_count_subquery = (
-            PluginVersionFeedback.objects.filter(
-                version=OuterRef("pluginversion"), is_completed=True
-            )
-            .values("version")
-            .annotate(completed_count=Count("id"))
-            .values("completed_count")
-        )
 
-        # Only consider plugins whose latest version is unapproved and all feedbacks are completed
-        latest_version_subquery = (
-            PluginVersion.objects.filter(plugin=OuterRef("pk"))
-            .order_by("-created_on")
-            .values("approved")[:1]
-        )
+class ReviewQueuePlugins(models.Manager):
+    """
+    Base manager of the review queues: the plugins whose latest version is
+    unapproved and not blocked, with a confirmed email.
+    Excludes soft-deleted and deprecated plugins.
 
-        # A blocked latest version must be fixed by the author before review
-        latest_version_status_subquery = (
-            PluginVersion.objects.filter(plugin=OuterRef("pk"))
-            .order_by("-created_on")
-            .values("validation_status")[:1]
-        )
+    The queues are read from the review state of the plugins, maintained by
+    update_review_states().
+    """
 
+    def get_queryset(self):
         return (
-            super(FeedbackCompletedPlugins, self)
+            super(ReviewQueuePlugins, self)
             .get_queryset()
-            .filter(is_deleted=False)
-            .annotate(
-                latest_version_approved=Subquery(latest_version_subquery),
-                latest_version_status=Subquery(latest_version_status_subquery),
-                has_confirmed_email=confirmed_email_exists(),
-            )
-            .filter(latest_version_approved=False, deprecated=False)
-            .filter(has_confirmed_email=True)
-            .exclude(latest_version_status=VALIDATION_STATUS_BLOCKED)
-            .annotate(
-                total_feedback_count=Count("pluginversion__feedback"),
-                completed_feedback_count=Subquery(feedback_count_subquery),
+            .filter(
+                deprecated=False,
+                is_deleted=False,
+                review_state__latest_version_approved=False,
+                review_state__email_confirmed=True,
             )
-            .filter(total_feedback_count=F("completed_feedback_count"))
+            .exclude(review_state__latest_version_status=VALIDATION_STATUS_BLOCKED)
             .extra(
                 select={
-                    "average_vote": "rating_score / (rating_votes + 0.001)",
                     "latest_version_date": (
-                        "SELECT created_on FROM plugins_pluginversion WHERE "
-                        "plugins_pluginversion.plugin_id = plugins_plugin.id "
-                        "ORDER BY created_on DESC LIMIT 1"
-                    ),
-                    "weighted_rating": (
-                        "((rating_votes::FLOAT / (rating_votes + 5)) * "
-                        "(rating_score::FLOAT / (rating_votes + 0.001))) + "
-                        "((5::FLOAT / (rating_votes + 5)) * 3)"
+                        "SELECT latest_version_date FROM plugins_pluginreviewstate "
+                        "WHERE plugins_pluginreviewstate.plugin_id = plugins_plugin.id"
                     ),
                 }
             )
-            .distinct()
         )
 
 
-class FeedbackReceivedPlugins(models.Manager):
+class FeedbackCompletedPlugins(ReviewQueuePlugins):
     """
-    Show only unapproved plugins with a pending feedback
+    Show only unapproved plugins with resolved feedbacks
     Excludes soft-deleted plugins.
     """
 
     def get_queryset(self):
-        latest_version = (
-            PluginVersion.objects.filter(plugin=OuterRef("pk"))
-            .order_by("-created_on")
-            .values("approved")[:1]
+        return (
+            super(FeedbackCompletedPlugins, self)
+            .get_queryset()
+            .filter(REVIEW_QUEUES["completed"])
         )
 
-        # A blocked latest version must be fixed by the author before review
-        latest_version_status = (
-            PluginVersion.objects.filter(plugin=OuterRef("pk"))
-            .order_by("-created_on")
-            .values("validation_status")[:1]
-        )
 
-        feedback_count_subquery = (
-            PluginVersionFeedback.objects.filter(
-                version=OuterRef("pluginversion"), is_completed=False
-            )
-            .values("version")
-            .annotate(received_count=Count("id"))
-            .values("received_count")
-        )
+class FeedbackReceivedPlugins(ReviewQueuePlugins):
+    """
+    Show only unapproved plugins with a pending feedback
+    Excludes soft-deleted plugins.
+    """
 
+    def get_queryset(self):
         return (
             super(FeedbackReceivedPlugins, self)
             .get_queryset()
-            .filter(
-                deprecated=False,
-                is_deleted=False,
-            )
-            .annotate(
-                latest_version_approved=Subquery(latest_version),
-                latest_version_status=Subquery(latest_version_status),
-                has_confirmed_email=confirmed_email_exists(),
-                received_feedback_count=Subquery(feedback_count_subquery),
-            )
-            .filter(
-                latest_version_approved=False,
-                received_feedback_count__gte=1,
-                has_confirmed_email=True,
-            )
-            .exclude(latest_version_status=VALIDATION_STATUS_BLOCKED)
-            .extra(
-                select={
-                    "average_vote": "rating_score / (rating_votes + 0.001)",
-                    "latest_version_date": (
-                        "SELECT created_on FROM plugins_pluginversion WHERE "
-                        "plugins_pluginversion.plugin_id = plugins_plugin.id "
-                        "ORDER BY created_on DESC LIMIT 1"
-                    ),
-                    "weighted_rating": (
-                        "((rating_votes::FLOAT / (rating_votes + 5)) * "
-                        "(rating_score::FLOAT / (rating_votes + 0.001))) + "
-                        "((5::FLOAT / (rating_votes + 5)) * 3)"
-                    ),
-                }
-            )
-            .distinct()
+            .filter(REVIEW_QUEUES["received"])
         )
 
 
-class FeedbackPendingPlugins(models.Manager):
+class FeedbackPendingPlugins(ReviewQueuePlugins):
     """
-    Show only unapproved plugins with a feedback
+    Show only unapproved plugins without feedback
     Excludes soft-deleted plugins.
     """
 
     def get_queryset(self):
-        latest_version = (
-            PluginVersion.objects.filter(plugin=OuterRef("pk"))
-            .order_by("-created_on")
-            .values("approved")[:1]
-        )
-
-        # A blocked latest version must be fixed by the author before review
-        latest_version_status = (
-            PluginVersion.objects.filter(plugin=OuterRef("pk"))
-            .order_by("-created_on")
-            .values("validation_status")[:1]
-        )
-
         return (
             super(FeedbackPendingPlugins, self)
             .get_queryset()
-            .filter(
-                deprecated=False,
-                is_deleted=False,
-            )
-            .annotate(
-                latest_version_approved=Subquery(latest_version),
-                latest_version_status=Subquery(latest_version_status),
-                has_confirmed_email=confirmed_email_exists(),
-                total_feedback_count=Count("pluginversion__feedback"),
-            )
-            .filter(
-                latest_version_approved=False,
-                total_feedback_count=0,
-                has_confirmed_email=True,
-            )
-            .exclude(latest_version_status=VALIDATION_STATUS_BLOCKED)
-            .extra(
-                select={
-                    "average_vote": "rating_score / (rating_votes + 0.001)",
-                    "latest_version_date": (
-                        "SELECT created_on FROM plugins_pluginversion WHERE "
-                        "plugins_pluginversion.plugin_id = plugins_plugin.id "
-                        "ORDER BY created_on DESC LIMIT 1"
-                    ),
-                    "weighted_rating": (
-                        "((rating_votes::FLOAT / (rating_votes + 5)) * "
-                        "(rating_score::FLOAT / (rating_votes + 0.001))) + "
-                        "((5::FLOAT / (rating_votes + 5)) * 3)"
-                    ),
-                }
-            )
-            .distinct()
+            .filter(REVIEW_QUEUES["pending"])
         )
 
 
@@ -613,10 +492,47 @@ class Plugin(models.Model):
     icon = models.ImageField(
         _("Icon"), blank=True, null=True, upload_to=PLUGINS_STORAGE_PATH
     )
+    # Read from the icon by the process_plugin_icon task when it changes
+    icon_valid = models.BooleanField(_("Valid icon"), default=False, editable=False)
+    icon_format = models.CharField(
+        _("Icon format"), max_length=16, blank=True, default="", editable=False
+    )
+    icon_width = models.PositiveIntegerField(
+        _("Icon width"), null=True, blank=True, editable=False
+    )
+    icon_height = models.PositiveIntegerField(
+        _("Icon height"), null=True, blank=True, editable=False
+    )
+    icon_thumbnails = models.JSONField(
+        _("Icon thumbnails"),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("The url, width and height of the thumbnails by geometry."),
+    )
 
     # downloads (soft trigger from versions)
     downloads = models.IntegerField(_("Downloads"), default=0, editable=False)
 
+    # Denormalized from the votes and downloads by update_ranking_scores()
+    average_vote = models.FloatField(
+        _("Average vote"), default=0, editable=False, db_index=True
+    )
+    weighted_rating = models.FloatField(
+        _("Weighted rating"),
+        help_text=_("Bayesian average of the votes"),
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    popularity = models.FloatField(
+        _("Popularity"),
+        help_text=_("Downloads weighted by the average vote"),
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+
     # Flags
     featured = models.BooleanField(_("Featured"), default=False, db_index=True)
     deprecated = models.BooleanField(_("Deprecated"), default=False, db_index=True)
@@ -649,6 +565,46 @@ class Plugin(models.Model):
         ),
     )
 
+    # Denormalized from the versions by update_version_pointers()
+    latest_version_date = models.DateTimeField(
+        _("Latest version date"),
+        help_text=_("Creation date of the most recent approved version"),
+        blank=True,
+        null=True,
+        editable=False,
+        db_index=True,
+    )
+    stable_version = models.ForeignKey(
+        "PluginVersion",
+        verbose_name=_("Stable version"),
+        related_name="+",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    experimental_version = models.ForeignKey(
+        "PluginVersion",
+        verbose_name=_("Experimental version"),
+        related_name="+",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    # Regardless of approval or blocked status: used to surface the security
+    # scan badge even when a plugin has no published stable/experimental
+    # version (e.g. blocked uploads)
+    latest_version = models.ForeignKey(
+        "PluginVersion",
+        verbose_name=_("Latest version"),
+        related_name="+",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
     # Managers
     objects = models.Manager()
     base_objects = BasePluginManager()
@@ -666,6 +622,7 @@ class Plugin(models.Model):
     most_voted_objects = MostVotedPlugins()
     best_rated_objects = BestRatedPlugins()
     server_objects = ServerPlugins()
+    review_queue_objects = ReviewQueuePlugins()
     feedback_completed_objects = FeedbackCompletedPlugins()
     feedback_received_objects = FeedbackReceivedPlugins()
     feedback_pending_objects = FeedbackPendingPlugins()
@@ -681,7 +638,7 @@ class Plugin(models.Model):
         """
         Returns True if the plugin has at least one approved version
         """
-        return self.pluginversion_set.filter(approved=True).count() > 0
+        return bool(self.stable_version_id or self.experimental_version_id)
 
     @property
     def is_email_confirmed(self) -> bool:
@@ -725,33 +682,22 @@ class Plugin(models.Model):
         """
         Returns the latest stable and approved version
         """
-        try:
-            return self.pluginversion_set.filter(
-                approved=True, experimental=False
-            ).order_by("-version")[0]
-        except:
-            return None
+        return self.stable_version
 
     @property
     def experimental(self):
         """
         Returns the latest experimental and approved version
         """
-        try:
-            return self.pluginversion_set.filter(
-                approved=True, experimental=True
-            ).order_by("-version")[0]
-        except:
-            return None
+        return self.experimental_version
 
-    @property
-    def latest_version(self):
+    def update_version_pointers(self):
         """
-        Returns the most recent version regardless of approval or blocked
-        status. Used to surface the security scan badge even when a plugin
-        has no published stable/experimental version (e.g. blocked uploads).
+        Recomputes latest_version_date and the version pointers of the
+        plugin, and reloads them
         """
-        return self.pluginversion_set.order_by("-version").first()
+        if update_version_pointers(Plugin.objects.filter(pk=self.pk)):
+            self.refresh_from_db(fields=PLUGIN_VERSION_POINTER_FIELDS)
 
     @property
     def editors(self):
@@ -782,6 +728,10 @@ class Plugin(models.Model):
 
     class Meta:
         ordering = ("name",)
+        indexes = [
+            # Most voted plugins
+            models.Index(fields=["rating_votes"], name="plugins_plugin_votes_idx"),
+        ]
         # ABP: Note: this permission should belong to the
         # PluginVersion class. I left it here because it
         # doesn't really matters where it is. Just be
@@ -873,6 +823,12 @@ class Plugin(models.Model):
         * updates modified_on if keep_date is not set
         * set maintainer to the plugin creator when not specified
         * invalidates unconfirmed email confirmations when email changes
+
+        The version pointers are maintained by the versions, the ranking
+        scores by update_ranking_scores() and the icon metadata by the
+        process_plugin_icon task, they are not written back from a possibly
+        outdated instance. A new icon resets its metadata until the task
+        has processed it.
         """
         if self.pk and not keep_date:
             import logging
@@ -884,11 +840,13 @@ class Plugin(models.Model):
         if not self.maintainer:
             self.maintainer = self.created_by
         email_changed = False
+        icon_changed = self._state.adding and bool(self.icon)
         if self.pk:
             try:
-                old_email = Plugin.objects.values_list("email", flat=True).get(
+                old_email, old_icon = Plugin.objects.values_list("email", "icon").get(
                     pk=self.pk
                 )
+                icon_changed = (old_icon or "") != (self.icon.name or "")
                 if old_email != self.email:
                     email_changed = True
                     # Remove this plugin from every *pending* confirmation that
@@ -903,7 +861,26 @@ class Plugin(models.Model):
                             conf.delete()
             except Plugin.DoesNotExist:
                 pass
+        if icon_changed:
+            self.icon_valid = False
+            self.icon_format = ""
+            self.icon_width = self.icon_height = None
+            self.icon_thumbnails = {}
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in PLUGIN_VERSION_POINTER_FIELDS
+                and field.name not in PLUGIN_RANKING_FIELDS
+                and (icon_changed or field.name not in PLUGIN_ICON_FIELDS)
+            ]
         super(Plugin, self).save(*args, **kwargs)
+        if icon_changed and self.icon:
+            # Inline import: the tasks import Plugin from this module
+            from plugins.tasks.process_plugin_icon import process_plugin_icon
+
+            transaction.on_commit(lambda: process_plugin_icon.delay(self.pk))
         if email_changed and self.email:
             # Inline import: trigger_email_confirmation imports Plugin from this module,
             # so a top-level import would create a circular dependency.
@@ -927,7 +904,7 @@ class ApprovedPluginVersions(models.Manager):
             super(ApprovedPluginVersions, self)
             .get_queryset()
             .filter(approved=True)
-            .order_by("-version")
+            .order_by("-version_key")
         )
 
 
@@ -1041,6 +1018,14 @@ class QGVersionZeroForcedField(models.CharField):
         return self.to_python(value)
 
 
+# The sort key of each version field of PluginVersion
+PLUGIN_VERSION_KEY_FIELDS = {
+    "version": "version_key",
+    "min_qg_version": "min_qg_key",
+    "max_qg_version": "max_qg_key",
+}
+
+
 class PluginOutstandingToken(models.Model):
     """
     Plugin outstanding token
@@ -1093,10 +1078,39 @@ class PluginVersion(models.Model):
         _("Maximum QGIS version"), max_length=32, null=True, blank=True, db_index=True
     )
     version = VersionField(_("Version"), max_length=32, db_index=True)
+    # Numeric sort keys of the versions, computed by set_version_keys() on
+    # pre_save, which loaddata sends as well
+    version_key = ArrayField(
+        models.IntegerField(), verbose_name=_("Version key"), editable=False
+    )
+    min_qg_key = ArrayField(
+        models.IntegerField(),
+        verbose_name=_("Minimum QGIS version key"),
+        editable=False,
+        db_index=True,
+    )
+    max_qg_key = ArrayField(
+        models.IntegerField(),
+        verbose_name=_("Maximum QGIS version key"),
+        editable=False,
+        db_index=True,
+    )
     changelog = models.TextField(_("Changelog"), null=True, blank=True)
 
     # the file!
     package = models.FileField(_("Plugin package"), upload_to=PLUGINS_STORAGE_PATH)
+    # Computed when the package is stored
+    package_sha256 = models.CharField(
+        _("Package SHA-256"),
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        editable=False,
+    )
+    package_size = models.PositiveBigIntegerField(
+        _("Package size"), blank=True, null=True, editable=False
+    )
     # Flags: checks on unique current/experimental are done in save() and possibly in the views
     experimental = models.BooleanField(
         _("Experimental flag"),
@@ -1205,7 +1219,60 @@ class PluginVersion(models.Model):
         if not self.max_qg_version:
             self.max_qg_version = "%s.99" % tuple(self.min_qg_version.split(".")[0])
 
-        super(PluginVersion, self).save(*args, **kwargs)
+        # The keys are computed by the pre_save signal
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {
+                key
+                for field, key in PLUGIN_VERSION_KEY_FIELDS.items()
+                if field in update_fields
+            }
+
+        # A stored package is locked until the version is committed, see
+        # delete_version_package()
+        with transaction.atomic():
+            if self.package and not self.package._committed:
+                self._store_package()
+            super(PluginVersion, self).save(*args, **kwargs)
+
+    def set_version_keys(self):
+        """
+        Computes the numeric sort keys of the version and the QGIS range,
+        an empty version getting the lowest key
+        """
+        max_qg_version = self.max_qg_version
+        if not max_qg_version and self.min_qg_version:
+            # As fixed by save()
+            max_qg_version = "%s.99" % self.min_qg_version.split(".")[0]
+        self.version_key = version_key(self.version) or []
+        self.min_qg_key = qgis_version_key(self.min_qg_version) or []
+        self.max_qg_key = qgis_version_key(max_qg_version) or []
+
+    def _store_package(self):
+        """
+        Stores a new package under its SHA-256, reusing the file of a
+        byte-identical package already stored.
+
+        The digest is computed by the upload handlers while the package is
+        received; packages not uploaded through a form are hashed here.
+        """
+        content = self.package.file
+        digest = getattr(content, "sha256", None)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in content.chunks():
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+        self.package_sha256 = digest
+        self.package_size = content.size
+
+        name = "%s/%s/%s.zip" % (PLUGINS_CONTENT_STORAGE_PATH, digest[:2], digest)
+        storage = self.package.storage
+        lock_package(name)
+        if not storage.exists(name):
+            name = storage.save(name, content)
+        self.package.name = name
+        self.package._committed = True
 
     def clean(self):
         """
@@ -1246,7 +1313,12 @@ class PluginVersion(models.Model):
 
     class Meta:
         unique_together = ("plugin", "version")
-        ordering = ("plugin", "-version", "experimental")
+        ordering = ("plugin", "-version_key", "experimental")
+        indexes = [
+            models.Index(
+                fields=["plugin", "-version_key"], name="plugins_pv_version_key_idx"
+            ),
+        ]
 
     def get_absolute_url(self):
         return reverse(
@@ -1306,6 +1378,8 @@ class PluginVersion(models.Model):
         if include_detail:
             data["changelog"] = self.changelog
             data["external_deps"] = self.external_deps
+            data["package_sha256"] = self.package_sha256
+            data["package_size"] = self.package_size
             if download_url is not None:
                 data["download_url"] = download_url
         if authorized:
@@ -1394,14 +1468,35 @@ class PluginVersionFeedbackAttachment(models.Model):
         return f"Attachment for {self.feedback}"
 
 
+def lock_package(name):
+    """
+    Locks a package file until the end of the transaction: the versions
+    sharing it are stored and deleted one at a time
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [name])
+
+
 def delete_version_package(sender, instance, **kw):
     """
-    Removes the zip package
+    Removes the zip package once the deletion is committed, unless another
+    version has the same content
     """
-    try:
-        os.remove(instance.package.path)
-    except:
-        pass
+    name = instance.package.name
+
+    def delete_package():
+        with transaction.atomic():
+            # Waits for the versions storing the same package
+            lock_package(name)
+            if PluginVersion.objects.filter(package=name).exists():
+                return
+            try:
+                os.remove(instance.package.path)
+            except:
+                pass
+
+    if name:
+        transaction.on_commit(delete_package)
 
 
 def delete_plugin_icon(sender, instance, **kw):
@@ -1442,6 +1537,637 @@ class PluginVersionDownload(models.Model):
             "country_code",
             "country_name",
         )
+        # Used by the download stats rollups
+        indexes = [models.Index(fields=["download_date"])]
+
+
+class PendingPluginVersionDownload(models.Model):
+    """
+    Plugin version download not counted yet
+
+    When PLUGIN_DOWNLOADS_FLUSH_INTERVAL is set, each download only inserts
+    one of these rows; the flush_plugin_downloads task periodically folds
+    them into the download counters and the PluginVersionDownload stats.
+    """
+
+    plugin_version = models.ForeignKey(PluginVersion, on_delete=models.CASCADE)
+    download_date = models.DateField(default=timezone.now)
+    country_code = models.CharField(max_length=3, default="N/D")
+    country_name = models.CharField(max_length=100, default="N/D")
+
+    class Meta:
+        verbose_name = _("Pending Plugin Version Download")
+        verbose_name_plural = _("Pending Plugin Version Downloads")
+
+
+class PluginDailyDownloads(models.Model):
+    """
+    Plugin downloads per day, rolled up from PluginVersionDownload by the
+    rollup_download_stats task
+    """
+
+    plugin = models.ForeignKey(Plugin, on_delete=models.CASCADE)
+    date = models.DateField()
+    downloads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("plugin", "date")
+        verbose_name = _("Plugin Daily Downloads")
+        verbose_name_plural = _("Plugin Daily Downloads")
+
+
+class PluginMonthlyDownloads(models.Model):
+    """
+    Plugin downloads per month, rolled up from PluginDailyDownloads by the
+    rollup_download_stats task
+    """
+
+    plugin = models.ForeignKey(Plugin, on_delete=models.CASCADE)
+    # First day of the month
+    month = models.DateField()
+    downloads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("plugin", "month")
+        verbose_name = _("Plugin Monthly Downloads")
+        verbose_name_plural = _("Plugin Monthly Downloads")
+
+
+class PluginCountryMonthlyDownloads(models.Model):
+    """
+    Plugin downloads per country and month, rolled up from
+    PluginVersionDownload by the rollup_download_stats task
+    """
+
+    plugin = models.ForeignKey(Plugin, on_delete=models.CASCADE)
+    # First day of the month
+    month = models.DateField()
+    country_code = models.CharField(max_length=3, default="N/D")
+    country_name = models.CharField(max_length=100, default="N/D")
+    downloads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("plugin", "month", "country_code", "country_name")
+        verbose_name = _("Plugin Country Monthly Downloads")
+        verbose_name_plural = _("Plugin Country Monthly Downloads")
+
+
+class CatalogueRevision(models.Model):
+    """
+    Revision stamp of the plugin repository catalogue
+
+    A single row bumped when the plugins or the plugin versions saved or
+    deleted by a transaction are committed. The XML feeds rendered from the
+    database derive their ETag and Last-Modified headers from it, so
+    conditional requests are answered without querying the plugins.
+    """
+
+    revision = models.PositiveBigIntegerField(_("Revision"), default=0)
+    modified_on = models.DateTimeField(_("Modified on"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Catalogue Revision")
+        verbose_name_plural = _("Catalogue Revisions")
+
+    def __str__(self):
+        return f"Catalogue revision {self.revision}"
+
+    @classmethod
+    def current(cls):
+        """
+        Returns the catalogue revision, None if it was never stamped
+        """
+        return cls.objects.filter(pk=1).first()
+
+    @classmethod
+    def bump(cls):
+        updated = cls.objects.filter(pk=1).update(
+            revision=F("revision") + 1, modified_on=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(pk=1, defaults={"revision": 1})
+
+
+def bump_catalogue_revision(sender, instance, **kw):
+    """
+    Marks the repository catalogue as changed once the transaction is
+    committed, so the writers do not queue on the revision row and a
+    rolled back change does not bump it
+    """
+    transaction.on_commit(CatalogueRevision.bump)
+
+
+class PluginTagStat(models.Model):
+    """
+    Number of approved plugins of a tag, read by the tag cloud
+
+    Maintained by update_tag_stats() when the tags of a plugin or its
+    approval change, the tags without approved plugin have no row.
+    """
+
+    tag = models.OneToOneField(
+        Tag,
+        verbose_name=_("Tag"),
+        related_name="plugin_stat",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    plugin_count = models.PositiveIntegerField(_("Approved plugins"), default=0)
+
+    class Meta:
+        verbose_name = _("Plugin Tag Stat")
+        verbose_name_plural = _("Plugin Tag Stats")
+
+    def __str__(self):
+        return f"{self.tag}: {self.plugin_count}"
+
+
+# Approved plugins by tag, the plugins being approved when they have a
+# stable or an experimental version. Upserted rather than deleted and
+# inserted again, which would race with the concurrent refreshes of the
+# same tags, the tags left without approved plugins are counted 0 and
+# deleted afterwards.
+TAG_STATS_SQL = """
+    INSERT INTO %(stat_table)s (tag_id, plugin_count)
+        SELECT t.id, COUNT(DISTINCT p.id)
+            FROM %(tag_table)s t
+            LEFT JOIN %(tagged_item_table)s ti
+                ON ti.tag_id = t.id
+                AND ti.content_type_id = %%(content_type_id)s
+            LEFT JOIN %(p_table)s p
+                ON p.id = ti.object_id
+                AND (p.stable_version_id IS NOT NULL
+                     OR p.experimental_version_id IS NOT NULL)
+            %(tag_filter)s
+            GROUP BY t.id
+        ON CONFLICT (tag_id) DO UPDATE SET plugin_count = EXCLUDED.plugin_count
+"""
+
+
+def update_tag_stats(tag_ids: Optional[Iterable[int]] = None):
+    """
+    Recomputes the approved plugin count of the tags tag_ids, of all the
+    tags without tag_ids.
+    """
+    if tag_ids is not None:
+        tag_ids = list(tag_ids)
+        if not tag_ids:
+            return
+    tables = {
+        "stat_table": PluginTagStat._meta.db_table,
+        "tag_table": Tag._meta.db_table,
+        "tagged_item_table": TaggedItem._meta.db_table,
+        "p_table": Plugin._meta.db_table,
+        "tag_filter": "",
+    }
+    empty_stats = PluginTagStat.objects.filter(plugin_count=0)
+    if tag_ids is not None:
+        tables["tag_filter"] = "WHERE t.id = ANY(%(tag_ids)s)"
+        empty_stats = empty_stats.filter(tag_id__in=tag_ids)
+    params = {
+        "content_type_id": ContentType.objects.get_for_model(Plugin).pk,
+        "tag_ids": tag_ids,
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(TAG_STATS_SQL % tables, params)
+        empty_stats.delete()
+
+
+def refresh_tag_stats(sender, instance, action, reverse, **kw):
+    """
+    Keeps the tag stats up to date when tags are added to or removed from
+    a plugin
+    """
+    if reverse or not isinstance(instance, Plugin):
+        return
+    if action == "pre_clear":
+        instance._cleared_tag_ids = list(instance.tags.values_list("pk", flat=True))
+    elif action == "post_clear":
+        update_tag_stats(getattr(instance, "_cleared_tag_ids", None) or [])
+    elif action in ("post_add", "post_remove"):
+        update_tag_stats(kw["pk_set"])
+
+
+def refresh_plugin_tag_stats(sender, instance, **kw):
+    """
+    Keeps the tag stats up to date when a version change may have approved
+    or unapproved its plugin
+    """
+    # The plugin is approved as long as one of its versions is, only the
+    # approval or the unapproval of a version can change that
+    if "created" in kw:
+        if instance.approved == bool(getattr(instance, "_stored_state", None)):
+            return
+    elif not instance.approved:
+        return
+    update_tag_stats(
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Plugin),
+            object_id=instance.plugin_id,
+        ).values_list("tag_id", flat=True)
+    )
+
+
+def remember_plugin_tags(sender, instance, **kw):
+    # The tagged items are deleted along with the plugin
+    instance._deleted_tag_ids = list(instance.tags.values_list("pk", flat=True))
+
+
+def refresh_deleted_plugin_tag_stats(sender, instance, **kw):
+    update_tag_stats(getattr(instance, "_deleted_tag_ids", None) or [])
+
+
+class PluginReviewState(models.Model):
+    """
+    Review state of a plugin, read by the review queues and their menu
+    badges
+
+    Maintained by update_review_states() when the versions, the feedbacks
+    or the email confirmations of the plugin change.
+    """
+
+    plugin = models.OneToOneField(
+        Plugin,
+        verbose_name=_("Plugin"),
+        related_name="review_state",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    latest_version = models.ForeignKey(
+        "PluginVersion",
+        verbose_name=_("Latest version"),
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    latest_version_date = models.DateTimeField(
+        _("Latest version uploaded on"), null=True, blank=True
+    )
+    latest_version_approved = models.BooleanField(
+        _("Latest version approved"), null=True
+    )
+    latest_version_status = models.CharField(
+        _("Latest version validation status"),
+        max_length=25,
+        choices=VALIDATION_STATUS_CHOICES,
+        blank=True,
+        null=True,
+    )
+    feedback_count = models.PositiveIntegerField(_("Feedbacks"), default=0)
+    completed_feedback_count = models.PositiveIntegerField(
+        _("Completed feedbacks"), default=0
+    )
+    email_confirmed = models.BooleanField(_("Email confirmed"), default=False)
+
+    class Meta:
+        verbose_name = _("Plugin Review State")
+        verbose_name_plural = _("Plugin Review States")
+
+    def __str__(self):
+        return f"{self.plugin}: {self.completed_feedback_count}/{self.feedback_count}"
+
+
+def update_review_states(plugins, create: bool = False) -> int:
+    """
+    Recomputes the review state of a queryset of plugins in a single
+    UPDATE, returns the number of states updated.
+
+    The missing states are only created with create: the handlers do not
+    create them, they also run while a plugin is deleted.
+    """
+    if create:
+        PluginReviewState.objects.bulk_create(
+            [
+                PluginReviewState(plugin_id=pk)
+                for pk in plugins.filter(review_state__isnull=True).values_list(
+                    "pk", flat=True
+                )
+            ],
+            ignore_conflicts=True,
+        )
+    versions = PluginVersion.objects.filter(plugin=OuterRef("plugin")).order_by(
+        "-created_on"
+    )
+    feedbacks = (
+        PluginVersionFeedback.objects.filter(version__plugin=OuterRef("plugin"))
+        .order_by()
+        .values("version__plugin")
+    )
+    return PluginReviewState.objects.filter(plugin__in=plugins.values("pk")).update(
+        latest_version=Subquery(versions.values("pk")[:1]),
+        latest_version_date=Subquery(versions.values("created_on")[:1]),
+        latest_version_approved=Subquery(versions.values("approved")[:1]),
+        latest_version_status=Subquery(versions.values("validation_status")[:1]),
+        feedback_count=Coalesce(
+            Subquery(feedbacks.annotate(count=Count("pk")).values("count")), 0
+        ),
+        completed_feedback_count=Coalesce(
+            Subquery(
+                feedbacks.filter(is_completed=True)
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        ),
+        email_confirmed=Exists(
+            Plugin.objects.filter(confirmed_email_exists(), pk=OuterRef("plugin"))
+        ),
+    )
+
+
+def review_queue_counts() -> dict:
+    """
+    Returns the number of plugins of each review queue, by queue name, read
+    in a single query
+    """
+    return Plugin.review_queue_objects.order_by().aggregate(
+        **{
+            name: Count("pk", filter=queue_filter)
+            for name, queue_filter in REVIEW_QUEUES.items()
+        }
+    )
+
+
+def create_review_state(sender, instance, created, **kw):
+    """
+    Creates the review state of a new plugin, and keeps it up to date when
+    the email of a plugin changes
+    """
+    update_review_states(Plugin.objects.filter(pk=instance.pk), create=created)
+
+
+def refresh_version_review_state(sender, instance, **kw):
+    """
+    Keeps the review state of a plugin up to date when one of its versions
+    is uploaded, approved, unapproved or deleted
+    """
+    update_review_states(Plugin.objects.filter(pk=instance.plugin_id))
+
+
+def refresh_feedback_review_state(sender, instance, **kw):
+    """
+    Keeps the review state of a plugin up to date when a feedback is
+    created, completed or deleted
+    """
+    update_review_states(Plugin.objects.filter(pluginversion=instance.version_id))
+
+
+def refresh_email_review_states(sender, instance, **kw):
+    """
+    Keeps the review state of the plugins of an email address up to date
+    when its confirmations change
+    """
+    update_review_states(Plugin.objects.filter(email=instance.email))
+
+
+CURRENT_TRANSACTION_ID_SQL = "pg_current_xact_id()::text::bigint"
+
+# The oldest transaction in progress, the current one excluded so that it
+# reads its own changes, or the next transaction id when there is none
+REVISION_SQL = """
+    SELECT COALESCE(
+        (SELECT MIN(xip::text::bigint)
+            FROM pg_snapshot_xip(snapshot) xip
+            WHERE xip IS DISTINCT FROM pg_current_xact_id_if_assigned()),
+        pg_snapshot_xmax(snapshot)::text::bigint
+    )
+    FROM pg_current_snapshot() snapshot
+"""
+
+
+class PluginVersionChange(models.Model):
+    """
+    Append-only log of the changes of the plugin versions published in the
+    repository, read by the incremental plugins_changes.xml feed.
+
+    The plugin and the version are kept as plain references, so the entries
+    of deleted versions remain in the log.
+
+    The entries are inserted by the transactions making the changes, which
+    commit in any order: they are read by the id of their transaction, up
+    to the oldest transaction still in progress (see latest_revision()).
+    """
+
+    class Action(models.TextChoices):
+        APPROVED = "approved", _("Approved")
+        UPDATED = "updated", _("Updated")
+        UNAPPROVED = "unapproved", _("Unapproved")
+        DELETED = "deleted", _("Deleted")
+        SOFT_DELETED = "soft_deleted", _("Soft deleted")
+        RESTORED = "restored", _("Restored")
+
+    plugin = models.ForeignKey(
+        Plugin,
+        verbose_name=_("Plugin"),
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    plugin_version = models.ForeignKey(
+        PluginVersion,
+        verbose_name=_("Plugin Version"),
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    package_name = models.CharField(_("Package Name"), max_length=256)
+    version = models.CharField(_("Version"), max_length=32)
+    action = models.CharField(_("Action"), max_length=16, choices=Action.choices)
+    created_on = models.DateTimeField(_("Created on"), auto_now_add=True)
+    transaction_id = models.BigIntegerField(
+        _("Transaction"), editable=False, db_index=True
+    )
+
+    class Meta:
+        verbose_name = _("Plugin Version Change")
+        verbose_name_plural = _("Plugin Version Changes")
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"{self.package_name} {self.version} {self.action}"
+
+    @classmethod
+    def log(cls, plugin_version, action):
+        return cls.objects.create(
+            plugin_id=plugin_version.plugin_id,
+            plugin_version_id=plugin_version.pk,
+            package_name=plugin_version.plugin.package_name,
+            version=plugin_version.version,
+            action=action,
+            transaction_id=RawSQL(CURRENT_TRANSACTION_ID_SQL, ()),
+        )
+
+    @classmethod
+    def latest_revision(cls) -> int:
+        """
+        Returns the revision token: the changes made by the transactions
+        whose id is lower are all committed, or rolled back.
+
+        The ids of the transactions are assigned in start order, those
+        still in progress when the token is read are above it, so their
+        changes are listed since this token once they are committed.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(REVISION_SQL)
+            return cursor.fetchone()[0]
+
+
+def set_version_keys(sender, instance, **kw):
+    """
+    Computes the sort keys of a version before it is saved, loaded from a
+    fixture included
+    """
+    instance.set_version_keys()
+
+
+def remember_stored_state(sender, instance, **kw):
+    """
+    Keeps the stored publication flags of a plugin or a version, to tell
+    in post_save what changed
+    """
+    field = "approved" if sender is PluginVersion else "is_deleted"
+    instance._stored_state = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+def log_plugin_version_save(sender, instance, created, **kw):
+    """
+    Logs the approval, unapproval and update of the published versions
+    """
+    was_approved = getattr(instance, "_stored_state", None)
+    if instance.approved:
+        action = (
+            PluginVersionChange.Action.UPDATED
+            if was_approved
+            else PluginVersionChange.Action.APPROVED
+        )
+        PluginVersionChange.log(instance, action)
+    elif was_approved:
+        PluginVersionChange.log(instance, PluginVersionChange.Action.UNAPPROVED)
+
+
+def log_plugin_version_delete(sender, instance, **kw):
+    if instance.approved:
+        PluginVersionChange.log(instance, PluginVersionChange.Action.DELETED)
+
+
+PLUGIN_VERSION_POINTER_FIELDS = (
+    "latest_version_date",
+    "stable_version",
+    "experimental_version",
+    "latest_version",
+)
+
+
+def update_version_pointers(plugins) -> int:
+    """
+    Recomputes latest_version_date and the version pointers of a queryset
+    of plugins in a single UPDATE, returns the number of plugins updated
+    """
+    versions = PluginVersion.objects.filter(plugin=OuterRef("pk"))
+    approved_versions = versions.filter(approved=True)
+    return plugins.update(
+        latest_version_date=Subquery(
+            approved_versions.order_by("-created_on").values("created_on")[:1]
+        ),
+        stable_version=Subquery(
+            approved_versions.filter(experimental=False)
+            .order_by("-version_key")
+            .values("pk")[:1]
+        ),
+        experimental_version=Subquery(
+            approved_versions.filter(experimental=True)
+            .order_by("-version_key")
+            .values("pk")[:1]
+        ),
+        latest_version=Subquery(versions.order_by("-version_key").values("pk")[:1]),
+    )
+
+
+def refresh_version_pointers(sender, instance, **kw):
+    """
+    Keeps the version pointers of the plugin up to date when one of its
+    versions is saved, approved, unapproved or deleted
+    """
+    if PluginVersion.plugin.is_cached(instance):
+        instance.plugin.update_version_pointers()
+    else:
+        update_version_pointers(Plugin.objects.filter(pk=instance.plugin_id))
+
+
+PLUGIN_RANKING_FIELDS = ("average_vote", "weighted_rating", "popularity")
+
+PLUGIN_ICON_FIELDS = (
+    "icon_valid",
+    "icon_format",
+    "icon_width",
+    "icon_height",
+    "icon_thumbnails",
+)
+
+
+def ranking_scores(downloads=F("downloads")) -> dict:
+    """
+    Returns the expressions of the ranking scores of a plugin, by field name.
+
+    * average_vote is the simple average rating.
+    * weighted_rating is the Bayesian average of the votes, which mitigates
+      the effect of low vote counts.
+    * popularity is the number of downloads weighted by the average vote,
+      downloads can be replaced by the expression of its updated value.
+    """
+    votes = Cast("rating_votes", models.FloatField())
+    score = Cast("rating_score", models.FloatField())
+    return {
+        "average_vote": score / (votes + 0.001),
+        "weighted_rating": (
+            votes / (votes + 5) * (score / (votes + 0.001)) + 5.0 / (votes + 5) * 3
+        ),
+        "popularity": downloads * (1 + score / (votes + 0.01) / 3),
+    }
+
+
+def update_ranking_scores(plugins) -> int:
+    """
+    Recomputes the ranking scores of a queryset of plugins in a single
+    UPDATE, returns the number of plugins updated.
+
+    Only the plugins whose scores changed are written.
+    """
+    scores = ranking_scores()
+    outdated = plugins.alias(
+        **{f"new_{name}": score for name, score in scores.items()}
+    ).exclude(**{name: F(f"new_{name}") for name in scores})
+    return outdated.update(**scores)
+
+
+def refresh_ranking_scores(sender, instance, **kw):
+    """
+    Keeps the ranking scores of a plugin up to date when it is saved, which
+    is also how djangoratings records the votes
+    """
+    update_ranking_scores(Plugin.objects.filter(pk=instance.pk))
+
+
+def log_plugin_soft_delete(sender, instance, created, **kw):
+    """
+    Logs the published versions of a plugin when it is soft deleted or
+    restored
+    """
+    was_deleted = getattr(instance, "_stored_state", None)
+    if created or was_deleted is None or was_deleted == instance.is_deleted:
+        return
+    action = (
+        PluginVersionChange.Action.SOFT_DELETED
+        if instance.is_deleted
+        else PluginVersionChange.Action.RESTORED
+    )
+    for plugin_version in instance.pluginversion_set.filter(approved=True):
+        PluginVersionChange.log(plugin_version, action)
 
 
 class SecurityRule(models.Model):
@@ -1670,6 +2396,35 @@ models.signals.post_delete.connect(delete_plugin_icon, sender=Plugin)
 models.signals.post_delete.connect(
     delete_feedback_attachment, sender=PluginVersionFeedbackAttachment
 )
+models.signals.post_save.connect(bump_catalogue_revision, sender=Plugin)
+models.signals.post_delete.connect(bump_catalogue_revision, sender=Plugin)
+models.signals.post_save.connect(bump_catalogue_revision, sender=PluginVersion)
+models.signals.post_delete.connect(bump_catalogue_revision, sender=PluginVersion)
+models.signals.pre_save.connect(set_version_keys, sender=PluginVersion)
+models.signals.pre_save.connect(remember_stored_state, sender=Plugin)
+models.signals.pre_save.connect(remember_stored_state, sender=PluginVersion)
+models.signals.post_save.connect(log_plugin_version_save, sender=PluginVersion)
+models.signals.post_delete.connect(log_plugin_version_delete, sender=PluginVersion)
+models.signals.post_save.connect(log_plugin_soft_delete, sender=Plugin)
+models.signals.post_save.connect(refresh_version_pointers, sender=PluginVersion)
+models.signals.post_delete.connect(refresh_version_pointers, sender=PluginVersion)
+models.signals.post_save.connect(refresh_ranking_scores, sender=Plugin)
+# After refresh_version_pointers: the approval of the plugins is read from
+# the version pointers
+models.signals.post_save.connect(refresh_plugin_tag_stats, sender=PluginVersion)
+models.signals.post_delete.connect(refresh_plugin_tag_stats, sender=PluginVersion)
+models.signals.m2m_changed.connect(refresh_tag_stats, sender=Plugin.tags.through)
+models.signals.pre_delete.connect(remember_plugin_tags, sender=Plugin)
+models.signals.post_delete.connect(refresh_deleted_plugin_tag_stats, sender=Plugin)
+models.signals.post_save.connect(create_review_state, sender=Plugin)
+models.signals.post_save.connect(refresh_version_review_state, sender=PluginVersion)
+models.signals.post_delete.connect(refresh_version_review_state, sender=PluginVersion)
+models.signals.post_save.connect(
+    refresh_feedback_review_state, sender=PluginVersionFeedback
+)
+models.signals.post_delete.connect(
+    refresh_feedback_review_state, sender=PluginVersionFeedback
+)
 
 
 PLUGIN_EMAIL_CONFIRMATION_EXPIRY_DAYS = getattr(
@@ -1841,6 +2596,14 @@ class PluginEmailConfirmation(models.Model):
         return confirmation
 
 
+models.signals.post_save.connect(
+    refresh_email_review_states, sender=PluginEmailConfirmation
+)
+models.signals.post_delete.connect(
+    refresh_email_review_states, sender=PluginEmailConfirmation
+)
+
+
 class PluginEmailConfirmationError(models.Model):
     """
     Records a failed attempt to send a confirmation email.
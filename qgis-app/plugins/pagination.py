@@ -0,0 +1,220 @@
+"""
+Keyset (cursor) pagination of the plugin listings.
+
+An OFFSET page makes the database compute and throw away every row before
+it. A keyset page starts right after the (sort key, id) of the last row of
+the previous page instead, so it costs the same however deep the client
+pages. The cursors are opaque tokens carrying that position.
+"""
+
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+# Below this number of rows, the planner estimate is replaced by an exact count
+PLUGINS_LIST_EXACT_COUNT_THRESHOLD = getattr(
+    settings, "PLUGINS_LIST_EXACT_COUNT_THRESHOLD", 10000
+)
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def keyset_sort_key(queryset, sort_by: str = None):
+    """
+    Returns the expression a queryset can be paginated on for sort_by (a
+    field or an extra select, prefixed with "-" for a descending order),
+    or None if it cannot be used as a keyset.
+
+    Without sort_by, the first ordering of the queryset is used.
+    """
+    if sort_by is None:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if not ordering or not isinstance(ordering[0], str):
+            return None
+        sort_by = ordering[0]
+    name = sort_by.lstrip("-")
+    if name in queryset.query.extra_select:
+        sql, params = queryset.query.extra_select[name]
+        try:
+            output_field = queryset.model._meta.get_field(name).__class__()
+        except FieldDoesNotExist:
+            # The scores computed by the plugin managers
+            return Cast(RawSQL(sql, params), output_field=FloatField())
+        return RawSQL(sql, params, output_field=output_field)
+    try:
+        field = queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.is_relation or not field.concrete:
+        return None
+    return F(name)
+
+
+def _json_default(value):
+    # Unlike DjangoJSONEncoder, keeps the microseconds: the cursor must
+    # compare equal to the key it was read from
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_cursor(value, pk, backward: bool = False) -> str:
+    data = json.dumps([value, pk, backward], default=_json_default)
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Returns the (value, pk, backward) position of a cursor.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, pk, backward = json.loads(data)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(pk, int) or not isinstance(backward, bool):
+        raise InvalidCursor("Invalid cursor")
+    return value, pk, backward
+
+
+def _after(value, pk, descending: bool, nulls_last: bool) -> Q:
+    """
+    Filters the rows sorted after (value, pk) by (keyset_key, pk), both
+    descending or ascending, the null keys last or first
+    """
+    lookup = "lt" if descending else "gt"
+    if value is None:
+        after = Q(keyset_key__isnull=True, **{f"pk__{lookup}": pk})
+        if not nulls_last:
+            after |= Q(keyset_key__isnull=False)
+        return after
+    after = Q(**{f"keyset_key__{lookup}": value}) | Q(
+        keyset_key=value, **{f"pk__{lookup}": pk}
+    )
+    if nulls_last:
+        after |= Q(keyset_key__isnull=True)
+    return after
+
+
+def estimated_count(queryset) -> tuple:
+    """
+    Returns the number of rows of a queryset and whether it is the planner
+    estimate rather than an exact count.
+
+    Counting a large result set costs about as much as reading it, the
+    planner estimate is used above PLUGINS_LIST_EXACT_COUNT_THRESHOLD rows.
+    """
+    if connection.vendor == "postgresql":
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate >= PLUGINS_LIST_EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return queryset.count(), False
+
+
+class KeysetPaginator:
+    """
+    Stands for the Django Paginator of a keyset page in the list templates
+    """
+
+    def __init__(self, queryset, per_page: int):
+        self.queryset = queryset
+        self.per_page = per_page
+        self._count = None
+
+    def _get_count(self):
+        if self._count is None:
+            self._count = estimated_count(self.queryset)
+        return self._count
+
+    @property
+    def count(self) -> int:
+        return self._get_count()[0]
+
+    @property
+    def count_is_estimate(self) -> bool:
+        return self._get_count()[1]
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+def keyset_page(queryset, per_page: int, cursor: str = None, sort_by: str = None):
+    """
+    Returns the page of per_page rows of queryset following the position of
+    cursor, the first page without cursor.
+
+    The rows are sorted by sort_by (by default the first ordering of the
+    queryset) then by id, the rows without sort key last.
+
+    Raises InvalidCursor if the cursor is malformed or the queryset cannot
+    be paginated on sort_by.
+    """
+    key = keyset_sort_key(queryset, sort_by)
+    if key is None:
+        raise InvalidCursor("This ordering cannot be paginated with a cursor")
+    if sort_by is None:
+        sort_by = (queryset.query.order_by or queryset.model._meta.ordering)[0]
+    descending = sort_by.startswith("-")
+    paginator = KeysetPaginator(queryset, per_page)
+
+    value, pk, backward = decode_cursor(cursor) if cursor else (None, None, False)
+    # A backward page is read in the reverse order, from the cursor
+    page_descending = descending != backward
+    nulls_last = not backward
+    key_order = F("keyset_key").desc if page_descending else F("keyset_key").asc
+    qs = queryset.annotate(keyset_key=key).order_by(
+        key_order(nulls_last=True) if nulls_last else key_order(nulls_first=True),
+        "-pk" if page_descending else "pk",
+    )
+    if cursor:
+        qs = qs.filter(_after(value, pk, page_descending, nulls_last))
+    rows = list(qs[: per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+
+    next_cursor = previous_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if more or backward:
+            next_cursor = encode_cursor(last.keyset_key, last.pk)
+        if (more and backward) or (cursor and not backward):
+            previous_cursor = encode_cursor(first.keyset_key, first.pk, True)
+    return KeysetPage(rows, paginator, next_cursor, previous_cursor)
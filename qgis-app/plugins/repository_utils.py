@@ -0,0 +1,697 @@
+"""
+Helpers to build the plugin repository feed (plugins.xml) in-process.
+
+The feed is serialized by a generator yielding one ``<pyqgis_plugin>``
+element at a time, which is used both to stream the XML views and to write
+the cached ``cached_xmls/plugins_<version>.xml`` snapshots rendered
+straight from the database by the ``generate_plugins_xml`` task. Each
+snapshot is written along with pre-compressed ``.gz`` (and ``.br`` when
+brotli is installed) siblings, served as they are to the clients that
+accept them.
+
+The same plugin versions are also published as a compact JSON catalogue
+(plugins.json), built from the ``to_json()`` representations of the models.
+
+Snapshots are stored by content hash under ``cached_xmls/objects`` and the
+``plugins_<version>.xml`` and ``plugins_<version>.json`` files are symlinks
+to them, so QGIS versions with identical feeds share a single file.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import ExitStack, closing, nullcontext
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from functools import wraps
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import FileResponse, HttpRequest
+from django.template.loader import get_template
+from django.templatetags.static import static
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.html import escape
+from django.views.decorators.http import condition
+from plugins.models import CatalogueRevision, Plugin, PluginVersion, PluginVersionChange
+from plugins.version_keys import qgis_version_range
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CACHED_XMLS_FOLDER = "cached_xmls"
+SNAPSHOT_OBJECTS_FOLDER = "objects"
+# Seconds a snapshot stays stored once unlinked, for the requests that
+# resolved the link just before it was swapped
+SNAPSHOT_PRUNE_GRACE = getattr(settings, "PLUGINS_SNAPSHOT_PRUNE_GRACE", 600)
+
+# Content-Encoding and file suffix of the pre-compressed snapshots,
+# by order of preference
+SNAPSHOT_ENCODINGS = {"gzip": ".gz"}
+if brotli is not None:
+    SNAPSHOT_ENCODINGS = {"br": ".br", **SNAPSHOT_ENCODINGS}
+
+PLUGINS_XML_HEADER = (
+    "<?xml version = '1.0' encoding = 'UTF-8'?>\n"
+    '<?xml-stylesheet type="text/xsl" href="%s" ?>\n'
+    "<plugins>\n    "
+)
+PLUGINS_XML_FOOTER = "\n</plugins>\n"
+PLUGINS_CHANGES_XML_HEADER = (
+    "<?xml version = '1.0' encoding = 'UTF-8'?>\n" '<plugins revision="%s">\n    '
+)
+WITHDRAWN_PLUGIN_XML = '<withdrawn_plugin plugin_id="%s" package_name="%s"/>'
+PLUGINS_XML_CHUNK_SIZE = 500
+
+
+def qgis_version_bounds(request_version: str) -> tuple:
+    """
+    Returns the ``(lowest, highest)`` QGIS version keys matched by the
+    ``qgis`` parameter of the XML views: a version is compatible when its
+    ``max_qg_key`` is >= lowest and its ``min_qg_key`` <= highest. Both are
+    None for an empty version, which matches no version.
+    """
+    return qgis_version_range(request_version)
+
+
+def get_trusted_user_ids() -> set:
+    """
+    Returns the ids of the users whose uploads are flagged as trusted in the
+    feed: superusers and users with the plugins.can_approve permission.
+    """
+    return set(
+        User.objects.filter(
+            Q(
+                user_permissions__codename="can_approve",
+                user_permissions__content_type__app_label="plugins",
+            )
+            | Q(is_superuser=True)
+        ).values_list("id", flat=True)
+    )
+
+
+def latest_plugin_versions(version_filters: dict, stable_only: bool = False):
+    """
+    Returns the versions listed in the legacy plugins.xml: for each plugin,
+    its highest approved stable version matching version_filters and, unless
+    stable_only, its highest approved experimental one.
+
+    The versions are ordered like the former per-plugin loop (by plugin
+    name, stable before experimental) and picked with a single DISTINCT ON
+    query; plugins, authors and tags are loaded alongside, so the number of
+    queries does not grow with the catalogue. Rows are fetched in chunks as
+    the returned iterator is consumed.
+    """
+    trusted_user_ids = get_trusted_user_ids()
+    qs = PluginVersion.objects.filter(approved=True, **version_filters)
+    if stable_only:
+        qs = qs.filter(experimental=False)
+    qs = (
+        qs.select_related("plugin__created_by", "created_by")
+        .prefetch_related("plugin__tags")
+        .order_by("plugin__name", "experimental", "-version_key")
+        .distinct("plugin__name", "experimental")
+    )
+    for version in qs.iterator(chunk_size=PLUGINS_XML_CHUNK_SIZE):
+        # The legacy feed trusts the plugin creator, not the version uploader
+        version.is_trusted = version.plugin.created_by_id in trusted_user_ids
+        yield version
+
+
+def published_plugin_versions(
+    request_version: str, plugin_ids=None, stable_only: bool = False
+) -> list:
+    """
+    Returns the versions listed in plugins_new.xml for the given QGIS
+    version, restricted to plugin_ids when given: for each plugin, its
+    highest compatible approved stable version and, unless stable_only, its
+    highest compatible approved experimental one. Stable versions come
+    first, each group ordered by plugin id.
+    """
+    lowest, highest = qgis_version_bounds(request_version)
+    if lowest is None:
+        return []
+    trusted_user_ids = get_trusted_user_ids()
+    qs = PluginVersion.objects.filter(
+        approved=True, max_qg_key__gte=lowest, min_qg_key__lte=highest
+    )
+    if plugin_ids is not None:
+        qs = qs.filter(plugin_id__in=plugin_ids)
+    if stable_only:
+        qs = qs.filter(experimental=False)
+    qs = (
+        qs.select_related("plugin__created_by", "created_by")
+        .prefetch_related("plugin__tags")
+        .order_by("experimental", "plugin_id", "-version_key")
+        .distinct("experimental", "plugin_id")
+    )
+    object_list = list(qs)
+    for version in object_list:
+        version.is_trusted = version.created_by_id in trusted_user_ids
+    return object_list
+
+
+def plugin_changes(since: int, request_version: str, stable_only: bool = False):
+    """
+    Returns the changes of the plugins since the given revision token, as
+    a tuple (revision, object_list, withdrawn):
+
+    * revision: the token to send for the next changes
+    * object_list: the versions now listed in plugins_new.xml for every
+      plugin changed since the token, which replace the plugin entries
+    * withdrawn: (plugin_id, package_name) of the plugins changed since
+      the token that are no longer listed
+
+    Without token, every listed version is returned.
+    """
+    revision = PluginVersionChange.latest_revision()
+    if since is None:
+        return (
+            revision,
+            published_plugin_versions(request_version, None, stable_only),
+            [],
+        )
+
+    package_names = dict(
+        PluginVersionChange.objects.filter(
+            transaction_id__gte=since, transaction_id__lt=revision
+        )
+        .order_by("id")
+        .values_list("plugin_id", "package_name")
+    )
+    object_list = published_plugin_versions(
+        request_version, list(package_names), stable_only
+    )
+    listed_plugin_ids = {version.plugin_id for version in object_list}
+    withdrawn = [
+        (plugin_id, package_name)
+        for plugin_id, package_name in sorted(package_names.items())
+        if plugin_id not in listed_plugin_ids
+    ]
+    return revision, object_list, withdrawn
+
+
+def iter_plugins_changes_xml(revision, object_list, withdrawn, request):
+    """
+    Yields the plugins_changes.xml feed piece by piece: the plugins listed
+    in object_list as in plugins.xml, then a <withdrawn_plugin> element for
+    each withdrawn plugin.
+    """
+    template = get_template("plugins/plugins_xml_plugin.xml")
+    yield PLUGINS_CHANGES_XML_HEADER % revision
+    for version in object_list:
+        yield template.render({"version": version, "request": request})
+    for plugin_id, package_name in withdrawn:
+        yield WITHDRAWN_PLUGIN_XML % (plugin_id, escape(package_name))
+    yield PLUGINS_XML_FOOTER
+
+
+def _get_catalogue_revision(request):
+    # The ETag and Last-Modified callbacks share one lookup per request
+    if not hasattr(request, "_catalogue_revision"):
+        request._catalogue_revision = CatalogueRevision.current()
+    return request._catalogue_revision
+
+
+def catalogue_etag(request, *args, **kwargs):
+    """
+    ETag of the repository feeds rendered from the database, for the
+    condition() view decorator.
+    """
+    catalogue_revision = _get_catalogue_revision(request)
+    if catalogue_revision is None:
+        return None
+    return f"catalogue-{catalogue_revision.revision}"
+
+
+def catalogue_last_modified(request, *args, **kwargs):
+    """
+    Last-Modified date of the repository feeds rendered from the database,
+    for the condition() view decorator.
+    """
+    catalogue_revision = _get_catalogue_revision(request)
+    if catalogue_revision is None:
+        return None
+    modified_on = catalogue_revision.modified_on
+    if timezone.is_naive(modified_on):
+        modified_on = timezone.make_aware(modified_on)
+    return modified_on
+
+
+class PluginCatalogue:
+    """
+    Every approved plugin version, loaded once and filtered in memory.
+
+    ``versions_for()`` applies the same rules as the ``plugins_new.xml``
+    fast lane: for each plugin, the highest approved stable (and
+    experimental) version whose QGIS range includes the requested version.
+    """
+
+    def __init__(self):
+        trusted_user_ids = get_trusted_user_ids()
+        versions = list(
+            PluginVersion.objects.filter(approved=True).select_related("created_by")
+        )
+        plugins = Plugin.objects.filter(
+            pk__in={version.plugin_id for version in versions}
+        ).select_related("created_by")
+        plugins = {plugin.pk: plugin for plugin in plugins.prefetch_related("tags")}
+
+        # Candidates are compared on the version keys stored in the
+        # database, exactly like the SQL filters of the XML views.
+        self._candidates = defaultdict(list)
+        for version in versions:
+            version.plugin = plugins[version.plugin_id]
+            version.is_trusted = version.created_by_id in trusted_user_ids
+            self._candidates[version.experimental].append(
+                (
+                    version.plugin_id,
+                    version.version_key,
+                    version.min_qg_key,
+                    version.max_qg_key,
+                    version,
+                )
+            )
+        # Order by plugin, then by version descending
+        for candidates in self._candidates.values():
+            candidates.sort(key=lambda c: c[1] or [], reverse=True)
+            candidates.sort(key=lambda c: c[0])
+
+        # The QGIS version boundaries of the catalogue
+        candidates = self._candidates[False] + self._candidates[True]
+        self._min_qg_versions = sorted(c[2] for c in candidates if c[2] is not None)
+        self._max_qg_versions = sorted(c[3] for c in candidates if c[3] is not None)
+
+    def equivalence_class(self, request_version: str) -> tuple:
+        """
+        Returns a key shared by all the QGIS versions that select the same
+        plugin versions: no min_qg_key or max_qg_key boundary of the
+        catalogue falls between them, so their feeds are identical.
+        """
+        lowest, highest = qgis_version_bounds(request_version)
+        if lowest is None:
+            return None
+        return (
+            bisect_left(self._max_qg_versions, lowest),
+            bisect_right(self._min_qg_versions, highest),
+        )
+
+    def versions_for(self, request_version: str, stable_only: bool = False) -> list:
+        """
+        Returns the plugin versions listed in plugins.xml for the given QGIS
+        version: stable versions first, then experimental ones.
+        """
+        lowest, highest = qgis_version_bounds(request_version)
+        if lowest is None:
+            return []
+        object_list = self._latest_compatible(self._candidates[False], lowest, highest)
+        if not stable_only:
+            object_list += self._latest_compatible(
+                self._candidates[True], lowest, highest
+            )
+        return object_list
+
+    @staticmethod
+    def _latest_compatible(candidates, lowest, highest):
+        object_list = []
+        last_plugin_id = None
+        for plugin_id, _, min_qg_version, max_qg_version, version in candidates:
+            if plugin_id == last_plugin_id or None in (min_qg_version, max_qg_version):
+                continue
+            if max_qg_version >= lowest and min_qg_version <= highest:
+                object_list.append(version)
+                last_plugin_id = plugin_id
+        return object_list
+
+
+class _SiteRequest(HttpRequest):
+    """
+    Stand-in request carrying the scheme and host of the public site, so
+    that the feed template builds the same absolute URLs as a live request.
+    """
+
+    def __init__(self, site):
+        super().__init__()
+        parsed_site = urlparse(site)
+        self._site_scheme = parsed_site.scheme or "http"
+        self._site_host = parsed_site.netloc or parsed_site.path.strip("/")
+        self.META["HTTP_HOST"] = self._site_host
+
+    def _get_scheme(self):
+        return self._site_scheme
+
+    def get_host(self):
+        # The host comes from our own settings, not from a client header
+        return self._site_host
+
+
+def iter_plugins_xml(object_list, request):
+    """
+    Yields the plugins.xml feed for object_list piece by piece: the header,
+    one <pyqgis_plugin> element per version and the footer.
+
+    Each element is rendered with the plugins/plugins_xml_plugin.xml
+    template, so the escaping is the one of the Django template engine.
+    """
+    template = get_template("plugins/plugins_xml_plugin.xml")
+    yield PLUGINS_XML_HEADER % static("style/plugins.xsl")
+    for version in object_list:
+        yield template.render({"version": version, "request": request})
+    yield PLUGINS_XML_FOOTER
+
+
+def render_plugins_xml(object_list, site: str):
+    """
+    Returns an iterator over the plugins.xml feed for object_list, with
+    absolute URLs pointing to site (e.g. https://plugins.qgis.org).
+    """
+    return iter_plugins_xml(object_list, _SiteRequest(site))
+
+
+class _BrotliWriter:
+    """
+    Write-only file object compressing what it receives into fileobj.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._compressor = brotli.Compressor()
+
+    def write(self, data):
+        self._fileobj.write(self._compressor.process(data))
+
+    def close(self):
+        self._fileobj.write(self._compressor.finish())
+
+
+def _encoded_writer(fileobj, encoding):
+    if encoding == "gzip":
+        # A fixed mtime keeps identical snapshots byte-identical
+        return gzip.GzipFile(filename="", mode="wb", fileobj=fileobj, mtime=0)
+    if encoding == "br":
+        return closing(_BrotliWriter(fileobj))
+    return nullcontext(fileobj)
+
+
+def iter_plugins_json(object_list, request):
+    """
+    Yields the plugins.json catalogue for object_list piece by piece: one
+    Plugin.to_json() entry per plugin, listing its versions of object_list
+    in the same order, with their absolute download URL.
+    """
+    versions_by_plugin = {}
+    for version in object_list:
+        versions_by_plugin.setdefault(version.plugin_id, []).append(version)
+
+    yield '{"plugins": ['
+    for i, versions in enumerate(versions_by_plugin.values()):
+        plugin = versions[0].plugin
+        data = plugin.to_json(latest_version=versions[0])
+        data["versions"] = [
+            version.to_json(
+                include_detail=True,
+                download_url=request.build_absolute_uri(version.get_download_url()),
+            )
+            for version in versions
+        ]
+        yield ("," if i else "") + json.dumps(data, cls=DjangoJSONEncoder)
+    yield "]}\n"
+
+
+def render_plugins_json(object_list, site: str):
+    """
+    Returns an iterator over the plugins.json catalogue for object_list,
+    with absolute URLs pointing to site.
+    """
+    return iter_plugins_json(object_list, _SiteRequest(site))
+
+
+def _snapshot_objects_path() -> str:
+    return os.path.join(
+        settings.MEDIA_ROOT, CACHED_XMLS_FOLDER, SNAPSHOT_OBJECTS_FOLDER
+    )
+
+
+def write_snapshot_object(chunks, extension: str = ".xml") -> str:
+    """
+    Writes the chunks of text to the content-addressed snapshot store,
+    along with the pre-compressed siblings, and returns the sha256 digest
+    naming them (cached_xmls/objects/<digest><extension>).
+
+    The chunks are encoded once and fed to every file as they come; the
+    files are written to temporary files and renamed once complete, and
+    left untouched when a snapshot with the same content already exists.
+    """
+    folder_path = _snapshot_objects_path()
+    os.makedirs(folder_path, exist_ok=True)
+
+    digest = hashlib.sha256()
+    encodings = [None, *SNAPSHOT_ENCODINGS]
+    tmp_paths = {}
+    try:
+        with ExitStack() as stack:
+            writers = []
+            for encoding in encodings:
+                fd, tmp_paths[encoding] = tempfile.mkstemp(
+                    dir=folder_path, prefix=".", suffix=".tmp"
+                )
+                tmp_file = stack.enter_context(os.fdopen(fd, "wb"))
+                writers.append(stack.enter_context(_encoded_writer(tmp_file, encoding)))
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                digest.update(data)
+                for writer in writers:
+                    writer.write(data)
+        digest = digest.hexdigest()
+        # Plain file last: it is the one the views look for
+        for encoding in reversed(encodings):
+            path_file = os.path.join(
+                folder_path, digest + extension + SNAPSHOT_ENCODINGS.get(encoding, "")
+            )
+            tmp_path = tmp_paths.pop(encoding)
+            if os.path.exists(path_file):
+                os.unlink(tmp_path)
+                # Kept from the pruning
+                os.utime(path_file)
+            else:
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path_file)
+    except BaseException:
+        for tmp_path in tmp_paths.values():
+            os.unlink(tmp_path)
+        raise
+    return digest
+
+
+def link_snapshot(file_name: str, digest: str) -> str:
+    """
+    Points cached_xmls/file_name and its pre-compressed siblings to the
+    snapshot stored under digest, with the same extension as file_name.
+    Each symlink is swapped atomically. Returns the path of the link.
+    """
+    folder_path = os.path.join(settings.MEDIA_ROOT, CACHED_XMLS_FOLDER)
+    path_file = os.path.join(folder_path, file_name)
+    extension = os.path.splitext(file_name)[1]
+    # Compressed siblings first: the plain file is the one the views look for
+    for suffix in [*SNAPSHOT_ENCODINGS.values(), ""]:
+        target = os.path.join(SNAPSHOT_OBJECTS_FOLDER, digest + extension + suffix)
+        tmp_path = os.path.join(folder_path, f".{file_name}{suffix}.tmp")
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        os.symlink(target, tmp_path)
+        previous_target = (
+            os.readlink(path_file + suffix)
+            if os.path.islink(path_file + suffix)
+            else None
+        )
+        os.replace(tmp_path, path_file + suffix)
+        if previous_target not in (None, target):
+            # The mtime of an unlinked snapshot is when it was unlinked
+            try:
+                os.utime(os.path.join(folder_path, previous_target))
+            except FileNotFoundError:
+                pass
+    return path_file
+
+
+def write_snapshot(file_name: str, chunks) -> str:
+    """
+    Stores the chunks of text as a snapshot and links cached_xmls/file_name
+    to it. Returns the path of the link.
+    """
+    extension = os.path.splitext(file_name)[1]
+    return link_snapshot(file_name, write_snapshot_object(chunks, extension))
+
+
+def prune_snapshot_objects(grace: int = SNAPSHOT_PRUNE_GRACE) -> list:
+    """
+    Removes the stored snapshots no longer linked from cached_xmls for
+    more than grace seconds and returns their file names.
+    """
+    folder_path = os.path.join(settings.MEDIA_ROOT, CACHED_XMLS_FOLDER)
+    objects_path = _snapshot_objects_path()
+    if not os.path.isdir(objects_path):
+        return []
+    linked = {
+        os.path.basename(os.readlink(entry.path))
+        for entry in os.scandir(folder_path)
+        if entry.is_symlink()
+    }
+    unlinked_before = time.time() - grace
+    pruned = []
+    for entry in os.scandir(objects_path):
+        if entry.name.startswith(".") or entry.name in linked:
+            continue
+        if entry.stat().st_mtime > unlinked_before:
+            continue
+        os.unlink(entry.path)
+        pruned.append(entry.name)
+    return pruned
+
+
+def _accepted_encodings(request) -> set:
+    accepted_encodings = set()
+    for coding in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        encoding, _, params = coding.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted_encodings.add(encoding.strip().lower())
+    return accepted_encodings
+
+
+def get_snapshot(request, file_name: str):
+    """
+    Returns the snapshot linked from cached_xmls/file_name, as a tuple
+    (path_file, object_path, content_encoding), None when there is none.
+    content_encoding is the pre-compressed sibling served to the client,
+    None for the plain file.
+
+    The link is resolved once per request, so the validators and the body
+    come from the same stored snapshot even if the link is swapped by the
+    generate_plugins_xml task in the meantime.
+    """
+    if not hasattr(request, "_snapshots"):
+        request._snapshots = {}
+    if file_name not in request._snapshots:
+        path_file = os.path.join(settings.MEDIA_ROOT, CACHED_XMLS_FOLDER, file_name)
+        snapshot = None
+        if os.path.exists(path_file):
+            object_path = os.path.realpath(path_file)
+            accepted_encodings = _accepted_encodings(request)
+            content_encoding = None
+            for encoding, suffix in SNAPSHOT_ENCODINGS.items():
+                if encoding in accepted_encodings and os.path.exists(
+                    object_path + suffix
+                ):
+                    content_encoding = encoding
+                    break
+            snapshot = (path_file, object_path, content_encoding)
+        request._snapshots[file_name] = snapshot
+    return request._snapshots[file_name]
+
+
+def snapshot_etag(snapshot) -> str:
+    """
+    ETag of a snapshot: the content digest naming the stored file, its
+    modification time and size for a snapshot written as a plain file.
+
+    The compressed representations get their own ETag, suffixed with the
+    content encoding, since they are not byte-identical to the plain file.
+    """
+    path_file, object_path, content_encoding = snapshot
+    if os.path.islink(path_file):
+        etag = "snapshot-" + os.path.basename(object_path).split(".")[0]
+    else:
+        stat = os.stat(object_path)
+        etag = f"snapshot-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    if content_encoding:
+        etag += f"-{content_encoding}"
+    return etag
+
+
+def snapshot_last_modified(snapshot):
+    """
+    Last-Modified date of a snapshot: when its link was last written.
+    """
+    path_file, _, _ = snapshot
+    return datetime.fromtimestamp(os.lstat(path_file).st_mtime, tz=dt_timezone.utc)
+
+
+def feed_condition(snapshot_name=None):
+    """
+    condition() view decorator of the repository feeds.
+
+    snapshot_name(request, *args, **kwargs) returns the file name of the
+    snapshot the view serves for a request, None when it renders the feed
+    from the database. A served snapshot is validated against its own
+    content, since it is regenerated after the catalogue revision changes;
+    the feeds rendered from the database use the catalogue revision. The
+    responses of a view serving snapshots, 304 included, vary on the
+    Accept-Encoding header.
+    """
+
+    def _snapshot(request, *args, **kwargs):
+        file_name = snapshot_name(request, *args, **kwargs) if snapshot_name else None
+        return get_snapshot(request, file_name) if file_name else None
+
+    def etag_func(request, *args, **kwargs):
+        snapshot = _snapshot(request, *args, **kwargs)
+        if snapshot is None:
+            return catalogue_etag(request)
+        return snapshot_etag(snapshot)
+
+    def last_modified_func(request, *args, **kwargs):
+        snapshot = _snapshot(request, *args, **kwargs)
+        if snapshot is None:
+            return catalogue_last_modified(request)
+        return snapshot_last_modified(snapshot)
+
+    def decorator(func):
+        conditional_view = condition(
+            etag_func=etag_func, last_modified_func=last_modified_func
+        )(func)
+
+        @wraps(func)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if _snapshot(request, *args, **kwargs) is not None:
+                patch_vary_headers(response, ("Accept-Encoding",))
+            return response
+
+        return inner
+
+    return decorator
+
+
+def snapshot_response(request, snapshot, content_type: str) -> FileResponse:
+    """
+    Serves a snapshot returned by get_snapshot(), as its pre-compressed
+    sibling when the client accepts that encoding. Nothing is compressed or
+    decoded per request: the file is streamed as it is on disk.
+    """
+    path_file, object_path, content_encoding = snapshot
+    response = FileResponse(
+        open(object_path + SNAPSHOT_ENCODINGS.get(content_encoding, ""), "rb"),
+        content_type=content_type,
+        filename=os.path.basename(path_file),
+    )
+    if content_encoding:
+        response["Content-Encoding"] = content_encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
@@ -1,11 +1,12 @@
 from plugins.tasks.delete_marked_plugins import delete_marked_plugins
+from plugins.tasks.flush_plugin_downloads import flush_plugin_downloads
 from plugins.tasks.generate_plugins_xml import generate_plugins_xml
 from plugins.tasks.get_sustaining_members import get_sustaining_members
+from plugins.tasks.process_plugin_icon import process_plugin_icon
 from plugins.tasks.rebuild_search_index import rebuild_search_index
+from plugins.tasks.rollup_download_stats import rollup_download_stats
 from plugins.tasks.run_security_scan import run_security_scan_task
-from plugins.tasks.rebuild_search_index import rebuild_search_index
 from plugins.tasks.save_qt6_result import save_qt6_result
-from plugins.tasks.update_qgis_versions import update_qgis_versions
 from plugins.tasks.send_email_communication import send_email_communication
 from plugins.tasks.trigger_annual_reverification import (
     send_anniversary_reverifications,
@@ -15,3 +16,4 @@ from plugins.tasks.trigger_email_confirmation import (
     send_pending_email_confirmations,
 )
 from plugins.tasks.update_qgis_versions import update_qgis_versions
+from plugins.tasks.update_ranking_scores import update_plugin_ranking_scores
@@ -0,0 +1,118 @@
+"""
+Celery task to fold the buffered plugin downloads into the download
+counters and the per country download stats.
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.db import connection, transaction
+from plugins.models import (
+    PendingPluginVersionDownload,
+    Plugin,
+    PluginVersion,
+    PluginVersionDownload,
+    update_ranking_scores,
+)
+
+logger = get_task_logger(__name__)
+
+FLUSH_BATCH_SIZE = 10000
+
+# Pending downloads counted by plugin version, the rows being selected by id
+PENDING_COUNTS_SQL = """
+    SELECT plugin_version_id, COUNT(*) AS downloads
+        FROM %(pending_table)s
+        WHERE id = ANY(%%(ids)s)
+        GROUP BY plugin_version_id
+"""
+
+VERSION_DOWNLOADS_SQL = """
+    UPDATE %(pv_table)s pv SET downloads = pv.downloads + pending.downloads
+        FROM (%(pending_counts)s) pending
+        WHERE pv.id = pending.plugin_version_id
+"""
+
+PLUGIN_DOWNLOADS_SQL = """
+    UPDATE %(p_table)s p SET downloads = p.downloads + pending.downloads
+        FROM (
+            SELECT pv.plugin_id, SUM(pending.downloads) AS downloads
+                FROM (%(pending_counts)s) pending
+                JOIN %(pv_table)s pv ON pv.id = pending.plugin_version_id
+                GROUP BY pv.plugin_id
+        ) pending
+        WHERE p.id = pending.plugin_id
+"""
+
+DOWNLOAD_STATS_SQL = """
+    INSERT INTO %(download_table)s AS d
+        (plugin_version_id, download_date, country_code, country_name, download_count)
+        SELECT plugin_version_id, download_date, country_code, country_name, COUNT(*)
+            FROM %(pending_table)s
+            WHERE id = ANY(%%(ids)s)
+            GROUP BY plugin_version_id, download_date, country_code, country_name
+    ON CONFLICT (plugin_version_id, download_date, country_code, country_name)
+        DO UPDATE SET download_count = d.download_count + EXCLUDED.download_count
+"""
+
+
+def _flush_batch(batch_size):
+    """
+    Folds up to batch_size pending downloads, returns how many were folded.
+
+    The pending rows are locked with SKIP LOCKED, so concurrent runs of the
+    task never count the same download twice.
+    """
+    tables = {
+        "pending_table": PendingPluginVersionDownload._meta.db_table,
+        "pv_table": PluginVersion._meta.db_table,
+        "p_table": Plugin._meta.db_table,
+        "download_table": PluginVersionDownload._meta.db_table,
+    }
+    tables["pending_counts"] = PENDING_COUNTS_SQL % tables
+    with transaction.atomic():
+        ids = list(
+            PendingPluginVersionDownload.objects.select_for_update(skip_locked=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        with connection.cursor() as cursor:
+            for sql in (
+                VERSION_DOWNLOADS_SQL,
+                PLUGIN_DOWNLOADS_SQL,
+                DOWNLOAD_STATS_SQL,
+            ):
+                cursor.execute(sql % tables, {"ids": ids})
+        update_ranking_scores(
+            Plugin.objects.filter(
+                pk__in=PluginVersion.objects.filter(
+                    pk__in=PendingPluginVersionDownload.objects.filter(
+                        pk__in=ids
+                    ).values("plugin_version")
+                ).values("plugin")
+            )
+        )
+        PendingPluginVersionDownload.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+@shared_task
+def flush_plugin_downloads(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Count the downloads buffered since the last run.
+
+    Scheduled every PLUGIN_DOWNLOADS_FLUSH_INTERVAL seconds, which bounds
+    how stale the download counters can be.
+
+    Returns:
+        int: Number of downloads counted
+    """
+    flushed = 0
+    while True:
+        count = _flush_batch(batch_size)
+        flushed += count
+        if count < batch_size:
+            break
+    logger.info(f"flush_plugin_downloads: {flushed} downloads counted")
+    return flushed
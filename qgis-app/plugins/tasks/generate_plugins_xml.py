@@ -1,12 +1,16 @@
-import os
-
-import requests
 from celery import shared_task
 from celery.utils.log import get_task_logger
-from preferences import preferences
 from django.conf import settings
 from preferences import preferences
-from plugins.utils import get_version_from_label
+from plugins.repository_utils import (
+    PluginCatalogue,
+    link_snapshot,
+    prune_snapshot_objects,
+    render_plugins_json,
+    render_plugins_xml,
+    write_snapshot_object,
+)
+from plugins.utils import get_versions_from_labels
 
 
 logger = get_task_logger(__name__)
@@ -15,8 +19,14 @@ logger = get_task_logger(__name__)
 @shared_task
 def generate_plugins_xml(site=""):
     """
-    Fetch the xml list of plugins from the plugin site.
-    :param site: site domain where the plugins will be fetched, default to
+    Render the cached xml list of plugins and the json catalogue for each
+    QGIS version and label.
+
+    The snapshots are built in-process from the database: the catalogue of
+    approved versions is loaded once and reused for every QGIS version, so
+    the task does not depend on the web tier being up. The QGIS versions
+    selecting the same plugin versions share one rendered snapshot.
+    :param site: site domain used in the absolute URLs of the xml, default to
                  http://plugins.qgis.org
     """
     logger.info('generate_plugins_xml : {}'.format(site))
@@ -26,7 +36,6 @@ def generate_plugins_xml(site=""):
             site = settings.DEFAULT_PLUGINS_SITE
         else:
             site = "http://plugins.qgis.org"
-    plugins_url = "{}/plugins/plugins_new.xml".format(site)
 
     versions = preferences.SitePreference.qgis_versions
     labels = ["latest", "stable", "ltr"]
@@ -77,22 +86,39 @@ def generate_plugins_xml(site=""):
             "3.25",
         ]
 
-    folder_path = os.path.join(settings.MEDIA_ROOT, "cached_xmls")
+    # Resolve every label with a single request to version.qgis.org
+    try:
+        label_versions = get_versions_from_labels(labels)
+    except Exception as e:
+        logger.warning('Cannot resolve QGIS version labels: {}'.format(e))
+        label_versions = {}
 
-    if not os.path.exists(folder_path):
-        os.mkdir(folder_path)
+    catalogue = PluginCatalogue()
+    # Snapshot digests by equivalence class of QGIS versions
+    digests = {}
 
-    def fetch_and_save_xml(version_or_label, is_label=False):
-        version = get_version_from_label(version_or_label) if is_label else version_or_label
-        response = requests.get(f"{plugins_url}?qgis={version}")
-
-        if response.status_code == 200:
-            file_name = f"plugins_{version_or_label}.xml"
-            with open(os.path.join(folder_path, file_name), "w+") as file:
-                file.write(response.text)
+    def render_and_save_xml(version_or_label, version):
+        equivalence_class = catalogue.equivalence_class(version)
+        if equivalence_class not in digests:
+            object_list = catalogue.versions_for(version)
+            digests[equivalence_class] = (
+                write_snapshot_object(render_plugins_xml(object_list, site), ".xml"),
+                write_snapshot_object(render_plugins_json(object_list, site), ".json"),
+            )
+        xml_digest, json_digest = digests[equivalence_class]
+        link_snapshot(f"plugins_{version_or_label}.xml", xml_digest)
+        link_snapshot(f"plugins_{version_or_label}.json", json_digest)
 
     for label in labels:
-        fetch_and_save_xml(label, is_label=True)
+        if label_versions.get(label):
+            render_and_save_xml(label, label_versions[label])
 
     for version in versions:
-        fetch_and_save_xml(version)
+        render_and_save_xml(version, version)
+
+    pruned = prune_snapshot_objects()
+    logger.info(
+        'generate_plugins_xml : {} snapshots, {} pruned'.format(
+            len(digests), len(pruned)
+        )
+    )
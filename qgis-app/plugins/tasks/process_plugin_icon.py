@@ -0,0 +1,30 @@
+"""
+Celery task to validate the icon of a plugin and render its thumbnails.
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from plugins.icon_utils import update_plugin_icon
+from plugins.models import Plugin
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def process_plugin_icon(plugin_id):
+    """
+    Store the validity, format and dimensions of the icon of a plugin and
+    pre-render the thumbnails used by the templates.
+
+    Queued by Plugin.save() when the icon changes.
+
+    Returns:
+        bool: Whether the icon is valid
+    """
+    plugin = Plugin.objects.filter(pk=plugin_id).first()
+    if plugin is None or not plugin.icon:
+        return False
+    metadata = update_plugin_icon(plugin)
+    if not metadata["icon_valid"]:
+        logger.info(f"process_plugin_icon: invalid icon for {plugin.package_name}")
+    return metadata["icon_valid"]
@@ -0,0 +1,110 @@
+"""
+Celery task to maintain the download stats rollups (plugin downloads per
+day, per month and per country and month) from the PluginVersionDownload
+rows.
+"""
+
+import datetime
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.db import connection, transaction
+from django.utils import timezone
+from plugins.models import (
+    PluginCountryMonthlyDownloads,
+    PluginDailyDownloads,
+    PluginMonthlyDownloads,
+    PluginVersion,
+    PluginVersionDownload,
+)
+
+logger = get_task_logger(__name__)
+
+DAILY_DOWNLOADS_SQL = """
+    INSERT INTO %(daily_table)s (plugin_id, date, downloads)
+        SELECT pv.plugin_id, d.download_date, SUM(d.download_count)
+            FROM %(download_table)s d
+            JOIN %(pv_table)s pv ON pv.id = d.plugin_version_id
+            WHERE d.download_date BETWEEN %%(first_date)s AND %%(last_date)s
+            GROUP BY pv.plugin_id, d.download_date
+    ON CONFLICT (plugin_id, date) DO UPDATE SET downloads = EXCLUDED.downloads
+"""
+
+MONTHLY_DOWNLOADS_SQL = """
+    INSERT INTO %(monthly_table)s (plugin_id, month, downloads)
+        SELECT plugin_id, DATE_TRUNC('month', date)::date, SUM(downloads)
+            FROM %(daily_table)s
+            WHERE date BETWEEN %%(first_month)s AND %%(last_month_end)s
+            GROUP BY plugin_id, DATE_TRUNC('month', date)
+    ON CONFLICT (plugin_id, month) DO UPDATE SET downloads = EXCLUDED.downloads
+"""
+
+COUNTRY_MONTHLY_DOWNLOADS_SQL = """
+    INSERT INTO %(country_monthly_table)s
+        (plugin_id, month, country_code, country_name, downloads)
+        SELECT pv.plugin_id, DATE_TRUNC('month', d.download_date)::date,
+               d.country_code, d.country_name, SUM(d.download_count)
+            FROM %(download_table)s d
+            JOIN %(pv_table)s pv ON pv.id = d.plugin_version_id
+            WHERE d.download_date BETWEEN %%(first_month)s AND %%(last_month_end)s
+            GROUP BY pv.plugin_id, DATE_TRUNC('month', d.download_date),
+                     d.country_code, d.country_name
+    ON CONFLICT (plugin_id, month, country_code, country_name)
+        DO UPDATE SET downloads = EXCLUDED.downloads
+"""
+
+
+def month_end(date):
+    """
+    Returns the last day of the month of date.
+    """
+    next_month = date.replace(day=28) + datetime.timedelta(days=4)
+    return next_month - datetime.timedelta(days=next_month.day)
+
+
+def rollup_downloads(first_date, last_date):
+    """
+    Recomputes the daily rollups of the days first_date to last_date, then
+    the monthly and per country rollups of the months they belong to.
+
+    The daily rollups of the rest of these months must already be up to
+    date: the monthly rollups are summed up from them.
+    """
+    tables = {
+        "download_table": PluginVersionDownload._meta.db_table,
+        "pv_table": PluginVersion._meta.db_table,
+        "daily_table": PluginDailyDownloads._meta.db_table,
+        "monthly_table": PluginMonthlyDownloads._meta.db_table,
+        "country_monthly_table": PluginCountryMonthlyDownloads._meta.db_table,
+    }
+    params = {
+        "first_date": first_date,
+        "last_date": last_date,
+        "first_month": first_date.replace(day=1),
+        "last_month_end": month_end(last_date),
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in (
+            DAILY_DOWNLOADS_SQL,
+            MONTHLY_DOWNLOADS_SQL,
+            COUNTRY_MONTHLY_DOWNLOADS_SQL,
+        ):
+            cursor.execute(sql % tables, params)
+
+
+@shared_task
+def rollup_download_stats(days=2):
+    """
+    Refresh the download stats rollups of the last days.
+
+    The download counters of a day keep changing until the day is over, so
+    the rollups of the last days are recomputed on each run; older days are
+    left as they are.
+
+    Args:
+        days: Number of days to recompute, today included (default: 2)
+    """
+    last_date = timezone.now().date()
+    first_date = last_date - datetime.timedelta(days=days - 1)
+    logger.info(f"rollup_download_stats: {first_date} to {last_date}")
+    rollup_downloads(first_date, last_date)
@@ -23,7 +23,12 @@ from celery.utils.log import get_task_logger
 from django.db.models import Min
 from django.utils.timezone import now
 from plugins.email_utils import send_confirmation_email
-from plugins.models import Plugin, PluginEmailConfirmation, PluginEmailConfirmationError
+from plugins.models import (
+    Plugin,
+    PluginEmailConfirmation,
+    PluginEmailConfirmationError,
+    update_review_states,
+)
 
 logger = get_task_logger(__name__)
 
@@ -107,6 +112,8 @@ def send_anniversary_reverifications() -> dict:
             confirmed_at__isnull=False,
             superseded_at__isnull=True,
         ).update(superseded_at=now())
+        # The queryset update sends no signal
+        update_review_states(Plugin.objects.filter(email=email))
 
         try:
             send_confirmation_email(confirmation)
@@ -0,0 +1,27 @@
+"""
+Celery task to recompute the ranking scores of all the plugins.
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from plugins.models import Plugin, update_ranking_scores
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def update_plugin_ranking_scores():
+    """
+    Recompute the average vote, weighted rating and popularity of all the
+    plugins.
+
+    They are kept up to date when the plugins are saved and downloaded,
+    this full recompute catches the changes made behind their back (votes
+    deleted from the admin, raw SQL updates...).
+
+    Returns:
+        int: Number of plugins whose scores were outdated
+    """
+    updated = update_ranking_scores(Plugin.objects.all())
+    logger.info(f"update_plugin_ranking_scores: {updated} plugins updated")
+    return updated
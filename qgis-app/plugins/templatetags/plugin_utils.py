@@ -1,17 +1,20 @@
 import datetime
 import json
+import logging
 import os.path
-import xml.etree.ElementTree as ET
 from datetime import timedelta
 
 import requests
 from bs4 import BeautifulSoup
 from django import template
 from django.conf import settings
-from PIL import Image, UnidentifiedImageError
+from plugins.icon_utils import read_icon, render_icon_thumbnail
+from plugins.models import review_queue_counts
 
 register = template.Library()
 
+logger = logging.getLogger(__name__)
+
 
 @register.filter("klass")
 def klass(ob):
@@ -60,30 +63,28 @@ def file_extension(value):
 
 @register.filter
 def is_image_valid(image):
-    if not image:
-        return False
-    # Check if the file is an SVG by extension
-    if image.path.lower().endswith(".svg"):
-        return _validate_svg(image.path)
-    return _validate_image(image.path)
-
-
-def _validate_svg(file_path):
-    try:
-        # Parse the SVG file to ensure it's well-formed XML
-        ET.parse(file_path)
-        return True
-    except (ET.ParseError, FileNotFoundError):
-        return False
+    """
+    Opens and checks an image file, the plugin icons are checked once
+    by the process_plugin_icon task: use Plugin.icon_valid instead
+    """
+    return read_icon(image)["icon_valid"]
 
 
-def _validate_image(file_path):
-    try:
-        img = Image.open(file_path)
-        img.verify()
-        return True
-    except (FileNotFoundError, UnidentifiedImageError):
-        return False
+@register.filter
+def icon_thumbnail(plugin, geometry):
+    """
+    Returns the url, width and height of a thumbnail of the plugin icon,
+    pre-rendered by the process_plugin_icon task. Rendered on the fly when
+    the icon was not processed yet.
+    """
+    thumbnail = plugin.icon_thumbnails.get(geometry)
+    if thumbnail is None and plugin.icon:
+        try:
+            thumbnail = render_icon_thumbnail(plugin.icon, geometry)
+        except Exception as e:
+            # Like the thumbnail tag, a broken icon renders no thumbnail
+            logger.info(f"Thumbnail of {plugin.icon.name} failed: {e}")
+    return thumbnail
 
 
 @register.filter
@@ -203,6 +204,21 @@ def get_review_menu():
     return menu
 
 
+@register.simple_tag(takes_context=True)
+def review_queue_count(context, queue):
+    """
+    Get the number of plugins of a review queue, for the review menu badges.
+    The counts of all the queues are read once per request.
+    """
+    request = context.get("request")
+    counts = getattr(request, "_review_queue_counts", None)
+    if counts is None:
+        counts = review_queue_counts()
+        if request is not None:
+            request._review_queue_counts = counts
+    return counts.get(queue, 0)
+
+
 @register.simple_tag()
 def get_site_url():
     """
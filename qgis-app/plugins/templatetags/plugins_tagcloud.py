@@ -6,13 +6,11 @@ unpublished plugins: returns only approved_objects
 
 from django import template
 from django.conf import settings as django_settings
-from django.core.exceptions import FieldError
 from django.db import models
-from django.db.models import Count
-from plugins.models import Plugin
+from django.db.models import F
 from taggit import VERSION as TAGGIT_VERSION
 from taggit.managers import TaggableManager
-from taggit.models import Tag, TaggedItem
+from taggit.models import Tag
 from taggit_templatetags import settings
 from templatetag_sugar.parser import Constant, Model, Name, Optional, Variable
 from templatetag_sugar.register import tag
@@ -25,26 +23,13 @@ register = template.Library()
 
 
 def get_queryset():
-    applabel = "plugins"
-    model = "plugin"
-    # filter tagged items
-    queryset = TaggedItem.objects.filter(content_type__app_label=applabel.lower())
-    queryset = queryset.filter(
-        content_type__model=model.lower(),
-        object_id__in=Plugin.approved_objects.values_list("id", flat=True),
+    """
+    Returns the tags of the approved plugins, with their number of approved
+    plugins as num_times, read from the PluginTagStat table
+    """
+    qs = Tag.objects.filter(plugin_stat__isnull=False).annotate(
+        num_times=F("plugin_stat__plugin_count")
     )
-
-    # get tags
-    tag_ids = queryset.values_list("tag_id", flat=True)
-    queryset = Tag.objects.filter(id__in=tag_ids)
-
-    # Retain compatibility with older versions of Django taggit
-    # a version check (for example taggit.VERSION <= (0,8,0)) does NOT
-    # work because of the version (0,8,0) of the current dev version of django-taggit
-    try:
-        qs = queryset.annotate(num_times=Count("taggeditem_items"))
-    except FieldError:
-        qs = queryset.annotate(num_times=Count("taggit_taggeditem_items"))
     if TAGCLOUD_COUNT_GTE:
         qs = qs.filter(num_times__gte=TAGCLOUD_COUNT_GTE)
     return qs
@@ -74,16 +59,13 @@ def get_plugins_taglist(context, asvar):
 
 @tag(register, [Constant("as"), Name()])
 def get_plugins_tagcloud(context, asvar):
-    queryset = get_queryset()
-    num_times = queryset.values_list("num_times", flat=True)
-    if len(num_times) == 0:
-        context[asvar] = queryset
-        return ""
-    weight_fun = get_weight_fun(T_MIN, T_MAX, min(num_times), max(num_times))
-    queryset = queryset.order_by("name")
-    for tag in queryset:
-        tag.weight = weight_fun(tag.num_times)
-    context[asvar] = queryset
+    tags = list(get_queryset().order_by("name"))
+    if tags:
+        num_times = [tag.num_times for tag in tags]
+        weight_fun = get_weight_fun(T_MIN, T_MAX, min(num_times), max(num_times))
+        for tag in tags:
+            tag.weight = weight_fun(tag.num_times)
+    context[asvar] = tags
     return ""
 
 
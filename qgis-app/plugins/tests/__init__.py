@@ -1,5 +1,40 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
 from plugins.tests import ws_test
 
 __test__ = {
     "ws_test": ws_test,
 }
+
+# Media root of the tests storing plugin packages, outside the source tree
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix="plugins-tests-media-")
+atexit.register(shutil.rmtree, TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def clear_test_media_root():
+    for entry in os.scandir(TEST_MEDIA_ROOT):
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.unlink(entry.path)
+
+
+class TestMediaRootMixin:
+    """
+    Stores the media files of each test under TEST_MEDIA_ROOT, emptied once
+    the test is done, so the snapshots and the packages of a test are not
+    seen by the next one
+    """
+
+    media_root = TEST_MEDIA_ROOT
+
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(clear_test_media_root)
@@ -0,0 +1,80 @@
+"""
+Tests for the synthetic catalogue and the repository feeds benchmark.
+"""
+
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from plugins.benchmark_utils import (
+    BENCHMARK_FEEDS,
+    BENCHMARK_LISTINGS,
+    build_catalogue,
+    run_benchmarks,
+)
+from plugins.models import Plugin, PluginVersion
+from plugins.repository_utils import get_trusted_user_ids
+from taggit.models import Tag
+
+
+class TestBenchmarkFeeds(TestCase):
+    def setUp(self):
+        self.catalogue = build_catalogue(plugins=12, versions=40, tags=5, authors=10)
+
+    def test_build_catalogue(self):
+        self.assertEqual(self.catalogue["plugins"], 12)
+        self.assertEqual(self.catalogue["versions"], 40)
+        self.assertEqual(Plugin.objects.count(), 12)
+        self.assertEqual(PluginVersion.objects.count(), 40)
+        # Every plugin has a version, some authors are trusted
+        self.assertFalse(Plugin.objects.filter(pluginversion__isnull=True).exists())
+        self.assertEqual(len(get_trusted_user_ids()), 1)
+
+    def test_build_catalogue_is_deterministic(self):
+        first = list(PluginVersion.objects.order_by("pk").values_list("version"))
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        build_catalogue(plugins=12, versions=40, tags=5, authors=10)
+        second = list(PluginVersion.objects.order_by("pk").values_list("version"))
+        self.assertEqual(first, second)
+
+    def test_run_benchmarks(self):
+        report = run_benchmarks(["3.34"], track_memory=False, number=100)
+        # The report is meant to be dumped as JSON
+        json.dumps(report)
+        self.assertEqual(report["catalogue"]["versions"], 40)
+
+        benchmarks = {result["benchmark"] for result in report["results"]}
+        for feed in BENCHMARK_FEEDS:
+            self.assertIn(feed, benchmarks)
+        self.assertIn("snapshot plugins.xml", benchmarks)
+        for result in report["results"]:
+            self.assertNotIn("peak_memory_kb", result)
+            if result["benchmark"] in BENCHMARK_FEEDS:
+                self.assertGreater(result["queries"], 0)
+                self.assertGreater(result["bytes"], 0)
+
+        self.assertEqual(len(report["listings"]), 2 * len(BENCHMARK_LISTINGS))
+        for result in report["listings"]:
+            self.assertEqual(result["queries"], 2)
+            self.assertTrue(result["plan"])
+        # The managers no longer deduplicate a join on the versions
+        plans = {
+            result["variant"]: " ".join(result["plan"])
+            for result in report["listings"]
+            if result["benchmark"] == "approved_objects first page"
+        }
+        self.assertRegex(plans["join distinct"], "Unique|HashAggregate")
+        self.assertIn("Semi Join", plans["exists"])
+        self.assertNotRegex(plans["exists"], "Unique|HashAggregate")
+
+        functions = {result["benchmark"] for result in report["functions"]}
+        self.assertEqual(
+            functions,
+            {"vjust", "version_key", "qgis_version_range", "plugins_xml_plugin.xml"},
+        )
+
+    def test_run_benchmarks_peak_memory(self):
+        report = run_benchmarks(["3.34"], number=10)
+        for result in report["results"]:
+            self.assertGreater(result["peak_memory_kb"], 0)
@@ -7,18 +7,19 @@ from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from plugins.models import Plugin, PluginVersion
 from plugins.forms import PluginForm
+from plugins.tests import TEST_MEDIA_ROOT
 
 def do_nothing(*args, **kwargs):
     pass
 
 TESTFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "testfiles"))
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class PluginRenameTestCase(TestCase):
     fixtures = [
         "fixtures/auth.json",
     ]
 
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url_upload = reverse('plugin_upload')
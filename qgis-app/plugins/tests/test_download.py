@@ -1,9 +1,20 @@
-from django.test import Client, TestCase, RequestFactory
+import hashlib
+from unittest.mock import patch
+
+from django.test import Client, TestCase, RequestFactory, override_settings
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from plugins.models import Plugin, PluginVersion, PluginVersionDownload
+from plugins.models import (
+    PendingPluginVersionDownload,
+    Plugin,
+    PluginVersion,
+    PluginVersionDownload,
+)
+from plugins.tasks.flush_plugin_downloads import flush_plugin_downloads
+from plugins.utils import file_sha256
 from plugins.views import version_download
 from django.urls import reverse
 
@@ -45,10 +56,12 @@ class TestVersionDownloadView(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/zip')
-        self.assertEqual(response.content, b'file_content')
+        self.assertEqual(b''.join(response.streaming_content), b'file_content')
 
         self.assertEqual(self.version.downloads, 1)
         self.assertEqual(self.plugin.downloads, 1)
+        # Without votes, the popularity is the number of downloads
+        self.assertEqual(self.plugin.popularity, 1)
         self.assertEqual(download_record.download_count, 1)
 
     def test_version_download_per_country(self):
@@ -82,4 +95,301 @@ class TestVersionDownloadView(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTrue(download_record.country_code == 'N/D')
-        self.assertTrue(download_record.country_name == 'N/D')
\ No newline at end of file
+        self.assertTrue(download_record.country_name == 'N/D')
+
+    def test_version_download_streams_the_package(self):
+        request = self.factory.get('/')
+
+        response = version_download(request, self.plugin.package_name, self.version.version)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Length'], str(len(b'file_content')))
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename=test-package-1.0.0.zip'
+        )
+
+    @override_settings(
+        PLUGIN_DOWNLOAD_DELIVERY='x-accel-redirect',
+        PLUGIN_DOWNLOAD_ACCEL_REDIRECT_URL='/protected-media/'
+    )
+    def test_version_download_x_accel_redirect(self):
+        request = self.factory.get('/')
+
+        response = version_download(request, self.plugin.package_name, self.version.version)
+
+        self.version.refresh_from_db()
+        self.plugin.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/%s' % self.version.package.name
+        )
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename=test-package-1.0.0.zip'
+        )
+        # The download is still counted by Django
+        self.assertEqual(self.version.downloads, 1)
+        self.assertEqual(self.plugin.downloads, 1)
+
+    @override_settings(PLUGIN_DOWNLOAD_DELIVERY='x-sendfile')
+    def test_version_download_x_sendfile(self):
+        request = self.factory.get('/')
+
+        response = version_download(request, self.plugin.package_name, self.version.version)
+
+        self.version.refresh_from_db()
+        self.assertEqual(response['X-Sendfile'], self.version.package.path)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.version.downloads, 1)
+
+    @override_settings(PLUGIN_DOWNLOAD_DELIVERY='x-accel-redirect')
+    def test_blocked_version_is_not_offloaded(self):
+        self.version.approved = False
+        self.version.validation_status = 'blocked'
+        self.version.save()
+        request = self.factory.get('/')
+
+        response = version_download(request, self.plugin.package_name, self.version.version)
+
+        self.version.refresh_from_db()
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(self.version.downloads, 0)
+
+    @override_settings(PLUGIN_DOWNLOAD_DELIVERY='ftp')
+    def test_version_download_unknown_delivery(self):
+        request = self.factory.get('/')
+
+        with self.assertRaises(ImproperlyConfigured):
+            version_download(request, self.plugin.package_name, self.version.version)
+
+    @override_settings(PLUGIN_DOWNLOADS_FLUSH_INTERVAL=60)
+    def test_buffered_version_download(self):
+        request = self.factory.get('/')
+
+        response = version_download(request, self.plugin.package_name, self.version.version)
+
+        self.version.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        # Counted by the flush task, not in the request
+        self.assertEqual(self.version.downloads, 0)
+        self.assertEqual(PendingPluginVersionDownload.objects.count(), 1)
+        self.assertFalse(PluginVersionDownload.objects.exists())
+
+        self.assertEqual(flush_plugin_downloads(), 1)
+
+        self.version.refresh_from_db()
+        self.plugin.refresh_from_db()
+        self.assertEqual(self.version.downloads, 1)
+        self.assertEqual(self.plugin.downloads, 1)
+        self.assertEqual(self.plugin.popularity, 1)
+        self.assertFalse(PendingPluginVersionDownload.objects.exists())
+
+
+class TestVersionDownloadRange(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='12345'
+        )
+        self.plugin = Plugin.objects.create(
+            package_name="test-package",
+            created_by=self.user,
+        )
+        self.content = b'0123456789'
+        self.version = PluginVersion.objects.create(
+            plugin=self.plugin,
+            version="1.0.0",
+            created_by=self.user,
+            package=SimpleUploadedFile("test.zip", self.content),
+            min_qg_version='3.1.1',
+            max_qg_version='3.3.0'
+        )
+        self.content_sha256 = hashlib.sha256(self.content).hexdigest()
+        self.etag = '"%s"' % self.content_sha256
+
+    def _download(self, **headers):
+        request = self.factory.get('/', headers=headers)
+        response = version_download(request, self.plugin.package_name, self.version.version)
+        self.version.refresh_from_db()
+        return response
+
+    def test_validator_headers(self):
+        response = self._download()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], self.etag)
+
+    def test_unhashed_package_hashed_once(self):
+        # A package stored before the digests were recorded
+        PluginVersion.objects.filter(pk=self.version.pk).update(package_sha256='')
+        self.version.refresh_from_db()
+
+        with patch('plugins.views.file_sha256', wraps=file_sha256) as hash_file:
+            response = self._download()
+            self.assertEqual(self.version.package_sha256, self.content_sha256)
+            response = self._download(Range='bytes=2-5')
+
+        self.assertEqual(response['ETag'], self.etag)
+        hash_file.assert_called_once()
+
+    def test_range_request(self):
+        response = self._download(Range='bytes=2-5')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(response['ETag'], self.etag)
+
+    def test_open_and_suffix_ranges(self):
+        response = self._download(Range='bytes=7-')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        self.assertEqual(response['Content-Range'], 'bytes 7-9/10')
+
+        response = self._download(Range='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), b'6789')
+        self.assertEqual(response['Content-Range'], 'bytes 6-9/10')
+
+    def test_unsatisfiable_range(self):
+        response = self._download(Range='bytes=10-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        self.assertEqual(self.version.downloads, 0)
+
+    def test_multiple_ranges_are_ignored(self):
+        response = self._download(Range='bytes=0-1,4-5')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_if_range(self):
+        response = self._download(Range='bytes=5-', If_Range=self.etag)
+        self.assertEqual(response.status_code, 206)
+
+        # The package changed: the whole new package is sent
+        response = self._download(Range='bytes=5-', If_Range='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_download_counted_once(self):
+        # A download resumed after an interruption
+        self._download(Range='bytes=0-3')
+        self._download(Range='bytes=4-', If_Range=self.etag)
+
+        self.plugin.refresh_from_db()
+        self.assertEqual(self.version.downloads, 1)
+        self.assertEqual(self.plugin.downloads, 1)
+
+    @override_settings(PLUGIN_DOWNLOAD_DELIVERY='x-accel-redirect')
+    def test_range_handed_over_to_the_web_server(self):
+        response = self._download(Range='bytes=4-')
+
+        # nginx answers the range itself
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Accel-Redirect', response)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.version.downloads, 0)
+
+
+class TestFlushPluginDownloads(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='12345'
+        )
+        self.plugin = Plugin.objects.create(
+            package_name="test-package",
+            created_by=self.user,
+        )
+        self.version = self._create_version("1.0.0")
+        self.other_version = self._create_version("1.1.0")
+        self.today = timezone.now().date()
+
+    def _create_version(self, version):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            version=version,
+            created_by=self.user,
+            package=SimpleUploadedFile("test.zip", b"file_content"),
+            min_qg_version='3.1.1',
+            max_qg_version='3.3.0'
+        )
+
+    def _buffer_downloads(self, version, count, country_code='ID', country_name='Indonesia'):
+        PendingPluginVersionDownload.objects.bulk_create([
+            PendingPluginVersionDownload(
+                plugin_version=version,
+                download_date=self.today,
+                country_code=country_code,
+                country_name=country_name,
+            )
+            for _ in range(count)
+        ])
+
+    def test_flush_plugin_downloads(self):
+        self._buffer_downloads(self.version, 3)
+        self._buffer_downloads(self.version, 1, 'N/D', 'N/D')
+        self._buffer_downloads(self.other_version, 2)
+
+        self.assertEqual(flush_plugin_downloads(), 6)
+
+        self.version.refresh_from_db()
+        self.other_version.refresh_from_db()
+        self.plugin.refresh_from_db()
+        self.assertEqual(self.version.downloads, 4)
+        self.assertEqual(self.other_version.downloads, 2)
+        self.assertEqual(self.plugin.downloads, 6)
+        self.assertEqual(
+            PluginVersionDownload.objects.get(
+                plugin_version=self.version, country_code='ID'
+            ).download_count,
+            3
+        )
+        self.assertEqual(
+            PluginVersionDownload.objects.get(
+                plugin_version=self.version, country_code='N/D'
+            ).download_count,
+            1
+        )
+        self.assertFalse(PendingPluginVersionDownload.objects.exists())
+
+    def test_flush_adds_to_existing_stats(self):
+        PluginVersionDownload.objects.create(
+            plugin_version=self.version,
+            download_date=self.today,
+            country_code='ID',
+            country_name='Indonesia',
+            download_count=5,
+        )
+        self._buffer_downloads(self.version, 2)
+
+        flush_plugin_downloads()
+
+        self.assertEqual(
+            PluginVersionDownload.objects.get(plugin_version=self.version).download_count,
+            7
+        )
+
+    def test_flush_in_batches(self):
+        self._buffer_downloads(self.version, 5)
+
+        self.assertEqual(flush_plugin_downloads(batch_size=2), 5)
+
+        self.version.refresh_from_db()
+        self.plugin.refresh_from_db()
+        self.assertEqual(self.version.downloads, 5)
+        self.assertEqual(self.plugin.downloads, 5)
+        self.assertEqual(
+            PluginVersionDownload.objects.get(plugin_version=self.version).download_count,
+            5
+        )
+
+    def test_flush_without_pending_downloads(self):
+        self.assertEqual(flush_plugin_downloads(), 0)
@@ -0,0 +1,178 @@
+"""
+Tests for the download stats rollups and the plugin stats endpoint.
+"""
+
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from plugins.models import (
+    Plugin,
+    PluginCountryMonthlyDownloads,
+    PluginDailyDownloads,
+    PluginMonthlyDownloads,
+    PluginVersion,
+    PluginVersionDownload,
+)
+from plugins.tasks.rollup_download_stats import (
+    month_end,
+    rollup_download_stats,
+    rollup_downloads,
+)
+
+
+class TestDownloadStatsRollups(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="creator", password="pw")
+        self.plugin = Plugin.objects.create(
+            package_name="test_plugin",
+            name="Test Plugin",
+            created_by=self.user,
+            description="Test plugin description",
+        )
+        self.version = self._create_version("1.0")
+        self.other_version = self._create_version("1.1")
+        self.today = timezone.now().date()
+        self.last_month = (
+            self.today.replace(day=1) - datetime.timedelta(days=1)
+        ).replace(day=10)
+
+    def _create_version(self, version):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            version=version,
+            created_by=self.user,
+            package=SimpleUploadedFile("test.zip", b"file_content"),
+            min_qg_version="3.0",
+            max_qg_version="3.99",
+        )
+
+    def _record_downloads(self, version, date, count, country_code="ID"):
+        PluginVersionDownload.objects.create(
+            plugin_version=version,
+            download_date=date,
+            country_code=country_code,
+            country_name={"ID": "Indonesia", "FR": "France"}[country_code],
+            download_count=count,
+        )
+
+    def test_month_end(self):
+        self.assertEqual(
+            month_end(datetime.date(2024, 2, 10)), datetime.date(2024, 2, 29)
+        )
+        self.assertEqual(
+            month_end(datetime.date(2025, 12, 31)), datetime.date(2025, 12, 31)
+        )
+
+    def test_rollup_downloads(self):
+        self._record_downloads(self.version, self.last_month, 3)
+        self._record_downloads(self.other_version, self.last_month, 2, "FR")
+        self._record_downloads(
+            self.version, self.last_month + datetime.timedelta(days=1), 4
+        )
+
+        first_date = self.last_month.replace(day=1)
+        rollup_downloads(first_date, month_end(first_date))
+
+        daily = PluginDailyDownloads.objects.filter(plugin=self.plugin).order_by("date")
+        self.assertEqual([row.downloads for row in daily], [5, 4])
+        monthly = PluginMonthlyDownloads.objects.get(plugin=self.plugin)
+        self.assertEqual(monthly.month, first_date)
+        self.assertEqual(monthly.downloads, 9)
+        countries = {
+            row.country_code: row.downloads
+            for row in PluginCountryMonthlyDownloads.objects.filter(plugin=self.plugin)
+        }
+        self.assertEqual(countries, {"ID": 7, "FR": 2})
+
+    def test_rollup_download_stats_refreshes_recent_days(self):
+        self._record_downloads(self.version, self.today, 1)
+        rollup_download_stats()
+        PluginVersionDownload.objects.filter(download_date=self.today).update(
+            download_count=6
+        )
+
+        rollup_download_stats()
+
+        self.assertEqual(
+            PluginDailyDownloads.objects.get(
+                plugin=self.plugin, date=self.today
+            ).downloads,
+            6,
+        )
+        self.assertEqual(
+            PluginMonthlyDownloads.objects.get(
+                plugin=self.plugin, month=self.today.replace(day=1)
+            ).downloads,
+            6,
+        )
+
+    def test_backfill_download_stats(self):
+        self._record_downloads(self.version, self.last_month, 3)
+        self._record_downloads(self.version, self.today, 2)
+        out = StringIO()
+
+        call_command("backfill_download_stats", stdout=out)
+
+        self.assertIn("Backfilled 2 months", out.getvalue())
+        monthly = PluginMonthlyDownloads.objects.filter(plugin=self.plugin).order_by(
+            "month"
+        )
+        self.assertEqual([row.downloads for row in monthly], [3, 2])
+
+    def test_plugin_download_stats(self):
+        self._record_downloads(self.version, self.last_month, 3)
+        self._record_downloads(self.version, self.today, 2, "FR")
+        call_command("backfill_download_stats", stdout=StringIO())
+        url = reverse("plugin_download_stats", args=[self.plugin.package_name])
+
+        response = self.client.get(url, {"days": 400})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["package_name"], "test_plugin")
+        self.assertEqual(
+            data["daily"],
+            [
+                {"date": self.last_month.isoformat(), "downloads": 3},
+                {"date": self.today.isoformat(), "downloads": 2},
+            ],
+        )
+        self.assertEqual(
+            [row["downloads"] for row in data["monthly"]],
+            [3, 2],
+        )
+        self.assertEqual(
+            data["countries"][-1],
+            {
+                "month": self.today.strftime("%Y-%m"),
+                "country_code": "FR",
+                "country_name": "France",
+                "downloads": 2,
+            },
+        )
+
+        # Only the current month
+        response = self.client.get(url, {"days": 1, "months": 1})
+        data = response.json()
+        self.assertEqual(len(data["daily"]), 1)
+        self.assertEqual(len(data["countries"]), 1)
+
+    def test_plugin_download_stats_invalid_parameters(self):
+        url = reverse("plugin_download_stats", args=[self.plugin.package_name])
+
+        response = self.client.get(url, {"days": "all"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_plugin_download_stats_unknown_plugin(self):
+        url = reverse("plugin_download_stats", args=["unknown_plugin"])
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 404)
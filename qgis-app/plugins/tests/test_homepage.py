@@ -0,0 +1,89 @@
+"""
+Tests for the cache of the homepage plugin sections.
+"""
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from plugins.models import Plugin, PluginVersion
+
+HOMEPAGE_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"test-homepage-{alias}",
+    }
+    for alias in ("default", "catalogue")
+}
+
+
+@override_settings(CACHES=HOMEPAGE_CACHES)
+class HomepageCacheTest(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="pw")
+        # The catalogue revision is bumped once the transaction is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plugin = Plugin.objects.create(
+                created_by=self.creator,
+                package_name="homepage_plugin",
+                name="Homepage plugin",
+                description="A plugin shown on the homepage",
+            )
+            PluginVersion.objects.create(
+                plugin=self.plugin,
+                created_by=self.creator,
+                version="1.0",
+                min_qg_version="3.0",
+                max_qg_version="4.99",
+                approved=True,
+            )
+        self.url = reverse("homepage")
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        plugin_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            # The plugin sections, not the tag cloud of the base template
+            if query["sql"].startswith('SELECT "plugins_plugin".')
+        ]
+        return response, plugin_queries
+
+    def test_sections_are_cached(self):
+        response, plugin_queries = self._get()
+        self.assertContains(response, "Homepage plugin")
+        self.assertTrue(plugin_queries)
+
+        response, plugin_queries = self._get()
+
+        self.assertContains(response, "Homepage plugin")
+        self.assertEqual(plugin_queries, [])
+
+    def test_sections_are_refreshed_on_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            other_plugin = Plugin.objects.create(
+                created_by=self.creator,
+                package_name="other_plugin",
+                name="Other plugin",
+                description="A plugin waiting for approval",
+            )
+            version = PluginVersion.objects.create(
+                plugin=other_plugin,
+                created_by=self.creator,
+                version="1.0",
+                min_qg_version="3.0",
+                max_qg_version="4.99",
+                approved=False,
+            )
+        response, _ = self._get()
+        self.assertNotContains(response, "Other plugin")
+
+        version.approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            version.save()
+        response, plugin_queries = self._get()
+
+        self.assertContains(response, "Other plugin")
+        self.assertTrue(plugin_queries)
@@ -1,15 +1,28 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
 from freezegun import freeze_time
+from plugins.benchmark_utils import build_catalogue
 from plugins.models import (
     VALIDATION_STATUS_BLOCKED,
     Plugin,
     PluginEmailConfirmation,
+    PluginReviewState,
+    PluginTagStat,
     PluginVersion,
     PluginVersionFeedback,
+    review_queue_counts,
+    update_ranking_scores,
 )
+from plugins.tasks.update_ranking_scores import update_plugin_ranking_scores
+from plugins.templatetags.plugins_tagcloud import T_MAX, T_MIN, get_plugins_tagcloud
+from taggit.models import Tag
 
 
 class PluginVersionFeedbackTest(TestCase):
@@ -172,3 +185,464 @@ class PluginVersionFeedbackManagerTest(TestCase):
         self.assertIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
         PluginEmailConfirmation.objects.filter(email=self.plugin_2.email).delete()
         self.assertNotIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
+
+    def test_review_queue_counts(self):
+        self.assertEqual(
+            review_queue_counts(), {"completed": 0, "received": 1, "pending": 1}
+        )
+
+        self.feedback_1.is_completed = True
+        self.feedback_1.save()
+        self.assertEqual(
+            review_queue_counts(), {"completed": 1, "received": 0, "pending": 1}
+        )
+
+        self.feedback_1.delete()
+        self.assertEqual(
+            review_queue_counts(), {"completed": 0, "received": 0, "pending": 2}
+        )
+
+    def test_review_state_follows_the_latest_version(self):
+        self.version_2.approved = True
+        self.version_2.save()
+        self.assertNotIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
+
+        version = PluginVersion.objects.create(
+            plugin=self.plugin_2,
+            created_by=self.creator,
+            min_qg_version="0.0.0",
+            max_qg_version="99.99.99",
+            version="2.1",
+            approved=False,
+            external_deps="test",
+        )
+        state = PluginReviewState.objects.get(plugin=self.plugin_2)
+        self.assertEqual(state.latest_version, version)
+        self.assertEqual(state.latest_version_date, version.created_on)
+        self.assertIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
+
+    def test_review_state_follows_the_email_confirmation(self):
+        self.plugin_2.email = "other@example.com"
+        self.plugin_2.save()
+        self.assertNotIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
+
+        confirmation, _ = PluginEmailConfirmation.create_for_email(
+            self.plugin_2.email, [self.plugin_2]
+        )
+        self.assertNotIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
+        confirmation.confirm()
+        self.assertIn(self.plugin_2, list(Plugin.feedback_pending_objects.all()))
+
+    def test_update_review_states_command(self):
+        PluginReviewState.objects.all().delete()
+        self.assertFalse(Plugin.feedback_pending_objects.exists())
+        out = StringIO()
+
+        call_command("update_review_states", stdout=out)
+
+        self.assertIn("Done. 2 plugins updated", out.getvalue())
+        self.assertEqual(list(Plugin.feedback_pending_objects.all()), [self.plugin_2])
+
+    def test_review_menu_badges(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse("feedback_pending_plugins"))
+
+        self.assertContains(
+            response,
+            '<span class="tag is-rounded is-size-7 ml-1">1</span>',
+            count=4,
+        )
+
+
+class PluginVersionPointersTest(TestCase):
+    fixtures = [
+        "fixtures/auth.json",
+    ]
+
+    def setUp(self):
+        self.creator = User.objects.get(id=2)
+        self.plugin = Plugin.objects.create(
+            created_by=self.creator,
+            repository="http://example.com",
+            tracker="http://example.com",
+            package_name="test-pointers",
+            name="test pointers",
+            about="this is a test for the version pointers",
+        )
+
+    def _create_version(self, version, approved=True, experimental=False):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            created_by=self.creator,
+            min_qg_version="3.0.0",
+            max_qg_version="3.99.99",
+            version=version,
+            approved=approved,
+            experimental=experimental,
+        )
+
+    def _pointers(self):
+        plugin = Plugin.objects.get(pk=self.plugin.pk)
+        return (
+            plugin.stable_version,
+            plugin.experimental_version,
+            plugin.latest_version,
+        )
+
+    def test_pointers_on_version_save(self):
+        self.assertEqual(self._pointers(), (None, None, None))
+
+        stable = self._create_version("1.0")
+        experimental = self._create_version("1.1", experimental=True)
+        unapproved = self._create_version("1.2", approved=False)
+
+        self.assertEqual(self._pointers(), (stable, experimental, unapproved))
+        plugin = Plugin.approved_objects.get(pk=self.plugin.pk)
+        self.assertEqual(plugin.latest_version_date, experimental.created_on)
+        self.assertTrue(plugin.approved)
+        # The instance attached to the versions is kept up to date
+        self.assertEqual(self.plugin.latest_version, unapproved)
+
+    def test_pointers_on_approve_and_unapprove(self):
+        stable = self._create_version("1.0")
+        new_stable = self._create_version("1.1", approved=False)
+        self.assertEqual(self._pointers(), (stable, None, new_stable))
+
+        new_stable.approved = True
+        new_stable.save()
+        self.assertEqual(self._pointers(), (new_stable, None, new_stable))
+
+        new_stable.approved = False
+        new_stable.save()
+        stable.approved = False
+        stable.save()
+        self.assertEqual(self._pointers(), (None, None, new_stable))
+        self.assertIsNone(Plugin.objects.get(pk=self.plugin.pk).latest_version_date)
+        self.assertFalse(Plugin.objects.get(pk=self.plugin.pk).approved)
+
+    def test_pointers_on_version_delete(self):
+        stable = self._create_version("1.0")
+        new_stable = self._create_version("1.1")
+
+        new_stable.delete()
+
+        self.assertEqual(self._pointers(), (stable, None, stable))
+
+    def test_plugin_save_keeps_pointers(self):
+        plugin = Plugin.objects.get(pk=self.plugin.pk)
+        stable = self._create_version("1.0")
+
+        # plugin was loaded before the version was created
+        plugin.description = "updated"
+        plugin.save()
+
+        self.assertEqual(self._pointers(), (stable, None, stable))
+
+    def test_plugin_delete(self):
+        self._create_version("1.0")
+        self._create_version("1.1", experimental=True)
+
+        self.plugin.delete()
+
+        self.assertFalse(Plugin.objects.filter(pk=self.plugin.pk).exists())
+
+    def test_update_version_pointers_command(self):
+        stable = self._create_version("1.0")
+        Plugin.objects.update(
+            stable_version=None, latest_version=None, latest_version_date=None
+        )
+        out = StringIO()
+
+        call_command("update_version_pointers", stdout=out)
+
+        self.assertEqual(self._pointers(), (stable, None, stable))
+        self.assertIn("Updated 1 plugins", out.getvalue())
+
+
+class PluginRankingScoresTest(TestCase):
+    fixtures = [
+        "fixtures/auth.json",
+    ]
+
+    def setUp(self):
+        self.creator = User.objects.get(id=2)
+        self.plugin = Plugin.objects.create(
+            created_by=self.creator,
+            repository="http://example.com",
+            tracker="http://example.com",
+            package_name="test-ranking",
+            name="test ranking",
+            about="this is a test for the ranking scores",
+        )
+
+    def _scores(self):
+        plugin = Plugin.objects.get(pk=self.plugin.pk)
+        return [
+            round(plugin.average_vote, 3),
+            round(plugin.weighted_rating, 3),
+            round(plugin.popularity, 3),
+        ]
+
+    def test_scores_on_save(self):
+        # No vote yet: the Bayesian average is the prior
+        self.assertEqual(self._scores(), [0, 3, 0])
+
+        # What djangoratings does when a vote is recorded
+        self.plugin.downloads = 300
+        self.plugin.rating_votes = 2
+        self.plugin.rating_score = 8
+        self.plugin.save()
+
+        self.assertEqual(self._scores(), [3.998, 3.285, 698.01])
+        plugin = Plugin.objects.get(pk=self.plugin.pk)
+        self.assertAlmostEqual(plugin.average_vote, plugin.avg_vote)
+
+    def test_update_ranking_scores(self):
+        self.assertEqual(update_ranking_scores(Plugin.objects.all()), 0)
+
+        Plugin.objects.filter(pk=self.plugin.pk).update(
+            downloads=300, rating_votes=2, rating_score=8
+        )
+        self.assertEqual(update_plugin_ranking_scores(), 1)
+
+        self.assertEqual(self._scores(), [3.998, 3.285, 698.01])
+        self.assertEqual(update_ranking_scores(Plugin.objects.all()), 0)
+
+    def test_popular_plugins_order(self):
+        build_catalogue(plugins=20, versions=40, tags=2, authors=5, seed=4)
+        for i, plugin in enumerate(Plugin.objects.order_by("pk")):
+            Plugin.objects.filter(pk=plugin.pk).update(
+                rating_votes=i % 4, rating_score=(i % 4) * (i % 5)
+            )
+        update_ranking_scores(Plugin.objects.all())
+        # The former formula, computed on each request
+        legacy_popularity = Plugin.popular_objects.extra(
+            select={
+                "legacy_popularity": "plugins_plugin.downloads * "
+                "(1 + (rating_score/(rating_votes+0.01)/3))"
+            }
+        ).values_list("pk", "legacy_popularity")
+
+        self.assertEqual(
+            list(Plugin.popular_objects.values_list("pk", flat=True)),
+            [pk for pk, _ in sorted(legacy_popularity, key=lambda row: -row[1])],
+        )
+
+
+class PluginTagStatTest(TestCase):
+    fixtures = [
+        "fixtures/auth.json",
+    ]
+
+    def setUp(self):
+        self.creator = User.objects.get(id=2)
+        self.plugins = [self._create_plugin(i) for i in range(3)]
+        self.versions = [
+            PluginVersion.objects.create(
+                plugin=plugin,
+                created_by=self.creator,
+                min_qg_version="3.0.0",
+                max_qg_version="3.99.99",
+                version="1.0",
+                approved=True,
+            )
+            for plugin in self.plugins
+        ]
+
+    def _create_plugin(self, i):
+        return Plugin.objects.create(
+            created_by=self.creator,
+            repository="http://example.com",
+            tracker="http://example.com",
+            package_name=f"test-tags-{i}",
+            name=f"test tags {i}",
+            about="this is a test for the tag stats",
+        )
+
+    def _stats(self):
+        return dict(PluginTagStat.objects.values_list("tag__name", "plugin_count"))
+
+    def test_stats_on_tags_change(self):
+        self.plugins[0].tags.set(["raster", "vector"])
+        self.plugins[1].tags.set(["vector"])
+        self.assertEqual(self._stats(), {"raster": 1, "vector": 2})
+
+        self.plugins[0].tags.set(["vector", "web"])
+        self.assertEqual(self._stats(), {"vector": 2, "web": 1})
+
+        self.plugins[1].tags.clear()
+        self.assertEqual(self._stats(), {"vector": 1, "web": 1})
+
+        self.plugins[0].delete()
+        self.assertEqual(self._stats(), {})
+
+    def test_stats_on_approval_change(self):
+        for plugin in self.plugins:
+            plugin.tags.set(["vector"])
+        self.assertEqual(self._stats(), {"vector": 3})
+
+        self.versions[0].approved = False
+        self.versions[0].save()
+        self.assertEqual(self._stats(), {"vector": 2})
+
+        self.versions[1].delete()
+        self.assertEqual(self._stats(), {"vector": 1})
+
+        self.versions[0].approved = True
+        self.versions[0].save()
+        self.assertEqual(self._stats(), {"vector": 2})
+
+    def test_stats_on_stable_version_delete(self):
+        self.plugins[0].tags.set(["vector"])
+        PluginVersion.objects.create(
+            plugin=self.plugins[0],
+            created_by=self.creator,
+            min_qg_version="3.0.0",
+            max_qg_version="3.99.99",
+            version="1.1",
+            approved=True,
+        )
+        self.plugins[0].refresh_from_db()
+        self.assertEqual(self._stats(), {"vector": 1})
+
+        self.plugins[0].stable_version.delete()
+
+        self.assertEqual(self._stats(), {"vector": 1})
+
+    def test_stats_kept_when_approval_unchanged(self):
+        self.plugins[0].tags.set(["vector"])
+
+        with patch("plugins.models.update_tag_stats") as update_tag_stats:
+            self.versions[0].changelog = "Fixed"
+            self.versions[0].save()
+            PluginVersion.objects.create(
+                plugin=self.plugins[0],
+                created_by=self.creator,
+                min_qg_version="3.0.0",
+                max_qg_version="3.99.99",
+                version="1.1",
+                approved=False,
+            ).delete()
+
+        update_tag_stats.assert_not_called()
+        self.assertEqual(self._stats(), {"vector": 1})
+
+    def test_rebuild_tag_stats(self):
+        self.plugins[0].tags.set(["raster", "vector"])
+        self.plugins[2].tags.set(["vector"])
+        stats = self._stats()
+        PluginTagStat.objects.filter(tag__name="raster").delete()
+        PluginTagStat.objects.filter(tag__name="vector").update(plugin_count=5)
+        stale_tag = Tag.objects.create(name="stale")
+        PluginTagStat.objects.create(tag=stale_tag, plugin_count=1)
+        out = StringIO()
+
+        call_command("rebuild_tag_stats", stdout=out)
+
+        self.assertIn("2 tags with approved plugins", out.getvalue())
+        self.assertEqual(self._stats(), stats)
+
+    def test_tagcloud(self):
+        self.plugins[0].tags.set(["raster", "vector"])
+        for plugin in self.plugins[1:]:
+            plugin.tags.set(["vector"])
+        context = {}
+
+        with patch(
+            "plugins.templatetags.plugins_tagcloud.TAGCLOUD_COUNT_GTE", None
+        ), self.assertNumQueries(1):
+            get_plugins_tagcloud(context, "tags")
+
+        self.assertEqual(
+            [(tag.name, tag.num_times, tag.weight) for tag in context["tags"]],
+            [("raster", 1, T_MIN), ("vector", 3, T_MAX)],
+        )
+
+
+class PluginManagersTest(TestCase):
+    """
+    The managers select the plugins with Exists() subqueries: they must
+    return the same plugins as the former JOIN + DISTINCT queries.
+    """
+
+    def setUp(self):
+        build_catalogue(plugins=30, versions=120, tags=5, authors=10, seed=1)
+        plugins = list(Plugin.objects.order_by("pk"))
+        for plugin in plugins[::4]:
+            plugin.featured = True
+            plugin.save()
+        for plugin in plugins[1::5]:
+            plugin.deprecated = True
+            plugin.save()
+        for plugin in plugins[2::6]:
+            plugin.server = True
+            plugin.save()
+        # Fresh plugins and recently updated ones
+        Plugin.objects.filter(pk__in=[p.pk for p in plugins[::3]]).update(
+            created_on=datetime.now() - timedelta(days=400)
+        )
+        PluginVersion.objects.filter(plugin__in=plugins[::2]).update(
+            created_on=datetime.now() - timedelta(days=400)
+        )
+
+    def assertSameResults(self, manager, **filters):
+        queryset = getattr(Plugin, manager).order_by("pk")
+        legacy_queryset = (
+            Plugin.base_objects.filter(**filters).order_by("pk").distinct()
+        )
+        self.assertTrue(queryset.exists())
+        self.assertEqual(list(queryset), list(legacy_queryset))
+        self.assertEqual(queryset.count(), legacy_queryset.count())
+
+    def test_approved_managers(self):
+        approved = {"pluginversion__approved": True}
+        self.assertSameResults("approved_objects", **approved)
+        self.assertSameResults(
+            "stable_objects", pluginversion__experimental=False, **approved
+        )
+        self.assertSameResults(
+            "experimental_objects", pluginversion__experimental=True, **approved
+        )
+        self.assertSameResults("featured_objects", featured=True, **approved)
+        self.assertSameResults("server_objects", server=True, **approved)
+        self.assertSameResults(
+            "new_qgis_ready_objects",
+            pluginversion__max_qg_version__gte=f"{settings.NEW_QGIS_MAJOR_VERSION}.0",
+            **approved,
+        )
+
+    def test_fresh_and_latest_managers(self):
+        since = datetime.now() - timedelta(days=30)
+        self.assertSameResults(
+            "fresh_objects",
+            pluginversion__approved=True,
+            deprecated=False,
+            created_on__gte=since,
+        )
+        self.assertSameResults(
+            "latest_objects",
+            pluginversion__approved=True,
+            pluginversion__created_on__gte=since,
+            deprecated=False,
+        )
+
+    def test_popularity_managers(self):
+        filters = {"pluginversion__approved": True, "deprecated": False}
+        for manager in (
+            "popular_objects",
+            "most_downloaded_objects",
+            "most_voted_objects",
+            "best_rated_objects",
+        ):
+            with self.subTest(manager=manager):
+                self.assertSameResults(manager, **filters)
+
+    def test_unapproved_and_deprecated_managers(self):
+        self.assertSameResults(
+            "unapproved_objects",
+            pluginversion__approved=False,
+            deprecated=False,
+            is_deleted=False,
+        )
+        self.assertSameResults("deprecated_objects", deprecated=True)
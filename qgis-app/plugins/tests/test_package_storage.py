@@ -0,0 +1,228 @@
+"""
+Tests for the content-addressed storage of the plugin packages.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+from plugins.models import Plugin, PluginVersion
+from plugins.tests import TestMediaRootMixin
+from plugins.upload_handlers import (
+    Sha256MemoryFileUploadHandler,
+    Sha256TemporaryFileUploadHandler,
+)
+
+CONTENT = b"plugin package content"
+CONTENT_SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+class TestPackageStorage(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="creator", password="pw")
+        self.plugin = Plugin.objects.create(
+            package_name="test_plugin",
+            name="Test Plugin",
+            created_by=self.user,
+            description="Test plugin description",
+        )
+
+    def _create_version(self, version, content=CONTENT):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            version=version,
+            created_by=self.user,
+            approved=True,
+            package=SimpleUploadedFile("test.zip", content),
+            min_qg_version="3.0",
+            max_qg_version="3.99",
+        )
+
+    def test_package_stored_under_its_sha256(self):
+        version = self._create_version("1.0")
+
+        self.assertEqual(version.package_sha256, CONTENT_SHA256)
+        self.assertEqual(version.package_size, len(CONTENT))
+        self.assertEqual(
+            version.package.name,
+            "packages/sha256/%s/%s.zip" % (CONTENT_SHA256[:2], CONTENT_SHA256),
+        )
+        with open(version.package.path, "rb") as f:
+            self.assertEqual(f.read(), CONTENT)
+
+    def test_identical_packages_share_one_file(self):
+        version = self._create_version("1.0")
+        other_version = self._create_version("1.1")
+        third_version = self._create_version("1.2", b"other content")
+
+        self.assertEqual(version.package.name, other_version.package.name)
+        self.assertNotEqual(version.package.name, third_version.package.name)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(version.package.path))),
+            1,
+        )
+
+    def test_shared_package_kept_on_delete(self):
+        version = self._create_version("1.0")
+        other_version = self._create_version("1.1")
+        path = version.package.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            version.delete()
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other_version.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_hash_in_feeds(self):
+        version = self._create_version("1.0")
+
+        response = self.client.get(reverse("xml_plugins"), {"qgis": "3.0"})
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertIn("<file_sha256>%s</file_sha256>" % CONTENT_SHA256, content)
+        self.assertIn("<file_size>%s</file_size>" % len(CONTENT), content)
+
+        data = version.to_json(include_detail=True)
+        self.assertEqual(data["package_sha256"], CONTENT_SHA256)
+        self.assertEqual(data["package_size"], len(CONTENT))
+
+    def test_download_etag_uses_stored_hash(self):
+        version = self._create_version("1.0")
+        PluginVersion.objects.filter(pk=version.pk).update(package_sha256="0" * 64)
+
+        response = self.client.get(
+            reverse(
+                "version_download",
+                args=[self.plugin.package_name, version.version],
+            )
+        )
+
+        self.assertEqual(response["ETag"], '"%s"' % ("0" * 64))
+
+    def test_hash_plugin_packages(self):
+        version = self._create_version("1.0")
+        PluginVersion.objects.filter(pk=version.pk).update(
+            package_sha256="", package_size=None
+        )
+        out = StringIO()
+
+        call_command("hash_plugin_packages", stdout=out)
+
+        version.refresh_from_db()
+        self.assertEqual(version.package_sha256, CONTENT_SHA256)
+        self.assertEqual(version.package_size, len(CONTENT))
+        self.assertIn("Hashed 1 packages, 0 missing", out.getvalue())
+
+
+class TestPackageStorageConcurrency(TestMediaRootMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="creator", password="pw")
+        self.plugin = Plugin.objects.create(
+            package_name="test_plugin",
+            name="Test Plugin",
+            created_by=self.user,
+            description="Test plugin description",
+        )
+
+    def _create_version(self, plugin, version):
+        return PluginVersion.objects.create(
+            plugin=plugin,
+            version=version,
+            created_by=self.user,
+            package=SimpleUploadedFile("test.zip", CONTENT),
+            min_qg_version="3.0",
+            max_qg_version="3.99",
+        )
+
+    def _in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def _wait_for_lock_wait(self):
+        for _ in range(100):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND NOT granted"
+                )
+                if cursor.fetchone():
+                    return
+            time.sleep(0.05)
+        self.fail("The deletion did not wait for the upload")
+
+    def test_package_uploaded_during_delete_kept(self):
+        version = self._create_version(self.plugin, "1.0")
+        path = version.package.path
+        # Of another plugin, the deletion and the upload only share the file
+        other_plugin = Plugin.objects.create(
+            package_name="other_plugin",
+            name="Other Plugin",
+            created_by=self.user,
+            description="Test plugin description",
+        )
+        stored = threading.Event()
+        release = threading.Event()
+
+        def upload():
+            with transaction.atomic():
+                self._create_version(other_plugin, "1.0")
+                stored.set()
+                release.wait(10)
+
+        uploading = self._in_thread(upload)
+        self.assertTrue(stored.wait(10))
+        deleting = self._in_thread(version.delete)
+        self._wait_for_lock_wait()
+        release.set()
+        uploading.join()
+        deleting.join()
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(PluginVersion.objects.get().package.path, path)
+
+
+class TestSha256UploadHandlers(TestCase):
+    def _upload(self, handler):
+        handler.handle_raw_input(BytesIO(CONTENT), {}, len(CONTENT), "boundary")
+        try:
+            handler.new_file("package", "test.zip", "application/zip", len(CONTENT))
+        except StopFutureHandlers:
+            pass
+        handler.receive_data_chunk(CONTENT[:10], 0)
+        handler.receive_data_chunk(CONTENT[10:], 10)
+        return handler.file_complete(len(CONTENT))
+
+    def test_memory_handler(self):
+        request = RequestFactory().post("/")
+        uploaded_file = self._upload(Sha256MemoryFileUploadHandler(request))
+
+        self.assertEqual(uploaded_file.sha256, CONTENT_SHA256)
+        self.assertEqual(uploaded_file.read(), CONTENT)
+
+    def test_temporary_file_handler(self):
+        request = RequestFactory().post("/")
+        uploaded_file = self._upload(Sha256TemporaryFileUploadHandler(request))
+
+        self.assertEqual(uploaded_file.sha256, CONTENT_SHA256)
+        uploaded_file.seek(0)
+        self.assertEqual(uploaded_file.read(), CONTENT)
+        uploaded_file.close()
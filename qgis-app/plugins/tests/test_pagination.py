@@ -0,0 +1,152 @@
+"""
+Tests for the keyset (cursor) pagination of the plugin listings.
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from plugins.benchmark_utils import build_catalogue
+from plugins.models import Plugin
+from plugins.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    estimated_count,
+    keyset_page,
+    keyset_sort_key,
+)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        build_catalogue(plugins=30, versions=90, tags=5, authors=10, seed=2)
+        plugins = list(Plugin.objects.order_by("pk"))
+        # Ties on the sort key and plugins without key
+        Plugin.objects.filter(pk__in=[p.pk for p in plugins[::3]]).update(downloads=42)
+        Plugin.objects.filter(pk__in=[p.pk for p in plugins[1::7]]).update(
+            latest_version_date=None
+        )
+
+    def walk(self, queryset, per_page, sort_by=None):
+        """
+        Returns the pks of the pages read forward, then backward from the
+        last page.
+        """
+        forward = []
+        page = keyset_page(queryset, per_page, sort_by=sort_by)
+        forward.append([plugin.pk for plugin in page])
+        while page.has_next():
+            page = keyset_page(queryset, per_page, page.next_cursor, sort_by)
+            forward.append([plugin.pk for plugin in page])
+        backward = [[plugin.pk for plugin in page]]
+        while page.has_previous():
+            page = keyset_page(queryset, per_page, page.previous_cursor, sort_by)
+            backward.insert(0, [plugin.pk for plugin in page])
+        return forward, backward
+
+    def assertWalksAll(self, queryset, sort_by, per_page=7):
+        forward, backward = self.walk(queryset, per_page, sort_by)
+        pks = [pk for page in forward for pk in page]
+        self.assertEqual(len(pks), queryset.count())
+        self.assertEqual(set(pks), set(queryset.values_list("pk", flat=True)))
+        self.assertEqual(forward, backward)
+        self.assertTrue(all(len(page) == per_page for page in forward[:-1]))
+
+    def test_walk_pages(self):
+        for sort_by in ("name", "-downloads", "downloads", "-latest_version_date"):
+            with self.subTest(sort_by=sort_by):
+                self.assertWalksAll(Plugin.objects.all(), sort_by)
+
+    def test_walk_pages_of_the_managers_scores(self):
+        for manager, sort_by in (
+            ("approved_objects", "-weighted_rating"),
+            ("approved_objects", "-average_vote"),
+            ("approved_objects", "-latest_version_date"),
+            ("popular_objects", None),
+        ):
+            with self.subTest(manager=manager, sort_by=sort_by):
+                queryset = getattr(Plugin, manager).all()
+                if sort_by:
+                    queryset = queryset.order_by(sort_by)
+                self.assertWalksAll(queryset, None)
+
+    def test_pages_follow_the_sort_order(self):
+        queryset = Plugin.objects.order_by("-downloads")
+        forward, _ = self.walk(queryset, 4)
+        pks = [pk for page in forward for pk in page]
+        expected = list(queryset.order_by("-downloads", "-pk").values_list("pk"))
+        self.assertEqual(pks, [pk for (pk,) in expected])
+
+    def test_keyset_sort_key(self):
+        self.assertIsNotNone(keyset_sort_key(Plugin.objects.all()))
+        self.assertIsNotNone(keyset_sort_key(Plugin.popular_objects.all()))
+        self.assertIsNone(keyset_sort_key(Plugin.objects.order_by("created_by")))
+        self.assertIsNone(keyset_sort_key(Plugin.objects.all(), "unknown"))
+
+    def test_cursor(self):
+        cursor = encode_cursor(1.5, 3, True)
+        self.assertEqual(decode_cursor(cursor), (1.5, 3, True))
+        for cursor in ("garbage", encode_cursor(1, "3")):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(cursor)
+
+    def test_estimated_count(self):
+        self.assertEqual(estimated_count(Plugin.objects.all()), (30, False))
+
+
+class PluginsListKeysetPaginationTest(TestCase):
+    def setUp(self):
+        build_catalogue(plugins=40, versions=80, tags=5, authors=10, seed=3)
+        self.url = reverse("approved_plugins")
+
+    def test_cursor_pages(self):
+        params = {"sort": "downloads", "order": "desc", "per_page": 20}
+        response = self.client.get(self.url, {"cursor": "", **params})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["keyset_pagination"])
+        page = response.context["page_obj"]
+        self.assertEqual(len(page), 20)
+        self.assertIsNone(page.previous_cursor)
+        self.assertContains(response, f"?cursor={page.next_cursor}&amp;sort=downloads")
+        first_page = [plugin.pk for plugin in page]
+
+        response = self.client.get(self.url, {"cursor": page.next_cursor, **params})
+        page = response.context["page_obj"]
+        second_page = [plugin.pk for plugin in page]
+        self.assertFalse(set(first_page) & set(second_page))
+
+        response = self.client.get(self.url, {"cursor": page.previous_cursor, **params})
+        self.assertEqual(
+            [plugin.pk for plugin in response.context["page_obj"]], first_page
+        )
+
+    def test_queries_do_not_grow_with_the_page_depth(self):
+        params = {"sort": "name", "order": "asc", "per_page": 5, "cursor": ""}
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(self.url, params)
+        next_cursor = response.context["page_obj"].next_cursor
+        for _ in range(3):
+            response = self.client.get(self.url, {**params, "cursor": next_cursor})
+            next_cursor = response.context["page_obj"].next_cursor
+        with CaptureQueriesContext(connection) as deep_page:
+            self.client.get(self.url, {**params, "cursor": next_cursor})
+
+        self.assertEqual(len(deep_page), len(first_page))
+        self.assertFalse(
+            any("OFFSET" in query["sql"] for query in deep_page.captured_queries)
+        )
+
+    def test_page_numbers_without_cursor(self):
+        response = self.client.get(self.url, {"page": 2, "per_page": 20})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["keyset_pagination"])
+        self.assertEqual(response.context["page_obj"].number, 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "garbage"})
+
+        self.assertEqual(response.status_code, 404)
@@ -12,6 +12,7 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from plugins.forms import PluginCreateForm
 from plugins.models import VALIDATION_STATUS_VALIDATING, Plugin, PluginVersion
+from plugins.tests import TEST_MEDIA_ROOT
 
 
 def do_nothing(*args, **kwargs):
@@ -21,6 +22,7 @@ def do_nothing(*args, **kwargs):
 TESTFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "testfiles"))
 
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class PluginCreateEmptyTestCase(TestCase):
     """Test creating empty plugins without versions"""
 
@@ -28,7 +30,6 @@ class PluginCreateEmptyTestCase(TestCase):
         "fixtures/auth.json",
     ]
 
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url = reverse("plugin_create_empty")
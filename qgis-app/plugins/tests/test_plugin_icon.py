@@ -0,0 +1,180 @@
+"""
+Tests for the icon metadata and thumbnails stored on the plugins.
+"""
+
+import os
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from PIL import Image
+from plugins.icon_utils import PLUGIN_ICON_THUMBNAILS
+from plugins.models import Plugin, PluginVersion
+from plugins.tasks.process_plugin_icon import process_plugin_icon
+from plugins.templatetags.plugin_utils import icon_thumbnail
+from plugins.tests import TestMediaRootMixin
+
+SVG_ICON = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="32px" height="32">'
+    b'<rect width="32" height="32"/></svg>'
+)
+
+
+def png_icon(name="icon.png", size=(64, 32)):
+    content = BytesIO()
+    Image.new("RGB", size, "green").save(content, "PNG")
+    return SimpleUploadedFile(name, content.getvalue(), "image/png")
+
+
+class PluginIconTest(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="creator", password="pw")
+
+    def create_plugin(self, icon):
+        with patch(
+            "plugins.tasks.process_plugin_icon.process_plugin_icon.delay"
+        ) as delay, self.captureOnCommitCallbacks(execute=True):
+            plugin = Plugin.objects.create(
+                package_name="test_plugin",
+                name="Test Plugin",
+                created_by=self.user,
+                description="Test plugin description",
+                icon=icon,
+            )
+        delay.assert_called_once_with(plugin.pk)
+        return plugin
+
+    def test_raster_icon(self):
+        plugin = self.create_plugin(png_icon())
+        self.assertFalse(plugin.icon_valid)
+
+        self.assertTrue(process_plugin_icon(plugin.pk))
+
+        plugin.refresh_from_db()
+        self.assertTrue(plugin.icon_valid)
+        self.assertEqual(plugin.icon_format, "PNG")
+        self.assertEqual((plugin.icon_width, plugin.icon_height), (64, 32))
+        self.assertEqual(set(plugin.icon_thumbnails), set(PLUGIN_ICON_THUMBNAILS))
+        thumbnail = plugin.icon_thumbnails["24x24"]
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (24, 12))
+        path = thumbnail["url"][len(settings.MEDIA_URL) :]
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, path)))
+        # Not upscaled
+        thumbnail = plugin.icon_thumbnails["128x128"]
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (64, 32))
+
+    def test_svg_icon(self):
+        plugin = self.create_plugin(
+            SimpleUploadedFile("icon.svg", SVG_ICON, "image/svg+xml")
+        )
+
+        self.assertTrue(process_plugin_icon(plugin.pk))
+
+        plugin.refresh_from_db()
+        self.assertTrue(plugin.icon_valid)
+        self.assertEqual(plugin.icon_format, "SVG")
+        self.assertEqual((plugin.icon_width, plugin.icon_height), (32, 32))
+        self.assertEqual(plugin.icon_thumbnails, {})
+
+    def test_invalid_icon(self):
+        plugin = self.create_plugin(
+            SimpleUploadedFile("icon.png", b"not an image", "image/png")
+        )
+
+        self.assertFalse(process_plugin_icon(plugin.pk))
+
+        plugin.refresh_from_db()
+        self.assertFalse(plugin.icon_valid)
+        self.assertEqual(plugin.icon_thumbnails, {})
+
+    def test_save_keeps_the_icon_metadata(self):
+        plugin = self.create_plugin(png_icon())
+        process_plugin_icon(plugin.pk)
+
+        # An instance read before the icon was processed
+        plugin.description = "Updated description"
+        plugin.save()
+
+        plugin.refresh_from_db()
+        self.assertTrue(plugin.icon_valid)
+        self.assertTrue(plugin.icon_thumbnails)
+
+    def test_new_icon_resets_the_icon_metadata(self):
+        plugin = self.create_plugin(png_icon())
+        process_plugin_icon(plugin.pk)
+        plugin.refresh_from_db()
+
+        plugin.icon = png_icon("new_icon.png")
+        with patch(
+            "plugins.tasks.process_plugin_icon.process_plugin_icon.delay"
+        ) as delay, self.captureOnCommitCallbacks(execute=True):
+            plugin.save()
+
+        delay.assert_called_once_with(plugin.pk)
+        plugin.refresh_from_db()
+        self.assertFalse(plugin.icon_valid)
+        self.assertEqual(plugin.icon_thumbnails, {})
+
+    def test_update_plugin_icons_command(self):
+        plugin = self.create_plugin(png_icon())
+        out = StringIO()
+
+        call_command("update_plugin_icons", stdout=out)
+
+        self.assertIn("Done. 1 valid icons, 0 invalid icons.", out.getvalue())
+        plugin.refresh_from_db()
+        self.assertTrue(plugin.icon_valid)
+
+    def test_templates_read_the_stored_thumbnails(self):
+        plugin = self.create_plugin(png_icon())
+        PluginVersion.objects.create(
+            plugin=plugin,
+            version="1.0",
+            created_by=self.user,
+            approved=True,
+            package=SimpleUploadedFile("test.zip", b"package"),
+            min_qg_version="3.0",
+            max_qg_version="3.99",
+        )
+        process_plugin_icon(plugin.pk)
+        plugin.refresh_from_db()
+
+        with patch("plugins.icon_utils.Image.open") as image_open:
+            response = self.client.get(reverse("approved_plugins"))
+            detail = self.client.get(
+                reverse("plugin_detail", args=[plugin.package_name])
+            )
+
+        image_open.assert_not_called()
+        self.assertContains(response, plugin.icon_thumbnails["24x24"]["url"])
+        self.assertContains(detail, plugin.icon_thumbnails["128x128"]["url"])
+
+    def test_templates_render_the_missing_thumbnails(self):
+        plugin = self.create_plugin(png_icon())
+        Plugin.objects.filter(pk=plugin.pk).update(icon_valid=True, icon_format="PNG")
+
+        thumbnail = icon_thumbnail(Plugin.objects.get(pk=plugin.pk), "24x24")
+
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (24, 12))
+        path = thumbnail["url"][len(settings.MEDIA_URL) :]
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, path)))
+
+    def test_thumbnail_failure_keeps_the_icon_valid(self):
+        plugin = self.create_plugin(png_icon())
+
+        with patch(
+            "plugins.icon_utils.render_icon_thumbnails", side_effect=OSError("full")
+        ):
+            self.assertTrue(process_plugin_icon(plugin.pk))
+
+        plugin.refresh_from_db()
+        self.assertTrue(plugin.icon_valid)
+        self.assertEqual(plugin.icon_format, "PNG")
+        self.assertEqual(plugin.icon_thumbnails, {})
+        self.assertTrue(icon_thumbnail(plugin, "24x24"))
@@ -1,6 +1,9 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from plugins.models import Plugin
+from plugins.models import Plugin, PluginVersion, PluginVersionSecurityScan
 
 class PluginsListViewTestCase(TestCase):
     fixtures = [
@@ -53,3 +56,47 @@ class PluginsListViewTestCase(TestCase):
         self.assertTrue('per_page_list' in response.context)
         self.assertTrue('show_more_items_number' in response.context)
 
+    def _create_plugins(self, prefix, count):
+        creator = User.objects.get(username='creator')
+        owner = User.objects.get(username='staff')
+        for i in range(count):
+            plugin = Plugin.objects.create(
+                created_by=creator,
+                package_name='%s_%s' % (prefix, i),
+                name='%s %s' % (prefix, i),
+                description='List plugin',
+            )
+            plugin.owners.add(owner)
+            for version, experimental in (('1.0', False), ('1.1', True)):
+                plugin_version = PluginVersion.objects.create(
+                    plugin=plugin,
+                    created_by=creator,
+                    version=version,
+                    min_qg_version='3.0',
+                    max_qg_version='3.99',
+                    approved=True,
+                    experimental=experimental,
+                )
+            PluginVersionSecurityScan.objects.create(plugin_version=plugin_version)
+
+    def _list_plugins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('approved_plugins'), {'per_page': 100}
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_plugins_list_queries_do_not_grow_with_page_size(self):
+        self.client.force_login(User.objects.get(username='admin'))
+        self._create_plugins('first', 2)
+        queries, response = self._list_plugins()
+
+        self._create_plugins('second', 10)
+        more_queries, response = self._list_plugins()
+
+        self.assertEqual(queries, more_queries)
+        # Shown in the grid and in the table
+        self.assertContains(response, 'Security scan passed (latest)', count=2 * 12)
+        plugin = response.context['object_list'][0]
+        self.assertIs(plugin.stable.plugin, plugin)
@@ -9,6 +9,7 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from plugins.forms import PluginVersionForm
 from plugins.models import Plugin, PluginVersion
+from plugins.tests import TEST_MEDIA_ROOT
 
 
 def do_nothing(*args, **kwargs):
@@ -18,12 +19,12 @@ def do_nothing(*args, **kwargs):
 TESTFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "testfiles"))
 
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class PluginUpdateTestCase(TestCase):
     fixtures = [
         "fixtures/auth.json",
     ]
 
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url_upload = reverse("plugin_upload")
@@ -0,0 +1,166 @@
+"""
+Tests for the plugins_changes.xml feed and the change log it reads.
+"""
+
+import re
+import threading
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+from plugins.models import Plugin, PluginVersion, PluginVersionChange
+from plugins.tests import TestMediaRootMixin
+
+
+# Each change is committed, as the revision token follows the transactions
+class TestXmlPluginsChanges(TestMediaRootMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.creator = User.objects.create_user(username="creator", password="pw")
+        self.plugin = self._create_plugin("first_plugin")
+        self.version = self._create_version(self.plugin, "1.0")
+
+    def _create_plugin(self, package_name):
+        return Plugin.objects.create(
+            package_name=package_name,
+            name=package_name.title(),
+            created_by=self.creator,
+            description="Test plugin description",
+        )
+
+    def _create_version(self, plugin, version, approved=True):
+        return PluginVersion.objects.create(
+            plugin=plugin,
+            version=version,
+            created_by=self.creator,
+            package=SimpleUploadedFile("test.zip", b"file_content"),
+            min_qg_version="3.0",
+            max_qg_version="3.99",
+            approved=approved,
+        )
+
+    def _get_changes(self, **params):
+        response = self.client.get(
+            reverse("xml_plugins_changes"), {"qgis": "3.22", **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        content = response.getvalue().decode("utf-8")
+        revision = re.search(r'<plugins revision="(\d+)">', content).group(1)
+        return revision, content
+
+    def test_change_log(self):
+        self.version.approved = False
+        self.version.save()
+        self.version.approved = True
+        self.version.save()
+        self.version.changelog = "Fixed"
+        self.version.save()
+        self.plugin.is_deleted = True
+        self.plugin.save()
+        self.plugin.is_deleted = False
+        self.plugin.save()
+        self._create_version(self.plugin, "1.1", approved=False)
+        self.version.delete()
+
+        self.assertEqual(
+            list(PluginVersionChange.objects.values_list("version", "action")),
+            [
+                ("1.0", "approved"),
+                ("1.0", "unapproved"),
+                ("1.0", "approved"),
+                ("1.0", "updated"),
+                ("1.0", "soft_deleted"),
+                ("1.0", "restored"),
+                ("1.0", "deleted"),
+            ],
+        )
+
+    def test_changes_since_revision(self):
+        revision, content = self._get_changes()
+        self.assertIn('<pyqgis_plugin name="First_Plugin" version="1.0"', content)
+
+        # Nothing changed
+        next_revision, content = self._get_changes(since=revision)
+        self.assertEqual(next_revision, revision)
+        self.assertNotIn("<pyqgis_plugin", content)
+
+        other_plugin = self._create_plugin("other_plugin")
+        self._create_version(other_plugin, "2.0")
+        self.version.approved = False
+        self.version.save()
+
+        next_revision, content = self._get_changes(since=revision)
+        self.assertGreater(int(next_revision), int(revision))
+        self.assertEqual(
+            re.findall(r'<pyqgis_plugin name="([^"]+)" version="([^"]+)"', content),
+            [("Other_Plugin", "2.0")],
+        )
+        self.assertIn(
+            '<withdrawn_plugin plugin_id="%s" package_name="first_plugin"/>'
+            % self.plugin.pk,
+            content,
+        )
+
+        _, content = self._get_changes(since=next_revision)
+        self.assertNotIn("<pyqgis_plugin", content)
+        self.assertNotIn("<withdrawn_plugin", content)
+
+    def test_without_revision_lists_plugins_new_entries(self):
+        other_plugin = self._create_plugin("other_plugin")
+        self._create_version(other_plugin, "2.0")
+        self._create_version(other_plugin, "2.1", approved=False)
+
+        _, content = self._get_changes()
+        response = self.client.get(reverse("xml_plugins_new"), {"qgis": "3.22"})
+
+        self.assertEqual(
+            content.split("<plugins", 1)[1].split(">", 1)[1],
+            response.getvalue().decode("utf-8").split("<plugins>", 1)[1],
+        )
+
+    def test_invalid_revision(self):
+        response = self.client.get(reverse("xml_plugins_changes"), {"since": "abc"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_changes_of_interleaved_transactions(self):
+        revision, _ = self._get_changes()
+        other_plugin = self._create_plugin("other_plugin")
+        other_version = self._create_version(other_plugin, "2.0", approved=False)
+        logged = threading.Event()
+        release = threading.Event()
+
+        def log_change():
+            # Started first, committed last
+            try:
+                with transaction.atomic():
+                    PluginVersionChange.log(
+                        self.version, PluginVersionChange.Action.UPDATED
+                    )
+                    logged.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=log_change)
+        thread.start()
+        self.assertTrue(logged.wait(10))
+        other_version.approved = True
+        other_version.save()
+
+        # Held back until the transaction started before is committed
+        next_revision, content = self._get_changes(since=revision)
+        self.assertNotIn("<pyqgis_plugin", content)
+
+        release.set()
+        thread.join()
+        _, content = self._get_changes(since=next_revision)
+        self.assertEqual(
+            sorted(
+                re.findall(r'<pyqgis_plugin name="([^"]+)" version="([^"]+)"', content)
+            ),
+            [("First_Plugin", "1.0"), ("Other_Plugin", "2.0")],
+        )
@@ -0,0 +1,100 @@
+"""
+Tests for the plugins.json repository catalogue.
+"""
+
+import gzip
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from plugins.models import Plugin, PluginVersion
+from plugins.tasks.generate_plugins_xml import generate_plugins_xml
+from plugins.tests import TestMediaRootMixin
+from preferences import preferences
+
+
+class TestJsonPluginsView(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.creator = User.objects.create_user(username="creator", password="pw")
+        self.plugin = Plugin.objects.create(
+            package_name="test_plugin",
+            name="Test Plugin",
+            created_by=self.creator,
+            description="Test plugin description",
+        )
+        self.plugin.tags.add("raster")
+        self._create_version("1.0")
+        self._create_version("1.1", max_qg_version="3.20")
+        self._create_version("2.0", experimental=True)
+        self._create_version("2.1", approved=False)
+
+    def _create_version(
+        self, version, max_qg_version="3.99", experimental=False, approved=True
+    ):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            version=version,
+            created_by=self.creator,
+            package=SimpleUploadedFile("test.zip", b"file_content"),
+            min_qg_version="3.0",
+            max_qg_version=max_qg_version,
+            experimental=experimental,
+            approved=approved,
+        )
+
+    def _get_catalogue(self, **extra):
+        response = self.client.get(reverse("json_plugins"), {"qgis": "3.22"}, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("ETag", response)
+        return response
+
+    def test_catalogue(self):
+        data = json.loads(self._get_catalogue().getvalue())
+
+        self.assertEqual(len(data["plugins"]), 1)
+        plugin = data["plugins"][0]
+        self.assertEqual(plugin["package_name"], "test_plugin")
+        self.assertEqual(plugin["tags"], ["raster"])
+        self.assertEqual(plugin["latest_version"], "1.0")
+        self.assertEqual(
+            [(v["version"], v["experimental"]) for v in plugin["versions"]],
+            [("1.0", False), ("2.0", True)],
+        )
+        self.assertEqual(
+            plugin["versions"][0]["download_url"],
+            "http://testserver/plugins/test_plugin/version/1.0/download/",
+        )
+
+    def test_stable_only(self):
+        response = self.client.get(
+            reverse("json_plugins"), {"qgis": "3.22", "stable_only": "1"}
+        )
+
+        data = json.loads(response.getvalue())
+        self.assertEqual(
+            [v["version"] for v in data["plugins"][0]["versions"]], ["1.0"]
+        )
+
+    @patch("plugins.tasks.generate_plugins_xml.get_versions_from_labels")
+    def test_snapshot_matches_catalogue(self, mock_labels):
+        mock_labels.return_value = {}
+        live = self._get_catalogue().getvalue()
+
+        site_preference = preferences.SitePreference
+        site_preference.qgis_versions = "3.22"
+        site_preference.save()
+        generate_plugins_xml("http://testserver")
+
+        response = self._get_catalogue()
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response.getvalue(), live)
+
+        response = self._get_catalogue(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.getvalue()), live)
@@ -0,0 +1,337 @@
+"""
+Tests for the XML feeds: plugins.xml rendered from the database, the
+conditional GETs answered from the catalogue revision and the snapshots,
+and the pre-compressed snapshots.
+"""
+
+import gzip
+import os
+import re
+
+from django.contrib.auth.models import Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from plugins.models import CatalogueRevision, Plugin, PluginVersion
+from plugins.repository_utils import write_snapshot
+from plugins.tests import TestMediaRootMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class TestXmlPluginsView(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.creator = User.objects.create_user(username="creator", password="pw")
+        self.staff = User.objects.create_user(username="staff", password="pw")
+        self.staff.user_permissions.add(
+            Permission.objects.get(
+                codename="can_approve", content_type__app_label="plugins"
+            )
+        )
+
+    def _create_plugin(self, name, created_by):
+        plugin = Plugin.objects.create(
+            package_name=name.lower().replace(" ", "_"),
+            name=name,
+            created_by=created_by,
+            description="Test plugin description",
+        )
+        plugin.tags.add("raster")
+        return plugin
+
+    def _create_version(
+        self,
+        plugin,
+        version,
+        min_qg_version="3.0",
+        max_qg_version="3.99",
+        experimental=False,
+        approved=True,
+    ):
+        return PluginVersion.objects.create(
+            plugin=plugin,
+            version=version,
+            created_by=self.creator,
+            package=SimpleUploadedFile("test.zip", b"file_content"),
+            min_qg_version=min_qg_version,
+            max_qg_version=max_qg_version,
+            experimental=experimental,
+            approved=approved,
+        )
+
+    def _listed_versions(self, content):
+        return re.findall(r'<pyqgis_plugin name="([^"]+)" version="([^"]+)"', content)
+
+    def test_latest_versions_ordered_by_plugin_name(self):
+        zebra = self._create_plugin("Zebra", self.creator)
+        alpha = self._create_plugin("Alpha", self.staff)
+        self._create_version(zebra, "1.0")
+        self._create_version(zebra, "1.10")
+        self._create_version(zebra, "1.2")
+        self._create_version(zebra, "2.0", experimental=True)
+        self._create_version(zebra, "3.0", approved=False)
+        self._create_version(alpha, "0.1")
+        self._create_version(alpha, "0.2", min_qg_version="3.30")
+
+        response = self.client.get(reverse("xml_plugins"), {"qgis": "3.22"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/xml")
+        content = response.getvalue().decode("utf-8")
+        self.assertEqual(
+            self._listed_versions(content),
+            [("Alpha", "0.1"), ("Zebra", "1.10"), ("Zebra", "2.0")],
+        )
+        self.assertTrue(
+            content.startswith(
+                "<?xml version = '1.0' encoding = 'UTF-8'?>\n"
+                '<?xml-stylesheet type="text/xsl" href="/static/style/plugins.xsl" ?>\n'
+                "<plugins>\n    <pyqgis_plugin "
+            )
+        )
+        self.assertTrue(content.endswith("</pyqgis_plugin>\n</plugins>\n"))
+        # Trust is given by the plugin creator
+        self.assertEqual(
+            re.findall(r"<trusted>(\w+)</trusted>", content),
+            ["True", "False", "False"],
+        )
+        self.assertIn("<tags><![CDATA[raster]]></tags>", content)
+
+    def test_stable_only(self):
+        plugin = self._create_plugin("Zebra", self.creator)
+        self._create_version(plugin, "1.0")
+        self._create_version(plugin, "2.0", experimental=True)
+
+        response = self.client.get(
+            reverse("xml_plugins"), {"qgis": "3.22", "stable_only": "1"}
+        )
+
+        self.assertEqual(
+            self._listed_versions(response.getvalue().decode("utf-8")),
+            [("Zebra", "1.0")],
+        )
+
+    def test_number_of_queries_does_not_depend_on_plugins(self):
+        for i in range(10):
+            plugin = self._create_plugin(f"Plugin {i}", self.creator)
+            self._create_version(plugin, "1.0")
+            self._create_version(plugin, "1.1", experimental=True)
+
+        # Catalogue revision, users, versions with their plugin and authors, tags
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("xml_plugins"), {"qgis": "3.22"})
+            listed_versions = self._listed_versions(response.getvalue().decode("utf-8"))
+
+        self.assertEqual(len(listed_versions), 20)
+
+    def test_empty_catalogue(self):
+        response = self.client.get(reverse("xml_plugins"), {"qgis": "3.22"})
+
+        self.assertEqual(
+            response.getvalue().decode("utf-8"),
+            "<?xml version = '1.0' encoding = 'UTF-8'?>\n"
+            '<?xml-stylesheet type="text/xsl" href="/static/style/plugins.xsl" ?>\n'
+            "<plugins>\n    \n</plugins>\n",
+        )
+
+
+class TestXmlPluginsConditionalGet(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.creator = User.objects.create_user(username="creator", password="pw")
+        # The catalogue revision is bumped once the transaction is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plugin = Plugin.objects.create(
+                package_name="test_plugin",
+                name="Test Plugin",
+                created_by=self.creator,
+                description="Test plugin description",
+            )
+            self.version = PluginVersion.objects.create(
+                plugin=self.plugin,
+                version="1.0",
+                created_by=self.creator,
+                package=SimpleUploadedFile("test.zip", b"file_content"),
+                min_qg_version="3.0",
+                max_qg_version="3.99",
+                approved=True,
+            )
+
+    def test_etag_and_last_modified(self):
+        for url_name in ["xml_plugins", "xml_plugins_new"]:
+            response = self.client.get(reverse(url_name), {"qgis": "3.22"})
+            revision = CatalogueRevision.current()
+            self.assertEqual(response["ETag"], f'"catalogue-{revision.revision}"')
+            self.assertIn("Last-Modified", response)
+
+    def test_not_modified_without_querying_plugins(self):
+        for url_name in ["xml_plugins", "xml_plugins_new"]:
+            response = self.client.get(reverse(url_name), {"qgis": "3.22"})
+
+            # Only the catalogue revision is read
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(
+                    reverse(url_name),
+                    {"qgis": "3.22"},
+                    HTTP_IF_NONE_MATCH=response["ETag"],
+                )
+            self.assertEqual(not_modified.status_code, 304)
+
+            not_modified = self.client.get(
+                reverse(url_name),
+                {"qgis": "3.22"},
+                HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+            )
+            self.assertEqual(not_modified.status_code, 304)
+
+    def test_revision_bumped_on_version_changes(self):
+        etag = self.client.get(reverse("xml_plugins"), {"qgis": "3.22"})["ETag"]
+
+        self.version.approved = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.version.save()
+        response = self.client.get(
+            reverse("xml_plugins"), {"qgis": "3.22"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.version.delete()
+        response = self.client.get(
+            reverse("xml_plugins"), {"qgis": "3.22"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_revision_bumped_on_commit(self):
+        revision = CatalogueRevision.current().revision
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plugin.description = "Updated description"
+            self.plugin.save()
+            self.version.approved = False
+            self.version.save()
+            self.assertEqual(CatalogueRevision.current().revision, revision)
+
+        self.assertGreater(CatalogueRevision.current().revision, revision)
+
+    def test_snapshot_validators(self):
+        write_snapshot("plugins_3.22.xml", iter(["<plugins/>\n"]))
+        response = self.client.get(reverse("xml_plugins"), {"qgis": "3.22"})
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"snapshot-'))
+
+        # The revision is bumped before the snapshot is regenerated
+        with self.captureOnCommitCallbacks(execute=True):
+            self.version.delete()
+        response = self.client.get(
+            reverse("xml_plugins"), {"qgis": "3.22"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+        write_snapshot("plugins_3.22.xml", iter(["<plugins></plugins>\n"]))
+        response = self.client.get(
+            reverse("xml_plugins"), {"qgis": "3.22"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.getvalue(), b"<plugins></plugins>\n")
+
+
+class TestXmlPluginsSnapshot(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.content = "<plugins>%s</plugins>\n" % ("<pyqgis_plugin/>" * 100)
+        self.path_file = write_snapshot("plugins_3.22.xml", iter([self.content]))
+
+    def test_snapshot_siblings(self):
+        with open(self.path_file, encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.content)
+        with open(self.path_file + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()).decode("utf-8"), self.content)
+        if brotli is not None:
+            with open(self.path_file + ".br", "rb") as f:
+                self.assertEqual(
+                    brotli.decompress(f.read()).decode("utf-8"), self.content
+                )
+        # No temporary file left behind
+        self.assertEqual(
+            [
+                name
+                for name in os.listdir(os.path.dirname(self.path_file))
+                if name.startswith(".")
+            ],
+            [],
+        )
+
+    def test_uncompressed(self):
+        response = self.client.get(reverse("xml_plugins"), {"qgis": "3.22"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response.getvalue().decode("utf-8"), self.content)
+
+    def test_gzip(self):
+        response = self.client.get(
+            reverse("xml_plugins"),
+            {"qgis": "3.22"},
+            HTTP_ACCEPT_ENCODING="gzip, deflate, br;q=0",
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "application/xml")
+        self.assertEqual(
+            gzip.decompress(response.getvalue()).decode("utf-8"), self.content
+        )
+
+    def test_brotli(self):
+        if brotli is None:
+            self.skipTest("brotli is not installed")
+        response = self.client.get(
+            reverse("xml_plugins"), {"qgis": "3.22"}, HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(
+            brotli.decompress(response.getvalue()).decode("utf-8"), self.content
+        )
+
+    def test_etag_per_encoding(self):
+        etags = {}
+        for accept_encoding in ("", "gzip"):
+            response = self.client.get(
+                reverse("xml_plugins"),
+                {"qgis": "3.22"},
+                HTTP_ACCEPT_ENCODING=accept_encoding,
+            )
+            etags[accept_encoding] = response["ETag"]
+        self.assertTrue(etags["gzip"].endswith('-gzip"'))
+        self.assertNotEqual(etags[""], etags["gzip"])
+
+        # The plain ETag does not validate the gzip representation
+        response = self.client.get(
+            reverse("xml_plugins"),
+            {"qgis": "3.22"},
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=etags[""],
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(
+            reverse("xml_plugins"),
+            {"qgis": "3.22"},
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=etags["gzip"],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
@@ -7,12 +7,14 @@ from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from plugins.models import Plugin, PluginVersion
 from plugins.forms import PluginVersionForm
+from plugins.tests import TEST_MEDIA_ROOT
 
 def do_nothing(*args, **kwargs):
     pass
 
 TESTFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "testfiles"))
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class PluginRenameTestCase(TestCase):
     fixtures = [
         "fixtures/auth.json",
@@ -20,7 +22,6 @@ class PluginRenameTestCase(TestCase):
 
     @patch("plugins.tasks.generate_plugins_xml", new=do_nothing)
     @patch("plugins.validator._check_url_link", new=do_nothing)
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url_upload = reverse('plugin_upload')
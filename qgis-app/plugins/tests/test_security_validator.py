@@ -45,6 +45,7 @@ from plugins.tasks.run_security_scan import (
     _send_validation_results_email,
     run_security_scan_task,
 )
+from plugins.tests import TEST_MEDIA_ROOT
 from plugins.views import send_upload_confirmation_email
 
 TESTFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "testfiles"))
@@ -251,7 +252,7 @@ class PluginUploadValidationFlowTest(TestCase):
         )
         self.url = reverse("plugin_upload")
 
-    @override_settings(MEDIA_ROOT="api/tests", DEBUG=True)
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, DEBUG=True)
     @patch("plugins.tasks.generate_plugins_xml", new=lambda *a, **kw: None)
     @patch("plugins.validator._check_url_link", new=lambda *a, **kw: None)
     @patch("plugins.tasks.run_security_scan.run_security_scan_task.delay")
@@ -271,7 +272,7 @@ class PluginUploadValidationFlowTest(TestCase):
         self.assertIsNotNone(version)
         self.assertEqual(version.validation_status, VALIDATION_STATUS_VALIDATING)
 
-    @override_settings(MEDIA_ROOT="api/tests", DEBUG=True)
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, DEBUG=True)
     @patch("plugins.tasks.generate_plugins_xml", new=lambda *a, **kw: None)
     @patch("plugins.validator._check_url_link", new=lambda *a, **kw: None)
     @patch("plugins.tasks.run_security_scan.run_security_scan_task.delay")
@@ -290,7 +291,7 @@ class PluginUploadValidationFlowTest(TestCase):
         self.assertIsNotNone(version)
         self.assertFalse(version.approved)
 
-    @override_settings(MEDIA_ROOT="api/tests", DEBUG=True)
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, DEBUG=True)
     @patch("plugins.tasks.generate_plugins_xml", new=lambda *a, **kw: None)
     @patch("plugins.validator._check_url_link", new=lambda *a, **kw: None)
     @patch("plugins.tasks.run_security_scan.run_security_scan_task.delay")
@@ -746,7 +747,7 @@ class SecurityRuleSkipUploadTest(TestCase):
             "B311", severity="warning", enabled=True, can_be_skipped=True
         )
 
-    @override_settings(MEDIA_ROOT="api/tests", DEBUG=True)
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, DEBUG=True)
     @patch("plugins.tasks.generate_plugins_xml", new=lambda *a, **kw: None)
     @patch("plugins.validator._check_url_link", new=lambda *a, **kw: None)
     @patch("plugins.tasks.run_security_scan.run_security_scan_task.delay")
@@ -765,7 +766,7 @@ class SecurityRuleSkipUploadTest(TestCase):
         _args, kwargs = mock_task.call_args
         self.assertEqual(kwargs.get("skipped_rule_ids", []), [])
 
-    @override_settings(MEDIA_ROOT="api/tests", DEBUG=True)
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, DEBUG=True)
     @patch("plugins.tasks.generate_plugins_xml", new=lambda *a, **kw: None)
     @patch("plugins.validator._check_url_link", new=lambda *a, **kw: None)
     @patch("plugins.tasks.run_security_scan.run_security_scan_task.delay")
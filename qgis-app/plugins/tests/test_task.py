@@ -1,14 +1,21 @@
 import os
+import time
 
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.conf import settings
+from django.urls import reverse
 
 from preferences import preferences
 from unittest.mock import patch, MagicMock
 
 from base.models.site_preferences import SitePreference
+from plugins.models import Plugin, PluginVersion
+from plugins.repository_utils import SNAPSHOT_PRUNE_GRACE, render_plugins_xml
 from plugins.tasks.generate_plugins_xml import generate_plugins_xml
 from plugins.tasks.update_qgis_versions import update_qgis_versions
+from plugins.tests import TestMediaRootMixin
 
 
 class TestPluginTask(TestCase):
@@ -37,59 +44,150 @@ class TestPluginTask(TestCase):
         update_qgis_versions()
         mock_create.assert_called_once()
 
-    @override_settings(DEFAULT_PLUGINS_SITE='http://test_plugins_site')
-    @patch('requests.get')
-    @patch('os.path.exists', return_value=False)
-    @patch('os.mkdir')
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_generate_plugins_xml(self, mock_open, mock_mkdir, mock_exists, mock_get):
-        # Given
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = '<some xml content> QGIS Version 34002|Visit https://download.qgis.org to get your copy of version 3.40.2'
-        mock_get.return_value = mock_response
-        preferences.SitePreference.qgis_versions = '3.24,3.25'
-
-        expected_folder_path = os.path.join(settings.MEDIA_ROOT, 'cached_xmls')
-
-        # When
-        generate_plugins_xml()
 
-        # Then
-        mock_mkdir.assert_called_once_with(expected_folder_path)
-        expected_calls = [
-            ((f'{settings.DEFAULT_PLUGINS_SITE}/plugins/plugins_new.xml?qgis=3.24',),),
-            ((f'{settings.DEFAULT_PLUGINS_SITE}/plugins/plugins_new.xml?qgis=3.25',),)
+class TestGeneratePluginsXmlTask(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='creator', password='12345')
+        self.plugin = Plugin.objects.create(
+            package_name='test_plugin',
+            name='Test Plugin',
+            created_by=self.user,
+            description='Test plugin description',
+        )
+        self.plugin.tags.add('raster')
+        self.versions = [
+            self._create_version('1.0', '3.0', '3.99'),
+            self._create_version('1.1', '3.0', '3.30'),
+            self._create_version('2.0', '3.30', '3.99', experimental=True),
         ]
-        mock_get.assert_has_calls(expected_calls, any_order=True)
-        mock_open.assert_any_call(os.path.join(expected_folder_path, 'plugins_3.24.xml'), 'w+')
-        mock_open.assert_any_call(os.path.join(expected_folder_path, 'plugins_3.25.xml'), 'w+')
+        site_preference = preferences.SitePreference
+        site_preference.qgis_versions = '3.24,3.25'
+        site_preference.save()
+
+    def _create_version(self, version, min_qg_version, max_qg_version, experimental=False):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            version=version,
+            created_by=self.user,
+            package=SimpleUploadedFile('test.zip', b'file_content'),
+            min_qg_version=min_qg_version,
+            max_qg_version=max_qg_version,
+            experimental=experimental,
+            approved=True,
+        )
+
+    def _read_snapshot(self, file_name):
+        path = os.path.join(self.media_root, 'cached_xmls', file_name)
+        with open(path, encoding='utf-8') as f:
+            return f.read()
 
     @override_settings(DEFAULT_PLUGINS_SITE='http://test_plugins_site')
+    @patch('plugins.tasks.generate_plugins_xml.get_versions_from_labels')
     @patch('requests.get')
-    @patch('os.path.exists', return_value=False)
-    @patch('os.mkdir')
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_generate_plugins_xml_with_custom_site(self, mock_open, mock_mkdir, mock_exists, mock_get):
-        # Given
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = '<some xml content>'
-        mock_response.json.return_value = {'latest': {'version': '3.40'}, 'ltr': {'version': '3.40'}}
-        mock_get.return_value = mock_response
-        preferences.SitePreference.qgis_versions = '3.24,3.25'
-
-        expected_folder_path = os.path.join(settings.MEDIA_ROOT, 'cached_xmls')
-
-        # When
-        generate_plugins_xml('http://custom_plugins_site')
-
-        # Then
-        mock_mkdir.assert_called_once_with(expected_folder_path)
-        expected_calls = [
-            (('http://custom_plugins_site/plugins/plugins_new.xml?qgis=3.24',),),
-            (('http://custom_plugins_site/plugins/plugins_new.xml?qgis=3.25',),)
-        ]
-        mock_get.assert_has_calls(expected_calls, any_order=True)
-        mock_open.assert_any_call(os.path.join(expected_folder_path, 'plugins_3.24.xml'), 'w+')
-        mock_open.assert_any_call(os.path.join(expected_folder_path, 'plugins_3.25.xml'), 'w+')
+    def test_generate_plugins_xml(self, mock_get, mock_labels):
+        mock_labels.return_value = {'latest': '3.40', 'stable': '3.34', 'ltr': '3.34'}
+
+        generate_plugins_xml()
+
+        # The snapshots are rendered in-process, not fetched from the site
+        mock_get.assert_not_called()
+        mock_labels.assert_called_once_with(['latest', 'stable', 'ltr'])
+        for name in ['3.24', '3.25', 'latest', 'stable', 'ltr']:
+            self.assertTrue(
+                os.path.exists(
+                    os.path.join(self.media_root, 'cached_xmls', f'plugins_{name}.xml')
+                )
+            )
+        xml = self._read_snapshot('plugins_3.24.xml')
+        self.assertIn('<pyqgis_plugin name="Test Plugin" version="1.1"', xml)
+        self.assertIn(
+            'http://test_plugins_site/plugins/test_plugin/version/1.1/download/', xml
+        )
+        self.assertIn('<tags><![CDATA[raster]]></tags>', xml)
+        self.assertNotIn('version="2.0"', xml)
+        # 1.1 is not compatible with QGIS 3.34, 2.0 is its experimental version
+        xml = self._read_snapshot('plugins_ltr.xml')
+        self.assertIn('<pyqgis_plugin name="Test Plugin" version="1.0"', xml)
+        self.assertIn('<pyqgis_plugin name="Test Plugin" version="2.0"', xml)
+        self.assertNotIn('version="1.1"', xml)
+
+    @patch('plugins.tasks.generate_plugins_xml.get_versions_from_labels')
+    def test_generate_plugins_xml_shares_identical_snapshots(self, mock_labels):
+        mock_labels.return_value = {'latest': '3.40', 'stable': '3.34', 'ltr': '3.34'}
+        folder = os.path.join(self.media_root, 'cached_xmls')
+
+        with patch(
+            'plugins.tasks.generate_plugins_xml.render_plugins_xml',
+            wraps=render_plugins_xml,
+        ) as mock_render:
+            generate_plugins_xml('http://testserver')
+
+        # No boundary between 3.24 and 3.25, nor between 3.34 and 3.40
+        self.assertEqual(mock_render.call_count, 2)
+        self.assertEqual(
+            os.path.realpath(os.path.join(folder, 'plugins_3.24.xml')),
+            os.path.realpath(os.path.join(folder, 'plugins_3.25.xml')),
+        )
+        self.assertEqual(
+            os.path.realpath(os.path.join(folder, 'plugins_latest.xml')),
+            os.path.realpath(os.path.join(folder, 'plugins_ltr.xml')),
+        )
+        objects = os.listdir(os.path.join(folder, 'objects'))
+        self.assertEqual(len([name for name in objects if name.endswith('.xml')]), 2)
+
+        # Unlinked snapshots are kept for the requests that resolved their
+        # link, then pruned
+        previous_snapshot = os.path.realpath(os.path.join(folder, 'plugins_3.24.xml'))
+        version = self.versions[1]
+        version.max_qg_version = '3.20'
+        version.save()
+        generate_plugins_xml('http://testserver')
+
+        self.assertTrue(os.path.exists(previous_snapshot))
+        self.assertIn('version="1.0"', self._read_snapshot('plugins_3.24.xml'))
+
+        unlinked_on = time.time() - SNAPSHOT_PRUNE_GRACE - 1
+        os.utime(previous_snapshot, (unlinked_on, unlinked_on))
+        generate_plugins_xml('http://testserver')
+
+        self.assertFalse(os.path.exists(previous_snapshot))
+        objects = os.listdir(os.path.join(folder, 'objects'))
+        self.assertEqual(len([name for name in objects if name.endswith('.xml')]), 2)
+
+    @patch('plugins.tasks.generate_plugins_xml.get_versions_from_labels')
+    def test_generate_plugins_xml_with_custom_site(self, mock_labels):
+        mock_labels.return_value = {'latest': '3.40', 'stable': '3.34', 'ltr': '3.34'}
+
+        generate_plugins_xml('https://custom_plugins_site')
+
+        xml = self._read_snapshot('plugins_3.25.xml')
+        self.assertIn(
+            'https://custom_plugins_site/plugins/test_plugin/version/1.1/download/', xml
+        )
+
+    @patch('plugins.tasks.generate_plugins_xml.get_versions_from_labels')
+    def test_generate_plugins_xml_without_labels(self, mock_labels):
+        mock_labels.side_effect = Exception('Request failed')
+
+        generate_plugins_xml('http://testserver')
+
+        folder = os.path.join(self.media_root, 'cached_xmls')
+        self.assertEqual(
+            sorted(name for name in os.listdir(folder) if name.endswith('.xml')),
+            ['plugins_3.24.xml', 'plugins_3.25.xml'],
+        )
+
+    @patch('plugins.tasks.generate_plugins_xml.get_versions_from_labels')
+    def test_generate_plugins_xml_matches_plugins_new_xml(self, mock_labels):
+        mock_labels.return_value = {}
+
+        generate_plugins_xml('http://testserver')
+        for qgis_version in ['3.24', '3.25']:
+            response = self.client.get(
+                reverse('xml_plugins_new'), {'qgis': qgis_version}
+            )
+            self.assertEqual(
+                self._read_snapshot(f'plugins_{qgis_version}.xml'),
+                response.getvalue().decode('utf-8'),
+            )
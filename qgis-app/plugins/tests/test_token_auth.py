@@ -13,6 +13,7 @@ from plugins.models import (
     PluginVersion,
     SecurityRule,
 )
+from plugins.tests import TEST_MEDIA_ROOT
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -24,12 +25,12 @@ def do_nothing(*args, **kwargs):
 TESTFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "testfiles"))
 
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class UploadWithTokenTestCase(TestCase):
     fixtures = ["fixtures/auth.json"]
 
     @patch("plugins.tasks.generate_plugins_xml", new=do_nothing)
     @patch("plugins.validator._check_url_link", new=do_nothing)
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url_upload = reverse("plugin_upload")
@@ -382,6 +383,7 @@ class UploadWithTokenTestCase(TestCase):
         )
 
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class APIResponseTestCase(TestCase):
     """Test cases for API response improvements"""
 
@@ -389,7 +391,6 @@ class APIResponseTestCase(TestCase):
 
     @patch("plugins.tasks.generate_plugins_xml", new=do_nothing)
     @patch("plugins.validator._check_url_link", new=do_nothing)
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url_upload = reverse("plugin_upload")
@@ -689,6 +690,7 @@ class APIResponseTestCase(TestCase):
             self.assertFalse(data["approved"])
 
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class EmptyPluginWithTokenTestCase(TestCase):
     """Test creating empty plugin and uploading first version via token"""
 
@@ -696,7 +698,6 @@ class EmptyPluginWithTokenTestCase(TestCase):
 
     @patch("plugins.tasks.generate_plugins_xml", new=do_nothing)
     @patch("plugins.validator._check_url_link", new=do_nothing)
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
 
@@ -838,6 +839,7 @@ class EmptyPluginWithTokenTestCase(TestCase):
 # ---------------------------------------------------------------------------
 
 
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class TokenAPISkipSecurityRulesTest(TestCase):
     """Tests for passing skip_security_rules via the token-based REST API."""
 
@@ -845,7 +847,6 @@ class TokenAPISkipSecurityRulesTest(TestCase):
 
     @patch("plugins.tasks.generate_plugins_xml", new=do_nothing)
     @patch("plugins.validator._check_url_link", new=do_nothing)
-    @override_settings(MEDIA_ROOT="api/tests")
     def setUp(self):
         self.client = Client()
         self.url_upload = reverse("plugin_upload")
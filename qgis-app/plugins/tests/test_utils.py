@@ -1,6 +1,8 @@
 from unittest.mock import patch, Mock
 from django.test import TestCase
 from plugins.utils import (
+    get_country,
+    parse_range_header,
     get_qgis_versions,
     extract_version
 )
@@ -44,3 +46,68 @@ class TestQGISGitHubReleases(TestCase):
         self.assertEqual(extract_version('final-3.22.10'), '3.22')
         self.assertEqual(extract_version('beta-3.23.0'), '3.23')
         self.assertIsNone(extract_version('invalid-tag'))
+
+
+class TestGetCountry(TestCase):
+
+    def setUp(self):
+        get_country.cache_clear()
+        self.addCleanup(get_country.cache_clear)
+
+    @patch('plugins.utils.get_geoip')
+    def test_get_country(self, mock_get_geoip):
+        mock_get_geoip.return_value.country.return_value = {
+            'country_code': 'ID',
+            'country_name': 'Indonesia'
+        }
+
+        self.assertEqual(get_country('180.247.213.170'), ('ID', 'Indonesia'))
+        self.assertEqual(get_country('180.247.213.170'), ('ID', 'Indonesia'))
+
+        # The second lookup is answered from the cache
+        mock_get_geoip.return_value.country.assert_called_once_with('180.247.213.170')
+        cache_info = get_country.cache_info()
+        self.assertEqual(cache_info.hits, 1)
+        self.assertEqual(cache_info.misses, 1)
+
+    @patch('plugins.utils.get_geoip')
+    def test_get_country_unknown_address(self, mock_get_geoip):
+        mock_get_geoip.return_value.country.side_effect = Exception('not found')
+
+        self.assertEqual(get_country('123.456.789.100'), ('N/D', 'N/D'))
+
+    @patch('plugins.utils.get_geoip')
+    def test_get_country_without_country_name(self, mock_get_geoip):
+        mock_get_geoip.return_value.country.return_value = {
+            'country_code': None,
+            'country_name': None
+        }
+
+        self.assertEqual(get_country('10.0.0.1'), ('N/D', 'N/D'))
+
+
+class TestParseRangeHeader(TestCase):
+
+    def test_parse_range_header(self):
+        self.assertEqual(parse_range_header('bytes=0-9', 10), (0, 9))
+        self.assertEqual(parse_range_header('bytes=2-5', 10), (2, 5))
+        self.assertEqual(parse_range_header('bytes=5-', 10), (5, 9))
+        self.assertEqual(parse_range_header('bytes=-3', 10), (7, 9))
+        # Ranges going past the end are truncated
+        self.assertEqual(parse_range_header('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range_header('bytes=-50', 10), (0, 9))
+
+    def test_ignored_range_header(self):
+        self.assertIsNone(parse_range_header('', 10))
+        self.assertIsNone(parse_range_header('items=0-5', 10))
+        self.assertIsNone(parse_range_header('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range_header('bytes=5-2', 10))
+        self.assertIsNone(parse_range_header('bytes=-', 10))
+
+    def test_unsatisfiable_range_header(self):
+        with self.assertRaises(ValueError):
+            parse_range_header('bytes=10-', 10)
+        with self.assertRaises(ValueError):
+            parse_range_header('bytes=-0', 10)
+        with self.assertRaises(ValueError):
+            parse_range_header('bytes=0-', 0)
@@ -0,0 +1,156 @@
+"""
+Tests for the numeric sort keys of the plugin versions.
+"""
+
+import os
+import re
+
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from plugins.models import Plugin, PluginVersion
+from plugins.repository_utils import PluginCatalogue, published_plugin_versions
+from plugins.tests import TestMediaRootMixin
+from plugins.version_keys import (
+    VERSION_KEY_MAX,
+    qgis_version_key,
+    qgis_version_range,
+    version_key,
+)
+
+
+class VersionKeyTest(SimpleTestCase):
+    def test_version_key(self):
+        self.assertEqual(version_key("1.2"), [1, 2, 0, 0, 0, 0, 0])
+        self.assertEqual(version_key("v1.2.3-beta2"), [1, 2, 3, 0, -2, 2, 0])
+        self.assertEqual(version_key("1.2.3.4.5"), [1, 2, 3, 4, 0, 0, 0])
+        self.assertEqual(qgis_version_key("3.34"), [3, 34, 0, 0, 0, 0])
+        self.assertIsNone(version_key(""))
+        self.assertIsNone(version_key(None))
+
+    def test_versions_sort_numerically(self):
+        versions = [
+            "0.9",
+            "1.0.dev1",
+            "1.0a1",
+            "1.0-beta",
+            "1.0-beta2",
+            "1.0rc1",
+            "1.0",
+            "1.0.post1",
+            "1.0.0.1",
+            "1.2",
+            "1.9",
+            "1.10",
+            "10.0",
+        ]
+        self.assertEqual(sorted(reversed(versions), key=version_key), versions)
+
+    def test_qgis_version_range(self):
+        self.assertEqual(
+            qgis_version_range("3.34"),
+            ([3, 34, 0, 0, 0, 0], [3, 34] + [VERSION_KEY_MAX] * 4),
+        )
+        self.assertEqual(
+            qgis_version_range("3.34.120"),
+            ([3, 34, 120, 0, 0, 0], [3, 34, 120] + [VERSION_KEY_MAX] * 3),
+        )
+        lowest, highest = qgis_version_range("3")
+        self.assertLessEqual(lowest, qgis_version_key("3.0"))
+        self.assertGreater(highest, qgis_version_key("3.99.999"))
+        self.assertEqual(qgis_version_range(""), (None, None))
+
+
+class PluginVersionKeysTest(TestMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.creator = User.objects.create_user(username="creator", password="pw")
+        self.plugin = Plugin.objects.create(
+            package_name="test_plugin",
+            name="Test Plugin",
+            created_by=self.creator,
+            description="Test plugin description",
+        )
+
+    def _create_version(self, version, min_qg_version="3.0", max_qg_version="3.99"):
+        return PluginVersion.objects.create(
+            plugin=self.plugin,
+            version=version,
+            created_by=self.creator,
+            package=SimpleUploadedFile("test.zip", b"file_content"),
+            min_qg_version=min_qg_version,
+            max_qg_version=max_qg_version,
+            approved=True,
+        )
+
+    def _listed_versions(self, response):
+        content = b"".join(response.streaming_content).decode()
+        return re.findall(r'<pyqgis_plugin name="[^"]+" version="([^"]+)"', content)
+
+    def test_keys_set_on_save(self):
+        version = self._create_version("1.2-beta1", "3.16", "3.40")
+        version.refresh_from_db()
+        self.assertEqual(version.version_key, [1, 2, 0, 0, -2, 1, 0])
+        self.assertEqual(version.min_qg_key, [3, 16, 0, 0, 0, 0])
+        self.assertEqual(version.max_qg_key, [3, 40, 0, 0, 0, 0])
+
+        version.max_qg_version = "3.44"
+        version.save(update_fields=["max_qg_version"])
+        version.refresh_from_db()
+        self.assertEqual(version.max_qg_key, [3, 44, 0, 0, 0, 0])
+
+    def test_keys_set_on_loaddata(self):
+        version = self._create_version("1.2", "3.16", "3.40")
+        fixture = os.path.join(self.media_root, "versions.json")
+        with open(fixture, "w") as f:
+            serializers.serialize(
+                "json",
+                [version],
+                fields=[
+                    field.name
+                    for field in PluginVersion._meta.fields
+                    if not field.name.endswith("_key")
+                ],
+                stream=f,
+            )
+        PluginVersion.objects.filter(pk=version.pk).update(
+            version_key=[], min_qg_key=[], max_qg_key=[]
+        )
+
+        call_command("loaddata", fixture, verbosity=0)
+
+        version.refresh_from_db()
+        self.assertEqual(version.version_key, [1, 2, 0, 0, 0, 0, 0])
+        self.assertEqual(version.min_qg_key, [3, 16, 0, 0, 0, 0])
+        self.assertEqual(version.max_qg_key, [3, 40, 0, 0, 0, 0])
+
+    def test_latest_version_sorts_numerically(self):
+        rc, release, beta, old = [
+            self._create_version(version)
+            for version in ("1.0rc1", "1.0", "1.0-beta", "0.9")
+        ]
+
+        self.assertEqual(
+            list(PluginVersion.approved_objects.all()), [release, rc, beta, old]
+        )
+        self.plugin.refresh_from_db()
+        self.assertEqual(self.plugin.stable_version, release)
+
+    def test_feeds_match_patch_versions_above_99(self):
+        # Was excluded by the QGIS 3.34.99 upper bound of the feeds
+        self._create_version("1.0", "3.34.120", "3.99")
+
+        for url_name in ("xml_plugins", "xml_plugins_new"):
+            with self.subTest(url_name=url_name):
+                response = self.client.get(reverse(url_name), {"qgis": "3.34"})
+                self.assertEqual(self._listed_versions(response), ["1.0"])
+                response = self.client.get(reverse(url_name), {"qgis": "3.32"})
+                self.assertEqual(self._listed_versions(response), [])
+
+        self.assertEqual(len(published_plugin_versions("3.34")), 1)
+        self.assertEqual(len(PluginCatalogue().versions_for("3.34")), 1)
+        self.assertEqual(PluginCatalogue().versions_for("3.34.119"), [])
@@ -1,27 +1,37 @@
 from django.test import TestCase
 
-from plugins.views import _add_patch_version
+from plugins.version_keys import VERSION_KEY_MAX
+from plugins.views import qgis_version_bounds
 
 
-class TestTruncateVersion(TestCase):
-    """Test _add_patch_version function"""
+class TestQgisVersionBounds(TestCase):
+    """Test qgis_version_bounds function"""
 
-    def test__add_patch_version_with_3_segment_version_number(self):
+    def test_qgis_version_bounds_with_3_segment_version_number(self):
         version = '1.2.3'
-        self.assertEqual(_add_patch_version(version, '99'), '1.2.3')
+        self.assertEqual(
+            qgis_version_bounds(version),
+            ([1, 2, 3, 0, 0, 0], [1, 2, 3] + [VERSION_KEY_MAX] * 3),
+        )
 
-    def test__add_patch_version_with_2_segment_version_number(self):
+    def test_qgis_version_bounds_with_2_segment_version_number(self):
         version = '1.2'
-        self.assertEqual(_add_patch_version(version, '00'), '1.2.00')
+        self.assertEqual(
+            qgis_version_bounds(version),
+            ([1, 2, 0, 0, 0, 0], [1, 2] + [VERSION_KEY_MAX] * 4),
+        )
 
-    def test__add_patch_version_with_1_segment_version_number(self):
+    def test_qgis_version_bounds_with_1_segment_version_number(self):
         version = '1'
-        self.assertEqual(_add_patch_version(version, '99'), '1')
+        self.assertEqual(
+            qgis_version_bounds(version),
+            ([1, 0, 0, 0, 0, 0], [1] + [VERSION_KEY_MAX] * 5),
+        )
 
-    def test__add_patch_version_with_None(self):
+    def test_qgis_version_bounds_with_None(self):
         version = None
-        self.assertEqual(_add_patch_version(version, '99'), None)
+        self.assertEqual(qgis_version_bounds(version), (None, None))
 
-    def test__add_patch_version_with_empty_string(self):
+    def test_qgis_version_bounds_with_empty_string(self):
         version = ''
-        self.assertEqual(_add_patch_version(version, '99'), '')
+        self.assertEqual(qgis_version_bounds(version), (None, None))
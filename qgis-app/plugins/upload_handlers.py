@@ -0,0 +1,46 @@
+"""
+Upload handlers computing the SHA-256 of the uploaded files while they are
+received, so the plugin packages do not have to be read again to be hashed.
+
+The digest is set as the ``sha256`` attribute of the uploaded file.
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+
+class Sha256UploadHandlerMixin:
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # The memory handler passes the chunks of the large files on to the
+        # next handler: only the handler keeping the file hashes it
+        if getattr(self, "activated", True):
+            self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.sha256 = self.sha256.hexdigest()
+        return uploaded_file
+
+
+class Sha256MemoryFileUploadHandler(Sha256UploadHandlerMixin, MemoryFileUploadHandler):
+    """
+    Keeps the small uploaded files in memory and hashes them.
+    """
+
+
+class Sha256TemporaryFileUploadHandler(
+    Sha256UploadHandlerMixin, TemporaryFileUploadHandler
+):
+    """
+    Streams the uploaded files to a temporary file and hashes them.
+    """
@@ -10,7 +10,14 @@ from rpc4django.views import serve_rpc_request
 urlpatterns = [
     # XML
     url(r"^plugins_new.xml$", xml_plugins_new, {}, name="xml_plugins_new"),
+    url(
+        r"^plugins_changes.xml$",
+        xml_plugins_changes,
+        {},
+        name="xml_plugins_changes",
+    ),
     url(r"^plugins.xml$", xml_plugins, {}, name="xml_plugins"),
+    url(r"^plugins.json$", json_plugins, {}, name="json_plugins"),
     url(
         r"^plugins_(?P<qg_version>\d+\.\d+).xml$",
         xml_plugins,
@@ -524,6 +531,12 @@ urlpatterns += [
         {},
         name="plugin_version_json",
     ),
+    url(
+        r"^(?P<package_name>[A-Za-z][A-Za-z0-9-_]+)/stats$",
+        plugin_download_stats,
+        {},
+        name="plugin_download_stats",
+    ),
     url(
         r"^(?P<package_name>[A-Za-z][A-Za-z0-9-_]+)/latest/$",
         plugin_latest_redirect,
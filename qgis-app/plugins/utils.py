@@ -1,7 +1,15 @@
+import hashlib
+import os
 import requests
 import re
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.gis.geoip2 import GeoIP2
 from django.http import HttpRequest
 
+# Number of client addresses whose country is kept in memory by each process
+GEOIP_CACHE_SIZE = getattr(settings, "GEOIP_CACHE_SIZE", 10000)
+
 
 def extract_version(tag):
     """
@@ -65,6 +73,76 @@ def parse_remote_addr(request: HttpRequest) -> str:
         return x_forwarded_for.split(",")[0]
     return request.META.get("REMOTE_ADDR", "")
 
+
+@lru_cache(maxsize=None)
+def get_geoip():
+    """
+    Returns the GeoIP2 reader shared by the whole process.
+
+    The database is opened on first use, memory-mapped when the platform
+    allows it, instead of on every download.
+    """
+    return GeoIP2()
+
+
+@lru_cache(maxsize=GEOIP_CACHE_SIZE)
+def get_country(remote_addr: str) -> tuple:
+    """
+    Returns the (country_code, country_name) of a client IP address, with
+    "N/D" for what the GeoIP2 database does not know.
+
+    The results of the most recent addresses are cached in memory:
+    get_country.cache_info() reports the cache hits and misses.
+    """
+    try:
+        country_data = get_geoip().country(remote_addr)
+    except Exception:  # AddressNotFoundError, invalid address
+        return "N/D", "N/D"
+    return (
+        country_data["country_code"] or "N/D",
+        country_data["country_name"] or "N/D",
+    )
+
+
+def file_sha256(path: str) -> str:
+    """
+    Returns the hex SHA-256 digest of a file.
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def parse_range_header(header: str, size: int):
+    """
+    Parses a single byte range Range header for a resource of size bytes.
+
+    Returns the (first, last) byte positions of the range, both included,
+    or None when the header should be ignored: not a bytes range, malformed
+    or several ranges, which are then answered with the whole resource.
+
+    Raises:
+        ValueError: If the range is valid but not satisfiable.
+    """
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last bytes of the resource
+        if int(last) == 0 or size == 0:
+            raise ValueError("Suffix range not satisfiable")
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError("Range starts after the end of the resource")
+    return first, min(int(last), size - 1) if last else size - 1
+
+
 def get_version_from_label(param):
     """
     Fetches the QGIS version based on the given parameter.
@@ -80,6 +158,22 @@ def get_version_from_label(param):
         ValueError: If the parameter value is invalid.
         Exception: If the request to the QGIS version service fails or the version is not found.
     """
+    return get_versions_from_labels([param])[param]
+
+
+def get_versions_from_labels(labels):
+    """
+    Fetches the QGIS versions for several labels with a single request.
+
+    Args:
+        labels (list): Labels to resolve, e.g. ['latest', 'stable', 'ltr'].
+
+    Returns:
+        dict: label -> major and minor version of QGIS (None if unknown).
+
+    Raises:
+        Exception: If the request to the QGIS version service fails.
+    """
     url = 'https://version.qgis.org/version.json'
 
     response = requests.get(url)
@@ -87,12 +181,15 @@ def get_version_from_label(param):
         raise Exception('Request failed')
 
     content = response.json()
-    param = param.lower()
-
-    if param == 'stable':
-        param = 'ltr'
-
-    if param in content:
-        version_info = content[param]
-        return version_info['version']
-    return None
+    versions = {}
+    for label in labels:
+        param = label.lower()
+
+        if param == 'stable':
+            param = 'ltr'
+
+        if param in content:
+            versions[label] = content[param]['version']
+        else:
+            versions[label] = None
+    return versions
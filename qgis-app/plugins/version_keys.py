@@ -0,0 +1,112 @@
+"""
+Numeric sort keys of the plugin and QGIS versions.
+
+The versions are stored along with a key, an array of integers that
+PostgreSQL compares element by element, so the versions are sorted and
+the QGIS ranges filtered on an index, numerically.
+
+The key of a version is made of its first numeric segments, the missing
+ones being 0, followed by the rank of its qualifier and the first two
+numbers of the qualifier::
+
+    1.2          -> [1, 2, 0, 0, 0, 0, 0]
+    1.2.3-beta2  -> [1, 2, 3, 0, -2, 2, 0]
+    1.2.3        -> [1, 2, 3, 0, 0, 0, 0]
+    1.2.3.post1  -> [1, 2, 3, 0, 1, 1, 0]
+
+The pre-releases sort before their release and the post-releases after.
+"""
+
+import re
+
+# Numeric segments of the plugin and QGIS version keys
+VERSION_KEY_SEGMENTS = 4
+QGIS_VERSION_KEY_SEGMENTS = 3
+
+# The keys are arrays of integer
+VERSION_KEY_MAX = 2**31 - 1
+
+RELEASE_RANK = 0
+POST_RELEASE_RANK = 1
+# Unknown qualifiers sort before all the known pre-releases
+UNKNOWN_QUALIFIER_RANK = -5
+QUALIFIER_RANKS = {
+    "dev": -4,
+    "a": -3,
+    "alpha": -3,
+    "b": -2,
+    "beta": -2,
+    "c": -1,
+    "pre": -1,
+    "preview": -1,
+    "rc": -1,
+    "p": POST_RELEASE_RANK,
+    "patch": POST_RELEASE_RANK,
+    "post": POST_RELEASE_RANK,
+    "r": POST_RELEASE_RANK,
+    "rev": POST_RELEASE_RANK,
+}
+
+_RELEASE_RE = re.compile(r"^\s*v?(\d+(?:\.\d+)*)(.*)$", re.IGNORECASE)
+
+
+def _release(version: str) -> tuple:
+    """
+    Returns the numeric segments of a version and what follows them
+    """
+    match = _RELEASE_RE.match(version)
+    if match is None:
+        return [], version
+    segments = [min(int(n), VERSION_KEY_MAX) for n in match.group(1).split(".")]
+    return segments, match.group(2)
+
+
+def version_key(version: str, segments: int = VERSION_KEY_SEGMENTS):
+    """
+    Returns the sort key of a version string, None for an empty version.
+
+    Only the first segments numeric segments are kept, like the padded
+    strings stored in the version fields.
+    """
+    if not version:
+        return None
+    release, qualifier = _release(str(version))
+    release = release[:segments]
+    release += [0] * (segments - len(release))
+
+    qualifier = qualifier.lower()
+    word = re.search(r"[a-z]+", qualifier)
+    numbers = [min(int(n), VERSION_KEY_MAX) for n in re.findall(r"\d+", qualifier)]
+    if word:
+        rank = QUALIFIER_RANKS.get(word.group(), UNKNOWN_QUALIFIER_RANK)
+    elif numbers:
+        # 1.0-1
+        rank = POST_RELEASE_RANK
+    else:
+        rank = RELEASE_RANK
+    numbers = numbers[:2]
+    numbers += [0] * (2 - len(numbers))
+    return release + [rank] + numbers
+
+
+def qgis_version_key(version: str):
+    """
+    Returns the sort key of a QGIS version, None for an empty version
+    """
+    return version_key(version, QGIS_VERSION_KEY_SEGMENTS)
+
+
+def qgis_version_range(version: str) -> tuple:
+    """
+    Returns the (lowest, highest) keys of the QGIS versions matched by a
+    requested QGIS version: 3.34 matches every 3.34.x version, 3 every 3.x.
+
+    A plugin version is compatible when its max_qg_key is >= lowest and its
+    min_qg_key <= highest.
+    """
+    lowest = qgis_version_key(version)
+    if lowest is None:
+        return None, None
+    given = min(len(_release(str(version))[0]), QGIS_VERSION_KEY_SEGMENTS)
+    highest = lowest[:given] + [VERSION_KEY_MAX] * (len(lowest) - given)
+    return lowest, highest
@@ -5,27 +5,30 @@ import logging
 import os
 import re
 import time
+from itertools import chain
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import Permission, User
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.gis.geoip2 import GeoIP2
 from django.contrib.sites.models import Site
-from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 from django.core.mail import EmailMessage, EmailMultiAlternatives, send_mail
 from django.core.paginator import Paginator
 from django.db import IntegrityError, connection, transaction
-from django.db.models import F, Q
+from django.db.models import F, Q, prefetch_related_objects
 from django.db.models.expressions import RawSQL
 from django.db.models.functions import Lower
 from django.http import (
+    FileResponse,
     Http404,
     HttpRequest,
     HttpResponse,
+    HttpResponseBadRequest,
     HttpResponseRedirect,
     JsonResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404, render
 from django.template.loader import render_to_string
@@ -60,9 +63,13 @@ from plugins.models import (
     PLUGIN_EMAIL_CONFIRMATION_RESEND_INTERVAL_MINUTES,
     VALIDATION_STATUS_BLOCKED,
     VALIDATION_STATUS_VALIDATING,
+    PendingPluginVersionDownload,
     Plugin,
+    PluginCountryMonthlyDownloads,
+    PluginDailyDownloads,
     PluginEmailCommunication,
     PluginEmailConfirmation,
+    PluginMonthlyDownloads,
     PluginOutstandingToken,
     PluginVersion,
     PluginVersionDownload,
@@ -70,10 +77,28 @@ from plugins.models import (
     PluginVersionFeedbackAttachment,
     PluginVersionSecurityScan,
     SecurityRule,
-    vjust,
+    ranking_scores,
+)
+from plugins.pagination import InvalidCursor, keyset_page, keyset_sort_key
+from plugins.repository_utils import (
+    feed_condition,
+    get_snapshot,
+    iter_plugins_changes_xml,
+    iter_plugins_json,
+    iter_plugins_xml,
+    latest_plugin_versions,
+    plugin_changes,
+    published_plugin_versions,
+    qgis_version_bounds,
+    snapshot_response,
 )
 from plugins.security_utils import get_scan_badge_info, get_security_rules_grouped
-from plugins.utils import parse_remote_addr
+from plugins.utils import (
+    file_sha256,
+    get_country,
+    parse_range_header,
+    parse_remote_addr,
+)
 from plugins.validator import PLUGIN_REQUIRED_METADATA
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
@@ -84,7 +109,7 @@ try:
 
     from urlparse import parse_qs, urlparse
 except ImportError:
-    from urllib.parse import parse_qs, unquote, urlencode, urlparse
+    from urllib.parse import parse_qs, quote, unquote, urlencode, urljoin, urlparse
 
 # Decorator
 staff_required = user_passes_test(lambda u: u.is_staff)
@@ -830,7 +855,7 @@ def plugin_versions_json(request: HttpRequest, package_name: str) -> JsonRespons
     """
     plugin = get_object_or_404(Plugin, package_name=package_name)
     approved_versions = plugin.pluginversion_set.filter(approved=True).order_by(
-        "-version"
+        "-version_key"
     )
     if not approved_versions.exists():
         raise Http404
@@ -880,7 +905,9 @@ def plugin_latest_redirect(
     GET /plugins/<package_name>/latest/
     """
     plugin = get_object_or_404(Plugin, package_name=package_name)
-    latest = plugin.pluginversion_set.filter(approved=True).order_by("-version").first()
+    latest = (
+        plugin.pluginversion_set.filter(approved=True).order_by("-version_key").first()
+    )
     if latest is None:
         raise Http404
     return HttpResponseRedirect(latest.get_absolute_url())
@@ -895,7 +922,9 @@ def plugin_latest_json_redirect(
     GET /plugins/<package_name>/latest/json
     """
     plugin = get_object_or_404(Plugin, package_name=package_name)
-    latest = plugin.pluginversion_set.filter(approved=True).order_by("-version").first()
+    latest = (
+        plugin.pluginversion_set.filter(approved=True).order_by("-version_key").first()
+    )
     if latest is None:
         raise Http404
     return HttpResponseRedirect(
@@ -903,6 +932,63 @@ def plugin_latest_json_redirect(
     )
 
 
+def plugin_download_stats(request: HttpRequest, package_name: str) -> JsonResponse:
+    """
+    Return the download time series of a plugin as JSON, read from the
+    download stats rollups:
+
+        * daily: downloads per day over the last ``days`` days (default 90)
+        * monthly: downloads per month
+        * countries: downloads per country and month over the last
+          ``months`` months (default 12)
+
+    GET /plugins/<package_name>/stats
+    """
+    plugin = get_object_or_404(Plugin, package_name=package_name)
+    try:
+        days = min(max(int(request.GET.get("days", 90)), 1), 366)
+        months = min(max(int(request.GET.get("months", 12)), 1), 120)
+    except ValueError:
+        return HttpResponseBadRequest("days and months must be integers")
+
+    today = now().date()
+    first_day = today - datetime.timedelta(days=days - 1)
+    month_index = today.year * 12 + today.month - months
+    first_month = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+    daily = PluginDailyDownloads.objects.filter(
+        plugin=plugin, date__gte=first_day
+    ).order_by("date")
+    monthly = PluginMonthlyDownloads.objects.filter(plugin=plugin).order_by("month")
+    countries = PluginCountryMonthlyDownloads.objects.filter(
+        plugin=plugin, month__gte=first_month
+    ).order_by("month", "-downloads", "country_code")
+
+    return JsonResponse(
+        {
+            "package_name": plugin.package_name,
+            "downloads": plugin.downloads,
+            "daily": [
+                {"date": row.date.isoformat(), "downloads": row.downloads}
+                for row in daily
+            ],
+            "monthly": [
+                {"month": row.month.strftime("%Y-%m"), "downloads": row.downloads}
+                for row in monthly
+            ],
+            "countries": [
+                {
+                    "month": row.month.strftime("%Y-%m"),
+                    "country_code": row.country_code,
+                    "country_name": row.country_name,
+                    "downloads": row.downloads,
+                }
+                for row in countries
+            ],
+        }
+    )
+
+
 class PluginDetailView(DetailView):
     model = Plugin
     queryset = Plugin.objects.all()
@@ -1580,6 +1666,35 @@ def plugin_token_delete(request, package_name, token_id):
     )
 
 
+def hydrate_plugins(plugins):
+    """
+    Loads what the plugin lists show for each plugin in a fixed number of
+    queries, whatever the number of plugins: the stable, experimental and
+    latest versions along with the security scan of the latter, the
+    creator and the owners.
+
+    The versions are attached to the plugins, and the plugins to their
+    versions for the download and detail URLs.
+    """
+    plugins = list(plugins)
+    pointers = ("stable_version", "experimental_version", "latest_version")
+    version_ids = {
+        getattr(plugin, f"{pointer}_id") for plugin in plugins for pointer in pointers
+    }
+    version_ids.discard(None)
+    versions = PluginVersion.objects.select_related("security_scan").in_bulk(
+        version_ids
+    )
+    for plugin in plugins:
+        for pointer in pointers:
+            version = versions.get(getattr(plugin, f"{pointer}_id"))
+            if version is not None:
+                version.plugin = plugin
+            setattr(plugin, pointer, version)
+    prefetch_related_objects(plugins, "created_by", "owners")
+    return plugins
+
+
 class PluginsList(ListView):
     """
     List of approved plugins.
@@ -1590,6 +1705,7 @@ class PluginsList(ListView):
     title = _("All plugins")
     additional_context = {}
     paginate_by = settings.PAGINATION_DEFAULT_PAGINATION
+    keyset_pagination = False
 
     def get_paginate_by(self, queryset):
         """
@@ -1607,6 +1723,25 @@ class PluginsList(ListView):
     def get_filtered_queryset(self, qs):
         return qs
 
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginates with a cursor when the request has one (empty for the
+        first page) and the sort order allows it, by page number otherwise.
+
+        Deep cursor pages cost the same as the first one, unlike the page
+        numbers.
+        """
+        self.keyset_pagination = (
+            "cursor" in self.request.GET and keyset_sort_key(queryset) is not None
+        )
+        if not self.keyset_pagination:
+            return super(PluginsList, self).paginate_queryset(queryset, page_size)
+        try:
+            page = keyset_page(queryset, page_size, self.request.GET["cursor"])
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (page.paginator, page, page.object_list, True)
+
     def get_queryset(self):
         qs = super(PluginsList, self).get_queryset()
         qs = self.get_filtered_queryset(qs)
@@ -1641,12 +1776,16 @@ class PluginsList(ListView):
 
     def get_context_data(self, **kwargs):
         context = super(PluginsList, self).get_context_data(**kwargs)
+        # The page is evaluated here, the template iterates over the same
+        # hydrated instances
+        page_plugins = hydrate_plugins(context["object_list"])
         context.update(
             {
                 "title": self.title,
             }
         )
         context.update(self.additional_context)
+        context["keyset_pagination"] = self.keyset_pagination
         context["current_sort_query"] = self.get_sortstring()
         context["current_querystring"] = self.get_querystring()
         context["per_page_list"] = [20, 50, 75, 100]
@@ -1667,15 +1806,7 @@ class PluginsList(ListView):
         context["show_more_items_number"] = next_per_page
 
         # Check if any plugin is deprecated
-        page = context["page_obj"]
-        self.any_deprecated = any(
-            obj.deprecated
-            for obj in self.get_queryset()[
-                (page.start_index() - 1) if page.start_index() else 0 : (
-                    page.end_index() if page.end_index() else 0
-                )
-            ]
-        )
+        self.any_deprecated = any(plugin.deprecated for plugin in page_plugins)
         context["any_deprecated"] = self.any_deprecated
         return context
 
@@ -1689,7 +1820,7 @@ class PluginsList(ListView):
         Clean existing query string (GET parameters) by removing
         arguments that we don't want to preserve (sort parameter, 'page')
         """
-        to_remove = ["page", "sort"]
+        to_remove = ["page", "sort", "cursor"]
         query_string = urlparse(self.request.get_full_path()).query
         query_dict = parse_qs(query_string)
         for arg in to_remove:
@@ -1712,23 +1843,6 @@ class MyPluginsList(PluginsList):
         # Apply the user filter
         qs = self.get_filtered_queryset(qs)
 
-        qs = qs.extra(
-            select={
-                "average_vote": "rating_score / (rating_votes + 0.001)",
-                "latest_version_date": (
-                    "SELECT created_on FROM plugins_pluginversion WHERE "
-                    "plugins_pluginversion.plugin_id = plugins_plugin.id "
-                    "AND approved = TRUE "
-                    "ORDER BY created_on DESC LIMIT 1"
-                ),
-                "weighted_rating": (
-                    "((rating_votes::FLOAT / (rating_votes + 5)) * "
-                    "(rating_score::FLOAT / (rating_votes + 0.001))) + "
-                    "((5::FLOAT / (rating_votes + 5)) * 3)"
-                ),
-            }
-        )
-
         # Handle sorting (copied from parent class)
         sort_by = self.request.GET.get("sort", None)
         sort_order = self.request.GET.get("order", None)
@@ -1792,7 +1906,7 @@ class UserDetailsPluginsList(PluginsList):
 
     def get_filtered_queryset(self, qs):
         user = get_object_or_404(User, username=self.kwargs["username"])
-        return qs.filter(Q(created_by=user) | Q(owners=user))
+        return qs.filter(Q(created_by=user) | Q(owners=user)).distinct()
 
     def get_context_data(self, **kwargs):
         user = get_object_or_404(User, username=self.kwargs["username"])
@@ -2673,10 +2787,118 @@ def version_feedback_delete(request, package_name, version, feedback):
     return JsonResponse({"success": is_update_succeed})
 
 
+def _package_etag(version):
+    """
+    Returns the strong ETag of the package of a plugin version, derived from
+    the SHA-256 of its content. The packages stored before the digest was
+    recorded are hashed on their first download and the digest is stored on
+    the version, so each package is read once.
+    """
+    if not version.package_sha256:
+        version.package_sha256 = file_sha256(version.package.path)
+        # Not stored if the package was replaced in the meantime
+        PluginVersion.objects.filter(
+            pk=version.pk, package=version.package.name, package_sha256=""
+        ).update(package_sha256=version.package_sha256)
+    return '"%s"' % version.package_sha256
+
+
+def _package_range(request, version, etag):
+    """
+    Returns the (first, last) bytes of the package requested with a Range
+    header, or None for the whole package: no Range, a Range that is
+    ignored, or an If-Range validator not matching the current package.
+
+    Raises:
+        ValueError: If the range is not satisfiable.
+    """
+    range_header = request.headers.get("Range")
+    if not range_header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        # The package changed since the first part was downloaded
+        return None
+    return parse_range_header(range_header, version.package.size)
+
+
+def _iter_file_range(path, first, last, chunk_size=FileResponse.block_size):
+    """
+    Yields the bytes first to last (included) of a file.
+    """
+    with open(path, "rb") as f:
+        f.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _package_response(version, etag, byte_range=None):
+    """
+    Returns the response delivering the package of a plugin version, as set
+    by PLUGIN_DOWNLOAD_DELIVERY: streamed from the file ("stream", the
+    default) or handed over to the web server with an X-Accel-Redirect
+    ("x-accel-redirect", nginx) or X-Sendfile ("x-sendfile") header.
+
+    When streamed, byte_range is answered with a 206 Partial Content; the
+    web servers handle the Range header themselves.
+    """
+    delivery = getattr(settings, "PLUGIN_DOWNLOAD_DELIVERY", "stream")
+    if delivery == "stream":
+        if byte_range is None:
+            response = FileResponse(
+                open(version.package.path, "rb"), content_type="application/zip"
+            )
+        else:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                _iter_file_range(version.package.path, first, last),
+                status=206,
+                content_type="application/zip",
+            )
+            response["Content-Range"] = "bytes %s-%s/%s" % (
+                first,
+                last,
+                version.package.size,
+            )
+            response["Content-Length"] = last - first + 1
+    elif delivery == "x-accel-redirect":
+        response = HttpResponse(content_type="application/zip")
+        response["X-Accel-Redirect"] = urljoin(
+            getattr(
+                settings, "PLUGIN_DOWNLOAD_ACCEL_REDIRECT_URL", "/protected-media/"
+            ),
+            quote(version.package.name),
+        )
+    elif delivery == "x-sendfile":
+        response = HttpResponse(content_type="application/zip")
+        response["X-Sendfile"] = version.package.path
+    else:
+        raise ImproperlyConfigured("Unknown PLUGIN_DOWNLOAD_DELIVERY: %s" % delivery)
+    response["Content-Disposition"] = "attachment; filename=%s-%s.zip" % (
+        version.plugin.package_name,
+        version.version,
+    )
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    return response
+
+
 def version_download(request, package_name, version):
     """
     Update download counter(s) using atomic operations to prevent race conditions
     and improve performance under high concurrent load.
+
+    With PLUGIN_DOWNLOADS_FLUSH_INTERVAL set, the download is only recorded
+    as pending and the counters are updated by the flush_plugin_downloads
+    task, so concurrent downloads do not contend on the same rows.
+
+    Single byte Range requests are supported to resume downloads; only the
+    requests starting at the first byte of the package are counted.
     """
     plugin = get_object_or_404(Plugin, package_name=package_name)
     version = get_object_or_404(PluginVersion, plugin=plugin, version=version)
@@ -2710,25 +2932,46 @@ def version_download(request, package_name, version):
                 status=403,
             )
 
-    # Atomic increment using F() expressions - prevents race conditions
-    PluginVersion.objects.filter(pk=version.pk).update(downloads=F("downloads") + 1)
+    etag = _package_etag(version)
+    try:
+        byte_range = _package_range(request, version, etag)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = "bytes */%s" % version.package.size
+        return response
+    response = _package_response(version, etag, byte_range)
 
-    # Atomic increment for plugin - single query, no race condition
-    Plugin.objects.filter(pk=plugin.pk).update(downloads=F("downloads") + 1)
+    # Resuming a download is not a new download: only the requests starting
+    # at the first byte are counted
+    if byte_range is not None and byte_range[0] > 0:
+        return response
 
     remote_addr = parse_remote_addr(request)
-    g = GeoIP2()
 
     country_code = "N/D"
     country_name = "N/D"
 
     if remote_addr:
-        try:
-            country_data = g.country(remote_addr)
-            country_code = country_data["country_code"] or "N/D"
-            country_name = country_data["country_name"] or "N/D"
-        except Exception as e:  # AddressNotFoundErrors:
-            pass
+        country_code, country_name = get_country(remote_addr)
+
+    if getattr(settings, "PLUGIN_DOWNLOADS_FLUSH_INTERVAL", 0):
+        # Counted later by the flush_plugin_downloads task
+        PendingPluginVersionDownload.objects.create(
+            plugin_version=version,
+            country_code=country_code,
+            country_name=country_name,
+            download_date=now().date(),
+        )
+        return response
+
+    # Atomic increment using F() expressions - prevents race conditions
+    PluginVersion.objects.filter(pk=version.pk).update(downloads=F("downloads") + 1)
+
+    # Atomic increment for plugin - single query, no race condition
+    Plugin.objects.filter(pk=plugin.pk).update(
+        downloads=F("downloads") + 1,
+        popularity=ranking_scores(F("downloads") + 1)["popularity"],
+    )
 
     download_record, created = PluginVersionDownload.objects.get_or_create(
         plugin_version=version,
@@ -2743,15 +2986,6 @@ def version_download(request, package_name, version):
             download_count=F("download_count") + 1
         )
 
-    if not version.package.file.file.closed:
-        version.package.file.file.close()
-    zipfile = open(version.package.file.name, "rb")
-    file_content = zipfile.read()
-    response = HttpResponse(file_content, content_type="application/zip")
-    response["Content-Disposition"] = "attachment; filename=%s-%s.zip" % (
-        version.plugin.package_name,
-        version.version,
-    )
     return response
 
 
@@ -2855,25 +3089,21 @@ def version_rescan(request, package_name, version):
 from django.views.decorators.cache import cache_page
 
 
-def _add_patch_version(version: str, additional_patch: str) -> str:
-    """To add patch number in version.
-
-    e.g qgis version = 3.16 we add patch number (99) in versioning -> 3.16.99
-    We use this versioning to query against PluginVersion min_qg_version,
-    so that the query result will include all PluginVersion with
-    minimum QGIS version 3.16 regardless of the patch number.
+def _xml_plugins_snapshot_name(
+    request, qg_version=None, stable_only=None, package_name=None
+):
     """
-
-    if not version:
-        return version
-    separator = "."
-    v = version.split(separator)
-    if len(v) == 2:
-        two_first_segment = separator.join(v[:2])
-        version = f"{two_first_segment}.{additional_patch}"
-    return version
+    Returns the name of the cached snapshot served by xml_plugins, None when
+    the feed is rendered from the database
+    """
+    if package_name is None:
+        package_name = request.GET.get("package_name", None)
+    if package_name:
+        return None
+    return "plugins_{}.xml".format(request.GET.get("qgis", None))
 
 
+@feed_condition(_xml_plugins_snapshot_name)
 @cache_page(60 * 15)
 def xml_plugins(request, qg_version=None, stable_only=None, package_name=None):
     """
@@ -2886,13 +3116,10 @@ def xml_plugins(request, qg_version=None, stable_only=None, package_name=None):
         * package_name: Plugin.package_name
 
     """
-    request_version = request.GET.get("qgis", "1.8.0")
-    version_level = len(str(request_version).split(".")) - 1
     qg_version = (
-        qg_version
-        if qg_version is not None
-        else vjust(request_version, fillchar="0", level=version_level, force_zero=True)
+        qg_version if qg_version is not None else request.GET.get("qgis", "1.8.0")
     )
+    lowest, highest = qgis_version_bounds(qg_version)
     stable_only = (
         stable_only if stable_only is not None else request.GET.get("stable_only", "0")
     )
@@ -2906,25 +3133,20 @@ def xml_plugins(request, qg_version=None, stable_only=None, package_name=None):
     version_filters = {}
     object_list = []
 
-    if qg_version:
+    if lowest is not None:
         filters.update(
-            {"pluginversion__min_qg_version__lte": _add_patch_version(qg_version, "99")}
-        )
-        version_filters.update(
-            {"min_qg_version__lte": _add_patch_version(qg_version, "99")}
-        )
-        filters.update(
-            {"pluginversion__max_qg_version__gte": _add_patch_version(qg_version, "0")}
-        )
-        version_filters.update(
-            {"max_qg_version__gte": _add_patch_version(qg_version, "0")}
+            {
+                "pluginversion__min_qg_key__lte": highest,
+                "pluginversion__max_qg_key__gte": lowest,
+            }
         )
+        version_filters.update({"min_qg_key__lte": highest, "max_qg_key__gte": lowest})
 
     # Get all versions for the given plugin)
     if package_name:
         filters.update({"package_name": package_name})
         try:
-            plugin = Plugin.approved_objects.get(**filters)
+            plugin = Plugin.approved_objects.filter(**filters).distinct().get()
             plugin_version_filters = copy.copy(version_filters)
             plugin_version_filters.update({"plugin": plugin})
             for plugin_version in PluginVersion.stable_objects.filter(
@@ -2941,63 +3163,20 @@ def xml_plugins(request, qg_version=None, stable_only=None, package_name=None):
     else:
 
         # Checked the cached plugins
-        qgis_version = request.GET.get("qgis", None)
-        qgis_filename = "plugins_{}.xml".format(qgis_version)
-        folder_name = os.path.join(settings.MEDIA_ROOT, "cached_xmls")
-        path_file = os.path.join(folder_name, qgis_filename)
-        if os.path.exists(path_file):
-            return HttpResponse(open(path_file).read(), content_type="application/xml")
-
-        trusted_users_ids = list(
-            zip(
-                *User.objects.filter(
-                    Q(
-                        user_permissions__codename="can_approve",
-                        user_permissions__content_type__app_label="plugins",
-                    )
-                    | Q(is_superuser=True)
-                )
-                .distinct()
-                .values_list("id")
-            )
-        )[0]
-        qs = Plugin.approved_objects.filter(**filters).annotate(
-            is_trusted=RawSQL(
-                "%s.created_by_id in (%s)"
-                % (
-                    Plugin._meta.db_table,
-                    (",").join([str(tu) for tu in trusted_users_ids]),
-                ),
-                (),
-            )
+        snapshot = get_snapshot(request, _xml_plugins_snapshot_name(request))
+        if snapshot is not None:
+            return snapshot_response(request, snapshot, "application/xml")
+
+        object_list = latest_plugin_versions(
+            version_filters, stable_only=stable_only == "1"
         )
-        for plugin in qs:
-            plugin_version_filters = copy.copy(version_filters)
-            plugin_version_filters.update({"plugin_id": plugin.pk})
-            try:
-                data = PluginVersion.stable_objects.filter(**plugin_version_filters)[0]
-                setattr(data, "is_trusted", plugin.is_trusted)
-                object_list.append(data)
-            except IndexError:
-                pass
-            if stable_only != "1":
-                try:
-                    data = PluginVersion.experimental_objects.filter(
-                        **plugin_version_filters
-                    )[0]
-                    setattr(data, "is_trusted", plugin.is_trusted)
-                    object_list.append(data)
-                except IndexError:
-                    pass
 
-    return render(
-        request,
-        "plugins/plugins.xml",
-        {"object_list": object_list},
-        content_type="text/xml",
+    return StreamingHttpResponse(
+        iter_plugins_xml(object_list, request), content_type="text/xml"
     )
 
 
+@feed_condition()
 @cache_page(60 * 15)
 def xml_plugins_new(request, qg_version=None, stable_only=None, package_name=None):
     """
@@ -3010,13 +3189,10 @@ def xml_plugins_new(request, qg_version=None, stable_only=None, package_name=Non
         * package_name: Plugin.package_name
 
     """
-    request_version = request.GET.get("qgis", "1.8.0")
-    version_level = len(str(request_version).split(".")) - 1
     qg_version = (
-        qg_version
-        if qg_version is not None
-        else vjust(request_version, fillchar="0", level=version_level, force_zero=True)
+        qg_version if qg_version is not None else request.GET.get("qgis", "1.8.0")
     )
+    lowest, highest = qgis_version_bounds(qg_version)
     stable_only = (
         stable_only if stable_only is not None else request.GET.get("stable_only", "0")
     )
@@ -3030,25 +3206,20 @@ def xml_plugins_new(request, qg_version=None, stable_only=None, package_name=Non
     version_filters = {}
     object_list = []
 
-    if qg_version:
+    if lowest is not None:
         filters.update(
-            {"pluginversion__min_qg_version__lte": _add_patch_version(qg_version, "99")}
-        )
-        version_filters.update(
-            {"min_qg_version__lte": _add_patch_version(qg_version, "99")}
-        )
-        filters.update(
-            {"pluginversion__max_qg_version__gte": _add_patch_version(qg_version, "0")}
-        )
-        version_filters.update(
-            {"max_qg_version__gte": _add_patch_version(qg_version, "0")}
+            {
+                "pluginversion__min_qg_key__lte": highest,
+                "pluginversion__max_qg_key__gte": lowest,
+            }
         )
+        version_filters.update({"min_qg_key__lte": highest, "max_qg_key__gte": lowest})
 
     # Get all versions for the given plugin
     if package_name:
         filters.update({"package_name": package_name})
         try:
-            plugin = Plugin.approved_objects.get(**filters)
+            plugin = Plugin.approved_objects.filter(**filters).distinct().get()
             plugin_version_filters = copy.copy(version_filters)
             plugin_version_filters.update({"plugin": plugin})
             for plugin_version in PluginVersion.stable_objects.filter(
@@ -3087,34 +3258,103 @@ def xml_plugins_new(request, qg_version=None, stable_only=None, package_name=Non
                 FROM %(pv_table)s pv
                 WHERE (
                     pv.approved = True
-                    AND pv."max_qg_version" >= '%(qg_version_with_patch_0)s'
-                    AND pv."min_qg_version" <= '%(qg_version_with_patch_99)s'
+                    AND pv."max_qg_key" >= %%(lowest)s
+                    AND pv."min_qg_key" <= %%(highest)s
                     AND pv.experimental = %(experimental)s
                 )
-                ORDER BY pv.plugin_id, pv.version DESC
+                ORDER BY pv.plugin_id, pv."version_key" DESC
             """
 
         sql_params = {
             "pv_table": PluginVersion._meta.db_table,
             "p_table": Plugin._meta.db_table,
-            "qg_version_with_patch_0": _add_patch_version(qg_version, "0"),
-            "qg_version_with_patch_99": _add_patch_version(qg_version, "99"),
             "experimental": "False",
             "trusted_users_ids": str(trusted_users_ids),
         }
 
-        object_list_new = PluginVersion.objects.raw(sql % sql_params)
+        # The rows are fetched while the response is streamed
+        qg_params = {"lowest": lowest, "highest": highest}
+        object_list_new = PluginVersion.objects.raw(
+            sql % sql_params, qg_params
+        ).iterator()
 
         if stable_only != "1":
-            # Do the query
-            object_list_new = [o for o in object_list_new]
-
             sql_params["experimental"] = "True"
-            object_list_new += [o for o in PluginVersion.objects.raw(sql % sql_params)]
+            object_list_new = chain(
+                object_list_new,
+                PluginVersion.objects.raw(sql % sql_params, qg_params).iterator(),
+            )
 
-    return render(
-        request,
-        "plugins/plugins.xml",
-        {"object_list": object_list_new},
+    return StreamingHttpResponse(
+        iter_plugins_xml(object_list_new, request), content_type="text/xml"
+    )
+
+
+@feed_condition()
+def xml_plugins_changes(request):
+    """
+    The XML list of the plugins changed since a revision, with the same
+    entries as plugins_new.xml for these plugins and a <withdrawn_plugin>
+    element for those no longer listed.
+
+    accepted parameters:
+
+        * since: revision token, the revision attribute of a previous
+          response; every plugin is listed when missing
+        * qgis: qgis version
+        * stable_only: 0/1
+
+    """
+    since = request.GET.get("since", None)
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid revision token")
+    revision, object_list, withdrawn = plugin_changes(
+        since,
+        request.GET.get("qgis", "1.8.0"),
+        stable_only=request.GET.get("stable_only", "0") == "1",
+    )
+    return StreamingHttpResponse(
+        iter_plugins_changes_xml(revision, object_list, withdrawn, request),
         content_type="text/xml",
     )
+
+
+def _json_plugins_snapshot_name(request):
+    """
+    Returns the name of the cached catalogue served by json_plugins, None
+    when the catalogue is rendered from the database
+    """
+    if "qgis" not in request.GET or request.GET.get("stable_only", "0") == "1":
+        return None
+    return "plugins_{}.json".format(request.GET["qgis"])
+
+
+@feed_condition(_json_plugins_snapshot_name)
+def json_plugins(request):
+    """
+    The JSON catalogue of the plugins, listing the same versions as
+    plugins_new.xml
+
+    accepted parameters:
+
+        * qgis: qgis version
+        * stable_only: 0/1
+
+    """
+    request_version = request.GET.get("qgis", "1.8.0")
+    stable_only = request.GET.get("stable_only", "0") == "1"
+
+    # Checked the cached catalogues
+    snapshot_name = _json_plugins_snapshot_name(request)
+    if snapshot_name:
+        snapshot = get_snapshot(request, snapshot_name)
+        if snapshot is not None:
+            return snapshot_response(request, snapshot, "application/json")
+
+    object_list = published_plugin_versions(request_version, stable_only=stable_only)
+    return StreamingHttpResponse(
+        iter_plugins_json(object_list, request), content_type="application/json"
+    )
@@ -107,8 +107,25 @@ DATABASES = {
     }
 }
 
+# The default cache is the dummy one (see settings.py): the site wide cache
+# middleware must not serve stale pages. The catalogue cache only holds
+# entries keyed by the catalogue revision.
+CACHES["catalogue"] = {
+    "BACKEND": os.environ.get(
+        "CATALOGUE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+    ),
+    "LOCATION": os.environ.get("CATALOGUE_CACHE_LOCATION", "catalogue"),
+}
+HOMEPAGE_CACHE = "catalogue"
+HOMEPAGE_CACHE_TIMEOUT = int(os.environ.get("HOMEPAGE_CACHE_TIMEOUT", 3600))
+
 PAGINATION_DEFAULT_PAGINATION = 20
 PAGINATION_DEFAULT_PAGINATION_HUB = 30
+# Above this number of plugins, the cursor paginated lists show the planner
+# estimate instead of counting them
+PLUGINS_LIST_EXACT_COUNT_THRESHOLD = int(
+    os.environ.get("PLUGINS_LIST_EXACT_COUNT_THRESHOLD", 10000)
+)
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
@@ -172,13 +189,26 @@ EMAIL_COMMUNICATION_BATCH_SIZE = int(
 
 # django uploaded file permission
 FILE_UPLOAD_PERMISSIONS = 0o644
+# Hash the uploaded plugin packages while they are received
+FILE_UPLOAD_HANDLERS = [
+    "plugins.upload_handlers.Sha256MemoryFileUploadHandler",
+    "plugins.upload_handlers.Sha256TemporaryFileUploadHandler",
+]
 
 REST_FRAMEWORK = {
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
 }
 
 GEOIP_PATH = "/var/opt/maxmind/"
+# Client addresses whose country is cached by each process (plugins.utils)
+GEOIP_CACHE_SIZE = int(os.environ.get("GEOIP_CACHE_SIZE", 10000))
 METABASE_DOWNLOAD_STATS_URL = os.environ.get("METABASE_DOWNLOAD_STATS_URL", "/metabase")
+# Staleness window of the download counters, in seconds: when set, the
+# downloads are buffered and counted by the flush_plugin_downloads task at
+# this interval. 0 counts each download in the request.
+PLUGIN_DOWNLOADS_FLUSH_INTERVAL = int(
+    os.environ.get("PLUGIN_DOWNLOADS_FLUSH_INTERVAL", 0)
+)
 CELERY_RESULT_BACKEND = "rpc://"
 CELERY_BROKER_URL = os.environ.get("BROKER_URL", "amqp://rabbitmq:5672")
 CELERY_BEAT_SCHEDULE = {
@@ -207,6 +237,19 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(minute=0, hour=2),  # Execute every day at 2 AM.
         "kwargs": {"days": 30},  # Delete items marked for 30+ days
     },
+    "flush_plugin_downloads": {
+        "task": "plugins.tasks.flush_plugin_downloads.flush_plugin_downloads",
+        # Execute every PLUGIN_DOWNLOADS_FLUSH_INTERVAL seconds.
+        "schedule": timedelta(seconds=PLUGIN_DOWNLOADS_FLUSH_INTERVAL or 60),
+    },
+    "rollup_download_stats": {
+        "task": "plugins.tasks.rollup_download_stats.rollup_download_stats",
+        "schedule": crontab(minute=15),  # Execute every hour.
+    },
+    "update_plugin_ranking_scores": {
+        "task": "plugins.tasks.update_ranking_scores.update_plugin_ranking_scores",
+        "schedule": crontab(minute=0, hour=1),  # Execute every day at 1 AM.
+    },
     "send_pending_email_confirmations": {
         "task": "plugins.tasks.trigger_email_confirmation.send_pending_email_confirmations",
         "schedule": crontab(
@@ -249,6 +292,17 @@ PLUGIN_MAX_UPLOAD_SIZE = os.environ.get(
 # RPC2 Max upload size
 DATA_UPLOAD_MAX_MEMORY_SIZE = PLUGIN_MAX_UPLOAD_SIZE  # same as max allowed plugin size
 
+# How the plugin packages are delivered once the download is counted:
+# "stream" sends the file from Django, "x-accel-redirect" (nginx) and
+# "x-sendfile" (Apache, lighttpd) let the web server send it.
+# With x-accel-redirect, the package path is appended to
+# PLUGIN_DOWNLOAD_ACCEL_REDIRECT_URL, an internal location of the web server
+# aliasing MEDIA_ROOT (see /protected-media/ in the nginx confs).
+PLUGIN_DOWNLOAD_DELIVERY = os.environ.get("PLUGIN_DOWNLOAD_DELIVERY", "stream")
+PLUGIN_DOWNLOAD_ACCEL_REDIRECT_URL = os.environ.get(
+    "PLUGIN_DOWNLOAD_ACCEL_REDIRECT_URL", "/protected-media/"
+)
+
 # Plugin Notification Recipients Group Name
 # used to send notifications when a new plugin
 # or a new version is uploaded. This group usually
@@ -341,20 +395,24 @@ TOP_MENU = [
 ]
 
 # Review Resolved, Review Pending, Awaiting Review
+# review_queue names the queue counted in the menu badge
 REVIEW_MENU = [
     {
         "name": "Review Resolved",
         "url": "/plugins/feedback_completed/",
+        "review_queue": "completed",
         "order": 0,
     },
     {
         "name": "Review Pending",
         "url": "/plugins/feedback_received/",
+        "review_queue": "received",
         "order": 1,
     },
     {
         "name": "Awaiting Review",
         "url": "/plugins/feedback_pending/",
+        "review_queue": "pending",
         "order": 2,
     },
     {